@@ -0,0 +1,181 @@
+"""
+Correctness checks of the stemmath shortcuts against brute force.
+
+The spatial index skips segments, which boxes the measuring line doesn't
+cross. These checks measure the same anchors with every segment intersected
+and report any difference. Lines through the end of a horizontal or
+vertical segment (which box is flat) are checked separately. The packed
+NumPy search (used for large glyphs) is checked against a loop over every
+segment, when numpy is available.
+
+    python benchmarks/checks.py
+    python benchmarks/checks.py test_playground/MutatorSansBoldCondensed.ufo --samples 5
+"""
+
+import argparse
+import math
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "source" / "code"))
+
+from fontParts.world import NewFont, OpenFont
+
+import stemPlow.stemmath as StemMath
+from stemPlow.StemPlowEngine import MeasurementEngine
+
+
+FONT_PATH = ROOT / "test_playground" / "MutatorSansBoldCondensed.ufo"
+SAMPLES = 3  # t-values per segment
+TOLERANCE = 1e-6
+GRID = 8  # points per side of the packed search grid
+
+
+def bruteForceThickness(geometry, guides):
+    """(thickness1, thickness2) with every segment and constraint line intersected."""
+    guideline1, guideline2, origin = guides
+    start, end = guideline1[0], guideline2[1]
+    dx, dy = start[0] - origin[0], start[1] - origin[1]
+    length = math.hypot(dx, dy)
+    distances = []
+    for index in range(len(geometry)):
+        for piece in geometry.segmentPieces(index):
+            for point, _ in StemMath.calculate_intersections(start, end, piece):
+                distances.append(
+                    ((point[0] - origin[0]) * dx + (point[1] - origin[1]) * dy) / length
+                )
+    for lineStart, lineEnd in geometry.constraintLines:
+        hit = StemMath._lineHit(start, end, lineStart, lineEnd)
+        if hit is not None:
+            point = hit[0]
+            distances.append(
+                ((point[0] - origin[0]) * dx + (point[1] - origin[1]) * dy) / length
+            )
+    tolerance = StemMath.ORIGIN_TOLERANCE
+    side1 = [distance for distance in distances if distance >= tolerance]
+    side2 = [distance for distance in distances if distance <= -tolerance]
+    return min(side1, default=0), -max(side2, default=0)
+
+
+def checkGlyph(engine, glyph, samples=SAMPLES):
+    """Returns list of (glyphName, anchor, measured, expected) for the differing anchors."""
+    geometry = engine.getGeometry(glyph)
+    failures = []
+    tValues = [(i + 1) / (samples + 1) for i in range(samples)]
+    for contour_index, segment_index, _, _ in geometry.iterSegments():
+        for t in tValues:
+            guides = StemMath.calculateGuidesForAnchor(
+                geometry, contour_index, segment_index, t
+            )
+            measurement = engine.measureGuides(geometry, guides)
+            measured = (measurement.thickness1, measurement.thickness2)
+            expected = bruteForceThickness(geometry, guides)
+            if any(abs(a - b) > TOLERANCE for a, b in zip(measured, expected)):
+                failures.append(
+                    (glyph.name, (contour_index, segment_index, t), measured, expected)
+                )
+    return failures
+
+
+def checkFlatSegmentEnds(drift=1.25e-12):
+    """
+    Lines along the sides of a rectangle, tilted by a rounding error (like the
+    rotated guidelines are), cross the ends of the flat segments across them.
+    Returns list of (line, measured, expected) for the lines, which hits differ
+    from brute force.
+    """
+    glyph = NewFont().newGlyph("rectangle")
+    glyph.width = 400
+    pen = glyph.getPen()
+    pen.moveTo((30, 0))
+    for point in ((350, 0), (350, 800), (30, 800)):
+        pen.lineTo(point)
+    pen.closePath()
+    geometry = StemMath.GlyphGeometry(glyph)
+
+    lines = []
+    for delta in (drift, -drift, 0):
+        for x in (30, 350):
+            lines.append(((x, -1000), (x + delta, 10000)))
+        for y in (0, 800):
+            lines.append(((-1000, y), (10000, y + delta)))
+
+    failures = []
+    for start, end in lines:
+        origin = ((start[0] + end[0]) / 2, (start[1] + end[1]) / 2)
+        measured = sorted(
+            hit.point for hit in StemMath.find_rayHits(geometry, origin, start, end)
+        )
+        expected = sorted(
+            point
+            for index in range(len(geometry))
+            for piece in geometry.segmentPieces(index)
+            for point, _ in StemMath.calculate_intersections(start, end, piece)
+        )
+        if len(measured) != len(expected) or any(
+            math.dist(a, b) > TOLERANCE for a, b in zip(measured, expected)
+        ):
+            failures.append(((start, end), measured, expected))
+    return failures
+
+
+def checkPackedSearch(engine, glyph, grid=GRID):
+    """
+    Returns list of (glyphName, point, found, expected) for the grid points, where
+    nearestWithClearance of the packed segments doesn't give the closest segment
+    (the lower index on ties) or its clearance is more than the second distance.
+    """
+    geometry = engine.getGeometry(glyph)
+    packed = StemMath.vectorized.packSegments(geometry)
+    xMin, yMin, xMax, yMax = glyph.bounds
+    failures = []
+    for i in range(grid + 1):
+        for j in range(grid + 1):
+            point = (
+                xMin - 50 + (xMax - xMin + 100) * i / grid,
+                yMin - 50 + (yMax - yMin + 100) * j / grid,
+            )
+            evaluate = StemMath._segmentDistance(point, geometry, None)
+            distances = [evaluate(index)[0] for index in range(len(geometry))]
+            index, distance, _, clearance = packed.nearestWithClearance(point, evaluate)
+            expected = distances.index(min(distances))
+            others = distances[:expected] + distances[expected + 1 :]
+            second = min(others, default=math.inf)
+            if (
+                index != expected
+                or distance != distances[expected]
+                or clearance > second
+            ):
+                failures.append(
+                    (glyph.name, point, (index, clearance), (expected, second))
+                )
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("font", nargs="?", default=str(FONT_PATH))
+    parser.add_argument("--samples", type=int, default=SAMPLES)
+    args = parser.parse_args(argv)
+
+    failures = []
+    for line, measured, expected in checkFlatSegmentEnds():
+        failures.append(("rectangle", line, measured, expected))
+
+    engine = MeasurementEngine()
+    font = OpenFont(args.font)
+    for glyph in font:
+        if len(glyph.contours) + len(glyph.components):
+            failures.extend(checkGlyph(engine, glyph, args.samples))
+            if StemMath.vectorized is not None:
+                failures.extend(checkPackedSearch(engine, glyph))
+
+    for glyphName, anchor, measured, expected in failures:
+        print(f"{glyphName} {anchor}: measured {measured}, expected {expected}")
+    print(f"{len(failures)} differences")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Deterministic stress glyphs for the benchmarks.
+
+Every glyph is built from its seed only, so the same corpus is measured on
+every machine and in every run. Glyphs mix lines, cubics and qcurves (with
+one to three off-curves), their contours overlap the neighbours and some of
+the outline comes from components.
+"""
+
+import math
+import random
+
+from fontParts.world import NewFont
+
+
+SIZES = (200, 2000, 20000)  # approximate numbers of segments
+SEGMENT_TYPES = (("line", 0.4), ("curve", 0.4), ("qcurve", 0.2))
+COMPONENT_SHARE = 0.1  # part of the segments, that comes from components
+CELL = 400  # contours are placed on a grid, overlapping the neighbours
+
+
+def _pickType(rng):
+    value = rng.random()
+    for segType, share in SEGMENT_TYPES:
+        if value < share:
+            return segType
+        value -= share
+    return SEGMENT_TYPES[-1][0]
+
+
+def _point(cx, cy, radius, angle):
+    return (
+        round(cx + radius * math.cos(angle), 2),
+        round(cy + radius * math.sin(angle), 2),
+    )
+
+
+def drawContour(pen, rng, center, segmentCount):
+    """Draws closed contour around the center, with randomly picked segment types."""
+    cx, cy = center
+    step = 2 * math.pi / segmentCount
+    radii = [rng.uniform(0.45, 0.7) * CELL for _ in range(segmentCount)]
+
+    pen.moveTo(_point(cx, cy, radii[0], 0))
+    for index in range(1, segmentCount + 1):
+        start = (index - 1) * step
+        end = index * step
+        radius = radii[index % segmentCount]
+        previousRadius = radii[index - 1]
+        onCurve = _point(cx, cy, radius, end)
+        segType = _pickType(rng)
+        # handles bulge outwards or inwards, so the outline gets some inflections
+        bulge = rng.uniform(0.8, 1.25)
+        if segType == "line":
+            pen.lineTo(onCurve)
+        elif segType == "curve":
+            pen.curveTo(
+                _point(cx, cy, previousRadius * bulge, start + step / 3),
+                _point(cx, cy, radius * bulge, end - step / 3),
+                onCurve,
+            )
+        else:
+            # TrueType curves, with one to three off-curves
+            offCurveCount = rng.randint(1, 3)
+            offCurves = []
+            for offCurveIndex in range(1, offCurveCount + 1):
+                factor = offCurveIndex / (offCurveCount + 1)
+                offCurveRadius = previousRadius + (radius - previousRadius) * factor
+                offCurves.append(
+                    _point(cx, cy, offCurveRadius * bulge, start + step * factor)
+                )
+            pen.qCurveTo(*offCurves, onCurve)
+    pen.closePath()
+
+
+def drawContours(pen, rng, segmentCount, origin=(0, 0)):
+    """Draws contours with segmentCount segments in total on an overlapping grid."""
+    remaining = segmentCount
+    index = 0
+    columns = max(1, int(math.sqrt(segmentCount / 12)))
+    while remaining > 0:
+        count = min(remaining, rng.randint(4, 20))
+        if remaining - count < 4:
+            count = remaining
+        column, row = index % columns, index // columns
+        # every other row is shifted by half of the cell, so the contours overlap
+        center = (
+            origin[0] + column * CELL * 0.8 + (row % 2) * CELL * 0.4,
+            origin[1] + row * CELL * 0.8,
+        )
+        drawContour(pen, rng, center, count)
+        remaining -= count
+        index += 1
+
+
+def makeStressFont(sizes=SIZES, seed=0):
+    """
+    Returns font with a stress glyph for every size, named "stress<size>".
+    Each of them has a base glyph "stress<size>.component" used as a component.
+    """
+    font = NewFont(showInterface=False)
+    font.info.familyName = "StemPlow Benchmark"
+    font.info.unitsPerEm = 1000
+    for size in sizes:
+        rng = random.Random(f"{seed}-{size}")
+        name = f"stress{size}"
+        componentSegments = max(4, int(size * COMPONENT_SHARE))
+
+        base = font.newGlyph(f"{name}.component")
+        drawContours(base.getPen(), rng, componentSegments)
+        base.width = CELL
+
+        glyph = font.newGlyph(name)
+        drawContours(glyph.getPen(), rng, size - componentSegments * 2)
+        # the same base twice, the second one overlaps the outline
+        glyph.appendComponent(base.name, offset=(0, -CELL))
+        glyph.appendComponent(base.name, offset=(CELL * 0.5, CELL * 0.5))
+        xMin, _, xMax, _ = glyph.bounds
+        glyph.width = round(xMax + CELL * 0.2)
+    return font
+
+
+def getStressGlyph(font, size):
+    return font[f"stress{size}"]
+
+
+def samplePoints(glyph, count, seed=0):
+    """Returns count cursor positions spread over the bounds of the glyph."""
+    rng = random.Random(f"{seed}-points-{glyph.name}")
+    xMin, yMin, xMax, yMax = glyph.bounds
+    return [
+        (rng.uniform(xMin, xMax), rng.uniform(yMin, yMax)) for _ in range(count)
+    ]
+
+
+def hoverPath(glyph, count, step=2, seed=0):
+    """Returns count cursor positions, that wander over the glyph in small steps (hovering)."""
+    rng = random.Random(f"{seed}-hover-{glyph.name}")
+    x, y = samplePoints(glyph, 1, seed)[0]
+    path = []
+    for _ in range(count):
+        x += rng.uniform(-step, step)
+        y += rng.uniform(-step, step)
+        path.append((x, y))
+    return path
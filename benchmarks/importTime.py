@@ -0,0 +1,106 @@
+"""
+Import-time report of the StemPlow modules.
+
+Every module is imported in a fresh interpreter with `python -X importtime`,
+the report shows its cumulative import time, the slowest of its imports and
+the heavy modules it pulled in. Modules needing RoboFont (mojo, AppKit) are
+skipped outside of it; inside of RoboFont use StemPlowImports.importReport().
+
+    python benchmarks/importTime.py
+    python benchmarks/importTime.py stemPlow.stemmath --top 10
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+CODE = ROOT / "source" / "code"
+
+MODULES = (
+    "stemPlow.StemPlowImports",
+    "stemPlow.StemPlowInstrumentation",
+    "stemPlow.stemmath",
+    "stemPlow.stemmath.vectorized",
+    "stemPlow.StemPlowPreparation",
+    "stemPlow.StemPlowMasters",
+    "stemPlow.StemPlowBatch",
+)
+HEAVY_MODULES = ("numpy", "booleanOperations", "fontParts.base", "fontParts.world")
+
+
+def importTimes(module):
+    """
+    Returns list of (module, self µs, cumulative µs, depth) in the order of
+    `-X importtime` output and the set of loaded modules. Depth is the nesting
+    level, imports of the interpreter itself (and the measured module) are 0.
+    """
+    script = (
+        f"import sys; import {module}; "
+        "print('\\n'.join(sorted(sys.modules)))"
+    )
+    environment = dict(os.environ, PYTHONPATH=str(CODE))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        capture_output=True,
+        text=True,
+        env=environment,
+    )
+    if result.returncode:
+        raise ImportError(result.stderr.strip().splitlines()[-1])
+
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        selfTime, cumulative, name = line[len("import time:") :].split("|")
+        if not selfTime.strip().isdigit():
+            # header
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        times.append((name.strip(), int(selfTime), int(cumulative), depth))
+    return times, set(result.stdout.split())
+
+
+def report(modules, top=5):
+    lines = []
+    for module in modules:
+        try:
+            times, loaded = importTimes(module)
+        except ImportError as error:
+            lines.append(f"{module}: skipped ({error})")
+            continue
+        # modules are reported after their imports, so the direct imports
+        # are the depth 1 lines right above the module
+        total = 0
+        children = []
+        for name, _, cumulative, depth in times:
+            if depth == 0:
+                if name == module:
+                    total = cumulative
+                    break
+                children = []
+            elif depth == 1:
+                children.append((name, cumulative))
+        heavy = [name for name in HEAVY_MODULES if name in loaded]
+        lines.append(f"{module}: {total / 1000:.1f} ms")
+        lines.append(f"    heavy modules: {', '.join(heavy) or 'none'}")
+        # nested imports are included in the times of the direct ones
+        for name, cumulative in sorted(children, key=lambda item: -item[1])[:top]:
+            lines.append(f"    {name:40} {cumulative / 1000:9.1f} ms")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time report of StemPlow modules.")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--top", type=int, default=5, help="slowest imports to show")
+    args = parser.parse_args(argv)
+    print(report(args.modules, args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
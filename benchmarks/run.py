@@ -0,0 +1,331 @@
+"""
+Benchmarks of the stemmath hot paths on the synthetic corpus (see corpus.py).
+
+    python benchmarks/run.py                  # compare with benchmarks/baseline.json
+    python benchmarks/run.py --save           # record new baseline
+    python benchmarks/run.py --sizes 200 2000 --cases nearestPoint pipeline
+
+Times are seconds per call (the median of the repeats, a single slow run
+doesn't move it). Before comparing, they are scaled by the calibration loop,
+timed right before and after every case, so the baseline recorded on another
+machine (or while the machine was busier) is still useful. The exit status
+is 1, when any case got slower than the threshold, and stayed slower when it
+was timed again (RETRIES times, noise rarely repeats). Cases faster than
+NOISE_FLOOR per call are only reported: at a few microseconds the noise of
+the machine is bigger than the threshold.
+"""
+
+import argparse
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "source" / "code"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from booleanOperations.booleanGlyph import BooleanGlyph
+
+import stemPlow.stemmath as StemMath
+from stemPlow.StemPlowEngine import MeasurementEngine
+from stemPlow.StemPlowPreparation import prepareOutline
+
+from corpus import SIZES, getStressGlyph, hoverPath, makeStressFont, samplePoints
+
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+THRESHOLD = 1.3  # slower than baseline * THRESHOLD is a regression
+NOISE_FLOOR = 10e-6  # seconds per call, faster cases never fail the comparison
+MIN_TIME = 0.5  # seconds, every case is repeated at least this long
+REPEATS = 7  # runs over the items, at least
+RETRIES = 2  # slower cases are timed again, before they count as regressions
+POINTS = 50  # cursor positions per glyph
+HOVER_POINTS = 500  # consecutive cursor positions of the hovering case
+LINES = 10  # measuring lines per glyph, they cross the whole glyph
+LINE_LENGTH = 20000
+
+
+def calibrate():
+    """Times a fixed pure python loop, used to compare results of different machines."""
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        total = 0.0
+        for i in range(200000):
+            total += (i * 0.5) ** 0.5
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def timeCalls(function, items, minTime=MIN_TIME):
+    """
+    Returns the median time per call of function(item) over repeated runs
+    over the items.
+    Runs repeat at least REPEATS times and at least minTime in total, unless
+    a single one takes longer than minTime (then 3 runs are enough).
+    """
+    times = []
+    spent = 0.0
+    while True:
+        start = time.perf_counter()
+        for item in items:
+            function(item)
+        elapsed = time.perf_counter() - start
+        times.append(elapsed / len(items))
+        spent += elapsed
+        if len(times) >= 3 and elapsed >= minTime:
+            break
+        if spent >= minTime and len(times) >= REPEATS:
+            break
+    return statistics.median(times)
+
+
+def measuringLines(points):
+    lines = []
+    for index, (x, y) in enumerate(points):
+        # directions are spread evenly, so both flat and steep lines are there
+        angle = index / len(points) * math.pi
+        dx, dy = LINE_LENGTH * math.cos(angle), LINE_LENGTH * math.sin(angle)
+        lines.append(((x - dx, y - dy), (x + dx, y + dy)))
+    return lines
+
+
+class Case:
+    """Benchmark case, setup(glyph) returns list of arguments for run(arguments)."""
+
+    def __init__(self, name, setup, run):
+        self.name = name
+        self.setup = setup
+        self.run = run
+
+
+def _nearestPointSetup(glyph):
+    geometry = StemMath.GlyphGeometry(prepareOutline(glyph, False, True))
+    geometry.bvh
+    return [(point, geometry) for point in samplePoints(glyph, POINTS)]
+
+
+def _nearestPointRun(arguments):
+    StemMath.calculateDetailsForNearestPointOnCurve(*arguments)
+
+
+def _nearestPointHoverSetup(glyph):
+    geometry = StemMath.GlyphGeometry(prepareOutline(glyph, False, True))
+    geometry.bvh
+    # consecutive positions share the tracker, like frames of the glyph editor
+    tracker = StemMath.NearestSegmentTracker()
+    return [(tracker, point, geometry) for point in hoverPath(glyph, HOVER_POINTS)]
+
+
+def _nearestPointHoverRun(arguments):
+    tracker, point, geometry = arguments
+    tracker.find(point, geometry)
+
+
+def _guidelinesSetup(glyph):
+    geometry = StemMath.GlyphGeometry(prepareOutline(glyph, False, True))
+    arguments = []
+    for point in samplePoints(glyph, POINTS):
+        index, _, _ = StemMath.findNearestSegment(point, geometry)
+        arguments.append(
+            (point, geometry.segmentTypes[index], *geometry.segmentPoints[index])
+        )
+    return arguments
+
+
+def _guidelinesRun(arguments):
+    StemMath.stemThicknessGuidelines(*arguments)
+
+
+def _defconIntersectionsSetup(glyph):
+    # the outline is outside of the font, so its geometry wouldn't be cached
+    geometry = StemMath.GlyphGeometry(prepareOutline(glyph, False, True))
+    geometry.bvh
+    return [(geometry, *line) for line in measuringLines(samplePoints(glyph, LINES))]
+
+
+def _defconIntersectionsRun(arguments):
+    StemMath.find_intersectionsForDefconGlyph(*arguments)
+
+
+def _booleanIntersectionsSetup(glyph):
+    booleanGlyph = BooleanGlyph(prepareOutline(glyph, False, True))
+    return [
+        (booleanGlyph, *line) for line in measuringLines(samplePoints(glyph, LINES))
+    ]
+
+
+def _booleanIntersectionsRun(arguments):
+    StemMath.find_intersectionsForBooleanGlyph(*arguments)
+
+
+# default settings: components and sidebearings are measured, overlaps are kept
+engine = MeasurementEngine()
+
+
+def measure(glyph, cursorPosition, geometry=None):
+    """
+    The same steps as the glyph editor: prepare the glyph (unless the geometry
+    is already there), find the guides, intersect them with the outline.
+    """
+    if geometry is None:
+        geometry = engine.getGeometry(glyph)
+    return engine.measureAt(geometry, cursorPosition)
+
+
+def _pipelineSetup(glyph):
+    # a few points only, preparation (decomposing) dominates
+    return [(glyph, point) for point in samplePoints(glyph, 3)]
+
+
+def _pipelineRun(arguments):
+    measure(*arguments)
+
+
+def _pipelineCachedSetup(glyph):
+    geometry = engine.getGeometry(glyph)
+    geometry.bvh
+    return [(glyph, point, geometry) for point in samplePoints(glyph, POINTS)]
+
+
+CASES = (
+    Case("nearestPoint", _nearestPointSetup, _nearestPointRun),
+    Case("nearestPointHover", _nearestPointHoverSetup, _nearestPointHoverRun),
+    Case("stemThicknessGuidelines", _guidelinesSetup, _guidelinesRun),
+    Case("intersectionsDefcon", _defconIntersectionsSetup, _defconIntersectionsRun),
+    Case("intersectionsBoolean", _booleanIntersectionsSetup, _booleanIntersectionsRun),
+    Case("pipeline", _pipelineSetup, _pipelineRun),
+    Case("pipelineCached", _pipelineCachedSetup, _pipelineRun),
+)
+
+
+def runBenchmarks(
+    sizes=SIZES, caseNames=None, minTime=MIN_TIME, log=print, keys=None
+):
+    """
+    Returns dict with {"case[size]": seconds per call} results and calibrations
+    of the cases (the speed of the machine drifts, so every case gets its own).
+    keys limits the run to these "case[size]" items.
+    """
+    font = makeStressFont(sizes)
+    results = {}
+    calibrations = {}
+    for case in CASES:
+        if caseNames and case.name not in caseNames:
+            continue
+        for size in sizes:
+            key = f"{case.name}[{size}]"
+            if keys is not None and key not in keys:
+                continue
+            arguments = case.setup(getStressGlyph(font, size))
+            before = calibrate()
+            results[key] = timeCalls(case.run, arguments, minTime)
+            calibrations[key] = (before + calibrate()) / 2
+            log(f"{key:40} {results[key] * 1000:10.3f} ms")
+    calibration = (
+        statistics.median(calibrations.values()) if calibrations else calibrate()
+    )
+    return dict(
+        calibration=calibration,
+        calibrations=calibrations,
+        python=platform.python_version(),
+        machine=platform.machine(),
+        results=results,
+    )
+
+
+def compare(current, baseline, threshold=THRESHOLD, noiseFloor=NOISE_FLOOR):
+    """
+    Returns (regressions, noisy), lists of (key, baseline, current, ratio) for cases
+    slower than the threshold. Cases faster than noiseFloor per call are in noisy.
+    """
+    regressions = []
+    noisy = []
+    for key, seconds in current["results"].items():
+        previous = baseline["results"].get(key)
+        if previous is None:
+            continue
+        # older baselines have a single calibration
+        scale = current["calibrations"].get(key, current["calibration"]) / baseline.get(
+            "calibrations", {}
+        ).get(key, baseline["calibration"])
+        ratio = seconds / (previous * scale)
+        if ratio > threshold:
+            slower = (key, previous, seconds, ratio)
+            if previous * scale < noiseFloor and seconds < noiseFloor:
+                noisy.append(slower)
+            else:
+                regressions.append(slower)
+    return regressions, noisy
+
+
+def parseArguments(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument(
+        "--cases",
+        nargs="+",
+        choices=[case.name for case in CASES],
+        help="run only these cases",
+    )
+    parser.add_argument("--save", action="store_true", help="write the baseline")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=THRESHOLD,
+        help="allowed slowdown against the baseline (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--noise-floor",
+        type=float,
+        default=NOISE_FLOOR,
+        help="seconds per call, faster cases are only reported (default: %(default)s)",
+    )
+    parser.add_argument("--min-time", type=float, default=MIN_TIME)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parseArguments(argv)
+    current = runBenchmarks(tuple(args.sizes), args.cases, args.min_time)
+
+    if args.save:
+        args.baseline.write_text(json.dumps(current, indent=1, sort_keys=True) + "\n")
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"no baseline in {args.baseline}, run with --save first")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())
+    regressions, noisy = compare(current, baseline, args.threshold, args.noise_floor)
+    for _ in range(RETRIES):
+        if not regressions:
+            break
+        keys = {key for key, *_ in regressions}
+        print(f"timing again: {', '.join(sorted(keys))}")
+        again = runBenchmarks(tuple(args.sizes), args.cases, args.min_time, keys=keys)
+        confirmed, _ = compare(again, baseline, args.threshold, args.noise_floor)
+        confirmed = {key for key, *_ in confirmed}
+        regressions = [slower for slower in regressions if slower[0] in confirmed]
+    report = (("REGRESSION", regressions), ("slower (below noise floor)", noisy))
+    for label, slower in report:
+        for key, previous, seconds, ratio in slower:
+            print(
+                f"{label} {key}: {previous * 1000:.3f} ms -> {seconds * 1000:.3f} ms "
+                f"({ratio:.2f}x after calibration)"
+            )
+    if regressions:
+        return 1
+    print("no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Font-wide stem consistency audit.
+
+Stems of every glyph are measured in parallel (see StemPlowBatch), measured
+widths are clustered, and clusters are matched with named values defined
+with Laser Measure. Measurements, that are close to a named value (within
+the tolerance) but not equal to it, are reported as near misses – most
+likely a stem, that should have been drawn with the named width.
+
+    stemplow-audit MyFont.ufo --tolerance 3 -o audit.json --fail-on-near-misses
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import asdict, dataclass, field
+
+from stemPlow.StemPlowBatch import BatchSettings, openFont, measureFonts
+from stemPlow.StemPlowNamedValues import NamedValueIndex, loadNamedValues
+
+TOLERANCE = 2  # font units
+CLUSTER_GAP = 1  # sorted widths further apart than this start a new cluster
+
+
+@dataclass
+class Cluster:
+    center: float  # median of the widths
+    minimum: float
+    maximum: float
+    count: int
+    glyphs: list
+    named: list = field(default_factory=list)  # names of matching NamedValues
+
+
+def iterWidths(rows):
+    """Yields (width, row) for both sides of every measurement, that hit the outline."""
+    for row in rows:
+        for key in ("thickness1", "thickness2"):
+            width = abs(row[key])
+            if width > 0:
+                yield width, row
+
+
+def clusterWidths(widths, gap=CLUSTER_GAP):
+    """
+    Groups (width, row) items into Clusters. Widths are sorted and a new cluster
+    starts wherever the difference between the neighbours is larger than gap.
+    """
+    widths = sorted(widths, key=lambda item: item[0])
+    groups = []
+    for item in widths:
+        if groups and item[0] - groups[-1][-1][0] <= gap:
+            groups[-1].append(item)
+        else:
+            groups.append([item])
+
+    clusters = []
+    for group in groups:
+        values = [width for width, _ in group]
+        clusters.append(
+            Cluster(
+                center=values[len(values) // 2],
+                minimum=values[0],
+                maximum=values[-1],
+                count=len(values),
+                glyphs=sorted({row["glyph"] for _, row in group}),
+            )
+        )
+    return clusters
+
+
+def auditRows(rows, namedValues, tolerance=TOLERANCE, gap=CLUSTER_GAP):
+    """
+    Returns report (dict) for the measured rows of a single font.
+    A width matches a named value, when it rounds to it (the same rule, that
+    the glyph editor uses to show the names); it is a near miss, when it's
+    within the tolerance, but doesn't match.
+    """
+    if not isinstance(namedValues, NamedValueIndex):
+        namedValues = NamedValueIndex(namedValues)
+    widths = list(iterWidths(rows))
+    clusters = clusterWidths(widths, gap)
+    for cluster in clusters:
+        cluster.named = [
+            namedValue.name
+            for namedValue in namedValues.within(cluster.center, tolerance)
+        ]
+
+    matches = {namedValue.name: 0 for namedValue in namedValues}
+    nearMisses = []
+    for width, row in widths:
+        namedValue = namedValues.nearest(width)
+        if namedValue is None:
+            continue
+        if round(width) == namedValue.value:
+            matches[namedValue.name] += 1
+        elif abs(width - namedValue.value) <= tolerance:
+            nearMisses.append(
+                dict(
+                    glyph=row["glyph"],
+                    contour_index=row["contour_index"],
+                    segment_index=row["segment_index"],
+                    t=row["t"],
+                    x=row["x"],
+                    y=row["y"],
+                    width=width,
+                    name=namedValue.name,
+                    kind=namedValue.kind,
+                    expected=namedValue.value,
+                    delta=width - namedValue.value,
+                )
+            )
+
+    nearMisses.sort(key=lambda item: (item["glyph"], -abs(item["delta"])))
+    return dict(
+        measurements=len(widths),
+        namedValues=[
+            dict(asdict(namedValue), matches=matches[namedValue.name])
+            for namedValue in namedValues
+        ],
+        clusters=[asdict(cluster) for cluster in clusters],
+        nearMisses=nearMisses,
+        outlierGlyphs=sorted({item["glyph"] for item in nearMisses}),
+    )
+
+
+def auditFonts(paths, settings, tolerance=TOLERANCE, gap=CLUSTER_GAP, workers=None):
+    """Returns report for each of the fonts, glyphs of every font are measured in parallel."""
+    reports = []
+    for path in paths:
+        rows = measureFonts([path], settings, workers=workers)
+        report = auditRows(rows, loadNamedValues(openFont(path)), tolerance, gap)
+        report["font"] = path
+        reports.append(report)
+    return dict(tolerance=tolerance, clusterGap=gap, fonts=reports)
+
+
+def parseArguments(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="stemplow-audit",
+        description="Check stems of every glyph against Laser Measure named values.",
+    )
+    parser.add_argument("fonts", nargs="+", help="paths to UFO fonts")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=TOLERANCE,
+        help="maximal difference of a near miss (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--cluster-gap",
+        type=float,
+        default=CLUSTER_GAP,
+        help="gap between widths, that splits clusters (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=BatchSettings.samples,
+        help="measurements on every segment (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--ignore-overlaps", action="store_true", help="remove overlaps first"
+    )
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--fail-on-near-misses",
+        action="store_true",
+        help="exit with status 1, if any near miss was found",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parseArguments(argv)
+    settings = BatchSettings(
+        ignoreOverlaps=args.ignore_overlaps,
+        # sidebearings aren't stems
+        measureAgainstSideBearings=False,
+        samples=args.samples,
+    )
+    report = auditFonts(
+        args.fonts, settings, args.tolerance, args.cluster_gap, args.workers
+    )
+
+    if args.output:
+        with open(args.output, "w") as stream:
+            json.dump(report, stream, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+        sys.stdout.write("\n")
+
+    nearMissCount = sum(len(font["nearMisses"]) for font in report["fonts"])
+    if args.fail_on_near_misses and nearMissCount:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
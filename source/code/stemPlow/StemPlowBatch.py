@@ -0,0 +1,266 @@
+"""
+Headless stem measurements for whole UFOs.
+
+Measures every glyph without RoboFont, the same way the glyph editor does:
+the glyph is prepared (see StemPlowPreparation), and the stem is measured
+perpendicular to the outline at the given points. Points are sampled along
+every segment, placed at explicit t-values, or read from the anchored ruler
+and the guides stored in the glyph lib. Glyphs are spread across a process pool.
+
+    stemplow-batch MyFont-Regular.ufo MyFont-Bold.ufo --samples 4 -o stems.csv
+    python -m stemPlow.StemPlowBatch MyFont.ufo --anchors --format json
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from fontParts.world import OpenFont
+
+from stemPlow.StemPlowEngine import MeasurementEngine, MeasurementSettings
+from stemPlow.StemPlowGuides import getStoredGuides
+
+
+# the same key as StemPlowRuler.keyId (StemPlowSubscriber needs mojo, so it isn't imported here)
+RULER_LIB_KEY = "com.rafalbuchner.StemPlow.StemPlowRuler"
+
+FIELDS = (
+    "font",
+    "glyph",
+    "contour_index",
+    "segment_index",
+    "t",
+    "x",
+    "y",
+    "thickness1",
+    "thickness2",
+    "x1",
+    "y1",
+    "x2",
+    "y2",
+)
+
+
+@dataclass
+class BatchSettings:
+    ignoreOverlaps: bool = False
+    measureAgainstComponents: bool = True
+    measureAgainstSideBearings: bool = True
+    samples: int = 3  # evenly spaced points on every segment
+    tValues: tuple = ()  # used instead of samples, when given
+    anchors: bool = False  # measure only the ruler and the guides stored in the glyph lib
+
+    def measurementSettings(self, font):
+        return MeasurementSettings.fromFont(
+            font,
+            ignoreOverlaps=self.ignoreOverlaps,
+            measureAgainstComponents=self.measureAgainstComponents,
+            measureAgainstSideBearings=self.measureAgainstSideBearings,
+        )
+
+
+def sampleTValues(settings):
+    if settings.tValues:
+        return tuple(settings.tValues)
+    count = settings.samples
+    return tuple((i + 1) / (count + 1) for i in range(count))
+
+
+def getStoredAnchors(glyph):
+    """Returns (contour_index, segment_index, anchor_t) of the anchored ruler and the guides stored in the glyph lib."""
+    stored = glyph.lib.get(RULER_LIB_KEY, [])
+    if isinstance(stored, dict):
+        stored = [stored]
+    anchors = []
+    for anchorData in stored:
+        contour_index = anchorData.get("contour_index")
+        segment_index = anchorData.get("segment_index")
+        anchor_t = anchorData.get("anchor_t")
+        if None not in (contour_index, segment_index, anchor_t):
+            anchors.append((contour_index, segment_index, anchor_t))
+    return anchors + getStoredGuides(glyph)
+
+
+def measureGlyph(glyph, settings, fontName=None):
+    """Returns list of rows (dicts with FIELDS keys) with measurements of the glyph."""
+    if len(glyph.contours) + len(glyph.components) == 0:
+        return []
+
+    engine = MeasurementEngine(settings.measurementSettings(glyph.font))
+    geometry = engine.getGeometry(glyph)
+
+    if settings.anchors:
+        points = getStoredAnchors(glyph)
+    else:
+        tValues = sampleTValues(settings)
+        points = [
+            (contour_index, segment_index, t)
+            for contour_index, segment_index, _, _ in geometry.iterSegments()
+            for t in tValues
+        ]
+
+    rows = []
+    for contour_index, segment_index, t in points:
+        measurement = engine.measureAnchor(geometry, contour_index, segment_index, t)
+        if measurement is None:
+            continue
+        point = measurement.point
+        nearestP1, nearestP2 = measurement.nearestP1, measurement.nearestP2
+        rows.append(
+            dict(
+                font=fontName,
+                glyph=glyph.name,
+                contour_index=contour_index,
+                segment_index=segment_index,
+                t=t,
+                x=point[0],
+                y=point[1],
+                thickness1=measurement.thickness1,
+                thickness2=measurement.thickness2,
+                x1=nearestP1[0],
+                y1=nearestP1[1],
+                x2=nearestP2[0],
+                y2=nearestP2[1],
+            )
+        )
+    return rows
+
+
+# every process of the pool opens the font once
+_openedFonts = {}
+
+
+def openFont(path):
+    """Opens the UFO (once per process)."""
+    font = _openedFonts.get(path)
+    if font is None:
+        font = _openedFonts[path] = OpenFont(path, showInterface=False)
+    return font
+
+
+def _measureGlyphs(path, glyphNames, settings):
+    font = openFont(path)
+    fontName = os.path.basename(path)
+    rows = []
+    for name in glyphNames:
+        rows.extend(measureGlyph(font[name], settings, fontName))
+    return rows
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def measureFonts(paths, settings, workers=None):
+    """Measures every glyph of the UFOs. Returns list of rows."""
+    tasks = []
+    for path in paths:
+        font = openFont(path)
+        glyphNames = [name for name in font.glyphOrder if name in font]
+        glyphNames += sorted(set(font.keys()) - set(glyphNames))
+        workerCount = workers or os.cpu_count() or 1
+        # few chunks per worker keep all of them busy till the end
+        size = max(1, len(glyphNames) // (workerCount * 4))
+        tasks.extend((path, chunk) for chunk in _chunks(glyphNames, size))
+
+    if workers == 1:
+        results = [_measureGlyphs(path, names, settings) for path, names in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_measureGlyphs, path, names, settings)
+                for path, names in tasks
+            ]
+            results = [future.result() for future in futures]
+
+    return [row for result in results for row in result]
+
+
+def writeCSV(rows, stream):
+    writer = csv.DictWriter(stream, fieldnames=FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def writeJSON(rows, stream):
+    json.dump(rows, stream, indent=1)
+    stream.write("\n")
+
+
+def parseArguments(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="stemplow-batch",
+        description="Measure stems of every glyph in UFO fonts without RoboFont.",
+    )
+    parser.add_argument("fonts", nargs="+", help="paths to UFO fonts")
+    points = parser.add_mutually_exclusive_group()
+    points.add_argument(
+        "--samples",
+        type=int,
+        default=BatchSettings.samples,
+        help="evenly spaced measurements on every segment (default: %(default)s)",
+    )
+    points.add_argument(
+        "--t",
+        dest="tValues",
+        type=float,
+        nargs="+",
+        help="measure at these t-values of every segment",
+    )
+    points.add_argument(
+        "--anchors",
+        action="store_true",
+        help="measure only the anchored ruler and the guides stored in the glyph lib",
+    )
+    parser.add_argument(
+        "--ignore-overlaps", action="store_true", help="remove overlaps first"
+    )
+    parser.add_argument(
+        "--no-components",
+        action="store_true",
+        help="don't measure against components",
+    )
+    parser.add_argument(
+        "--no-sidebearings",
+        action="store_true",
+        help="don't measure against sidebearings",
+    )
+    parser.add_argument("--format", choices=("csv", "json"), default="csv")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="number of processes (default: number of CPUs)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parseArguments(argv)
+    settings = BatchSettings(
+        ignoreOverlaps=args.ignore_overlaps,
+        measureAgainstComponents=not args.no_components,
+        measureAgainstSideBearings=not args.no_sidebearings,
+        samples=args.samples,
+        tValues=tuple(args.tValues or ()),
+        anchors=args.anchors,
+    )
+    rows = measureFonts(args.fonts, settings, workers=args.workers)
+
+    write = writeJSON if args.format == "json" else writeCSV
+    if args.output:
+        with open(args.output, "w", newline="") as stream:
+            write(rows, stream)
+    else:
+        write(rows, sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+Measuring engine, independent of RoboFont.
+
+MeasurementEngine does everything between the glyph and the numbers: it
+prepares the glyph (see StemPlowPreparation), finds the point on the outline
+and measures the stem perpendicular to it. Configuration is explicit
+(MeasurementSettings), inputs and outputs are plain data, so the same code
+runs in the glyph editor (StemPlowSubscriber is an adapter over it), in the
+batch jobs, in worker processes and in the benchmarks.
+
+    engine = MeasurementEngine(MeasurementSettings.fromFont(font))
+    geometry = engine.getGeometry(font["H"])
+    measurement = engine.measureAt(geometry, (120, 300))
+    measurement.thickness1, measurement.thickness2
+
+Precision (in font units) bounds the error of the solvers: points on the
+outline and the hits are within it from the exact ones (see
+StemMath.tToleranceForPrecision). The glyph editor derives it from the
+decimals shown at the current zoom. Newton's steps converge fast, so looser
+precision saves an iteration at most, the solves aren't noticeably cheaper
+when zoomed out.
+"""
+
+import dataclasses
+from dataclasses import dataclass
+
+import stemPlow.stemmath as StemMath
+from stemPlow.StemPlowInstrumentation import instrumentation
+from stemPlow.StemPlowPreparation import (
+    getItalicParameters,
+    prepareOutline,
+    sidebearingLines,
+)
+
+
+@dataclass(frozen=True)
+class MeasurementSettings:
+    """What is measured. Hashable, so it can be a part of cache keys."""
+
+    ignoreOverlaps: bool = False
+    measureAgainstComponents: bool = True
+    measureAgainstSideBearings: bool = True
+    italicAngle: float = 0
+    italicSlantOffset: float = 0
+
+    @classmethod
+    def fromFont(cls, font, **kwargs):
+        """Settings with the italic angle and offset of the font."""
+        italicAngle, italicSlantOffset = getItalicParameters(font)
+        return cls(italicAngle=italicAngle, italicSlantOffset=italicSlantOffset, **kwargs)
+
+    def replace(self, **kwargs):
+        return dataclasses.replace(self, **kwargs)
+
+
+def precisionForDecimals(decimals):
+    """Returns precision (font units) for values rounded to the decimals: half of the last digit."""
+    return 0.5 * 10 ** -(decimals or 0)
+
+
+@dataclass(frozen=True)
+class Measurement:
+    """
+    Stem measured at the point on the outline. thickness1 is measured on the
+    guideline1 side, thickness2 on the other one; zero if nothing was hit.
+    """
+
+    point: tuple  # on the outline
+    thickness1: float
+    nearestP1: tuple
+    textBoxCenter1: tuple | None
+    thickness2: float
+    nearestP2: tuple
+    textBoxCenter2: tuple | None
+
+    @classmethod
+    def fromThicknessData(cls, thicknessData):
+        if thicknessData is None:
+            return None
+        (
+            textBoxCenter1,
+            thickness1,
+            nearestP1,
+            textBoxCenter2,
+            thickness2,
+            nearestP2,
+            point,
+        ) = thicknessData
+        return cls(
+            point, thickness1, nearestP1, textBoxCenter1, thickness2, nearestP2, textBoxCenter2
+        )
+
+    def asThicknessData(self):
+        """The same tuple, as StemMath.calculateThicknessData returns."""
+        return (
+            self.textBoxCenter1,
+            self.thickness1,
+            self.nearestP1,
+            self.textBoxCenter2,
+            self.thickness2,
+            self.nearestP2,
+            self.point,
+        )
+
+
+class MeasurementEngine:
+    """
+    Prepares glyphs and measures them according to the settings.
+    Measuring reads only the GlyphGeometry, so it's safe outside of the main thread.
+    Points on the outline and the hits are found within precision (font units),
+    None leaves the solvers with their defaults.
+    """
+
+    def __init__(self, settings=None, precision=None):
+        self.settings = settings if settings is not None else MeasurementSettings()
+        # not a part of the settings, it doesn't change what is prepared and measured
+        self.precision = precision
+
+    # preparation
+
+    def prepareOutline(self, glyph):
+        """Returns copy of the outline (decomposed, without overlaps, if needed)."""
+        return prepareOutline(
+            glyph, self.settings.ignoreOverlaps, self.settings.measureAgainstComponents
+        )
+
+    def constraintLines(self, width):
+        """Returns lines measured against besides the outline (sidebearings, if they are measured)."""
+        if not self.settings.measureAgainstSideBearings:
+            return ()
+        return sidebearingLines(
+            width, self.settings.italicSlantOffset, self.settings.italicAngle
+        )
+
+    def getOutlineGeometry(self, outline):
+        """Returns GlyphGeometry of the prepared outline, with the constraint lines."""
+        with instrumentation.stage("geometry"):
+            return StemMath.GlyphGeometry(outline, self.constraintLines(outline.width))
+
+    def prepare(self, glyph):
+        """Returns (preparedOutline, geometry) of the glyph."""
+        outline = self.prepareOutline(glyph)
+        return outline, self.getOutlineGeometry(outline)
+
+    def getGeometry(self, glyph):
+        """Returns GlyphGeometry of the prepared glyph."""
+        return self.prepare(glyph)[1]
+
+    # measuring
+
+    def findAnchor(self, geometry, position):
+        """Returns (contour_index, segment_index, t) of the point on the outline nearest to position, or None."""
+        _, contour_index, segment_index, t = (
+            StemMath.calculateDetailsForNearestPointOnCurve(
+                position, geometry, self.precision
+            )
+        )
+        if contour_index is None:
+            return None
+        return contour_index, segment_index, t
+
+    def measureGuides(self, geometry, guides, isCancelled=None):
+        """Measures along the guides (see StemMath.calculateGuidesForSegment)."""
+        if guides is None:
+            return None
+        if isCancelled is not None and isCancelled():
+            return None
+        with instrumentation.stage("intersections"):
+            thicknessData = StemMath.calculateThicknessData(
+                geometry, guides, self.precision
+            )
+        return Measurement.fromThicknessData(thicknessData)
+
+    def measureAt(self, geometry, position, isCancelled=None, tracker=None):
+        """
+        Measures at the point on the outline nearest to position. Returns Measurement or None.
+        Pass the same StemMath.NearestSegmentTracker for consecutive positions (hovering).
+        """
+        with instrumentation.stage("guides"):
+            guides = StemMath.calculateGuidesForNearestPointOnCurve(
+                position, geometry, self.precision, tracker
+            )
+        return self.measureGuides(geometry, guides, isCancelled)
+
+    def measureAnchor(
+        self, geometry, contour_index, segment_index, t, isCancelled=None
+    ):
+        """Measures at the anchored point. Returns Measurement or None, if the segment doesn't exist."""
+        if None in (contour_index, segment_index, t):
+            return None
+        with instrumentation.stage("guides"):
+            guides = StemMath.calculateGuidesForAnchor(
+                geometry, contour_index, segment_index, t
+            )
+        return self.measureGuides(geometry, guides, isCancelled)
+
+    def measureGlyphAt(self, glyph, position):
+        """Prepares the glyph and measures it, without any caching."""
+        return self.measureAt(self.getGeometry(glyph), position)
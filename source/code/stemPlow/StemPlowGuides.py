@@ -0,0 +1,144 @@
+"""
+Stem Plow guides: rulers saved in the glyph.
+
+Every guide is an anchor (contour_index, segment_index, anchor_t), the
+guides of a glyph are stored as a list in its lib. GuidesRuler measures all
+of them and remembers what every measurement depends on: the anchor segment
+and the part of the measuring line between the hits. After an edit only the
+guides, whose anchor segment changed, or whose measured line is crossed by
+a changed segment (before or after the change), are measured again, so
+dragging points stays interactive with dozens of guides. Nothing here
+depends on mojo.
+"""
+
+from dataclasses import dataclass
+
+import stemPlow.stemmath as StemMath
+from stemPlow.stemmath.spatial import controlPointsBox, lineCrossesBox
+
+
+GUIDES_LIB_KEY = "com.rafalbuchner.StemPlow.StemPlowGuides"
+
+
+def getStoredGuides(glyph):
+    """Returns list of (contour_index, segment_index, anchor_t) of the guides stored in the glyph lib."""
+    anchors = []
+    for anchorData in glyph.lib.get(GUIDES_LIB_KEY, ()):
+        anchor = (
+            anchorData.get("contour_index"),
+            anchorData.get("segment_index"),
+            anchorData.get("anchor_t"),
+        )
+        if None not in anchor:
+            anchors.append(anchor)
+    return anchors
+
+
+def setStoredGuides(glyph, anchors):
+    """Stores the anchors in the glyph lib, removes the key if there are none."""
+    if not anchors:
+        if GUIDES_LIB_KEY in glyph.lib:
+            del glyph.lib[GUIDES_LIB_KEY]
+        return
+    glyph.lib[GUIDES_LIB_KEY] = [
+        dict(contour_index=contour_index, segment_index=segment_index, anchor_t=anchor_t)
+        for contour_index, segment_index, anchor_t in anchors
+    ]
+
+
+@dataclass(frozen=True)
+class GuideMeasurement:
+    anchor: tuple  # (contour_index, segment_index, anchor_t)
+    measurement: object  # Measurement or None, if the anchor segment doesn't exist
+    reach: tuple | None  # (start, end) of the measuring line up to the hits
+
+
+def measureGuide(engine, geometry, anchor):
+    """Returns GuideMeasurement of the anchor."""
+    guides = StemMath.calculateGuidesForAnchor(geometry, *anchor)
+    if guides is None:
+        return GuideMeasurement(anchor, None, None)
+    measurement = engine.measureGuides(geometry, guides)
+    guideline1, guideline2, _ = guides
+    # without a hit, anything crossing the whole guideline would become one
+    end1 = measurement.nearestP1 if measurement.thickness1 else guideline1[0]
+    end2 = measurement.nearestP2 if measurement.thickness2 else guideline2[1]
+    return GuideMeasurement(anchor, measurement, (end1, end2))
+
+
+def isExactEnough(measuredPrecision, precision):
+    """
+    True if results measured with measuredPrecision are good for precision:
+    it's the same or looser, zooming out doesn't measure anything again.
+    None (the solvers' defaults) matches only itself.
+    """
+    if measuredPrecision is None or precision is None:
+        return measuredPrecision == precision
+    return measuredPrecision <= precision
+
+
+class GuidesRuler:
+    """Measurements of the guides of a single glyph, updated incrementally."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.geometry = None
+        self.precision = None
+        self.results = {}  # anchor -> GuideMeasurement
+        self.measuredCount = 0  # guides measured by the last update
+
+    def update(self, engine, geometry, anchors):
+        """
+        Returns list of GuideMeasurements for the anchors. Only the guides
+        affected by the changes since the previous update are measured (all
+        of them, if the engine asks for more precision than they have).
+        """
+        previous = self.geometry
+        changed = None
+        if previous is not None and isExactEnough(self.precision, engine.precision):
+            changed = () if previous is geometry else geometry.changedSegments(previous)
+
+        boxes = []
+        if changed:
+            # hits are within the precision, they can be a bit off the segment
+            pad = (engine.precision or 0) + StemMath.ORIGIN_TOLERANCE
+            for index in changed:
+                for points in (previous.segmentPoints[index], geometry.segmentPoints[index]):
+                    xMin, yMin, xMax, yMax = controlPointsBox(points)
+                    boxes.append((xMin - pad, yMin - pad, xMax + pad, yMax + pad))
+            changed = set(changed)
+
+        results = {}
+        self.measuredCount = 0
+        for anchor in anchors:
+            if anchor in results:
+                continue
+            result = self.results.get(anchor) if changed is not None else None
+            if result is not None and changed and self._isAffected(
+                result, geometry, changed, boxes
+            ):
+                result = None
+            if result is None:
+                result = measureGuide(engine, geometry, anchor)
+                self.measuredCount += 1
+            results[anchor] = result
+
+        self.geometry = geometry
+        if changed is None or self.measuredCount:
+            # kept results are at least as exact as the new ones
+            self.precision = engine.precision
+        self.results = results
+        return [results[anchor] for anchor in anchors]
+
+    @staticmethod
+    def _isAffected(result, geometry, changed, boxes):
+        if result.reach is None:
+            # the segment didn't exist, structure of the contours would have to change
+            return False
+        contour_index, segment_index, _ = result.anchor
+        if geometry.segmentLookup.get((contour_index, segment_index)) in changed:
+            return True
+        start, end = result.reach
+        return any(lineCrossesBox(box, start, end) for box in boxes)
@@ -0,0 +1,76 @@
+"""
+Lazy imports of the measuring engine.
+
+StemPlow launches with RoboFont, but most of the sessions never measure
+anything. The subscriber refers to the heavy modules (stemmath, preparation
+of the glyphs, masters) through LazyModule, so they are imported when the
+ruler is used for the first time. The time of every lazy import is kept:
+
+    from stemPlow.StemPlowImports import importReport
+    print(importReport())
+"""
+
+import importlib
+import sys
+import time
+
+
+importTimes = {}  # module name -> seconds spent importing it (on first use)
+
+
+class LazyModule:
+    """Stands for the module, imports it on the first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        start = time.perf_counter()
+        module = importlib.import_module(self._name)
+        importTimes.setdefault(self._name, time.perf_counter() - start)
+        self._module = module
+        return module
+
+    @property
+    def isLoaded(self):
+        return self._module is not None
+
+    def __getattr__(self, name):
+        module = self._module
+        if module is None:
+            module = self._load()
+        return getattr(module, name)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazyImport(name):
+    """Returns the module if it's imported already, LazyModule otherwise."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
+
+
+# modules, that RoboFont doesn't load by itself
+HEAVY_MODULES = (
+    "stemPlow.stemmath",
+    "stemPlow.stemmath.vectorized",
+    "numpy",
+    "booleanOperations",
+)
+
+
+def importReport():
+    """Returns text with times of the lazy imports and heavy modules, that are loaded."""
+    lines = []
+    for name, seconds in sorted(importTimes.items(), key=lambda item: -item[1]):
+        lines.append(f"{name:40} {seconds * 1000:9.1f} ms")
+    if not lines:
+        lines.append("nothing imported lazily yet")
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    lines.append(f"heavy modules loaded: {', '.join(loaded) or 'none'}")
+    return "\n".join(lines)
@@ -0,0 +1,191 @@
+"""
+Per-stage timings of the measurements.
+
+Turned on with "Record Timings" in the settings. Every stage of a measurement
+(decomposition, removing overlaps, the closest point search, intersections,
+Merz updates...) is recorded per glyph in a rolling window, so p50/p95 show
+where the time goes. From the scripting window:
+
+    from stemPlow.StemPlowInstrumentation import instrumentation
+    print(instrumentation.report())
+    instrumentation.dump("~/Desktop/stemPlowTimings.json")
+
+When it's off, `stage` returns a shared no-op context manager, so the
+instrumented code pays only for the attribute lookup and the call.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+WINDOW = 200  # the latest durations kept for every glyph and stage
+
+STAGES = (
+    "decompose",
+    "removeOverlap",
+    "geometry",
+    "guides",
+    "intersections",
+    "merz",
+    "savedGuides",
+    "total",
+)
+
+_noStage = contextlib.nullcontext()
+
+
+class RollingHistogram:
+    """The latest durations (in seconds) of a single stage."""
+
+    def __init__(self, size=WINDOW):
+        self.durations = deque(maxlen=size)
+        self.count = 0  # all the recorded durations, not only the kept ones
+
+    def add(self, duration):
+        self.durations.append(duration)
+        self.count += 1
+
+    def percentile(self, q):
+        """Returns q-th percentile (0-100) of the kept durations, nearest rank."""
+        if not self.durations:
+            return None
+        ordered = sorted(self.durations)
+        index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def summary(self):
+        return dict(
+            count=self.count,
+            p50=self.percentile(50),
+            p95=self.percentile(95),
+            max=max(self.durations) if self.durations else None,
+        )
+
+
+class _Stage:
+    __slots__ = ("instrumentation", "name", "glyphName", "start")
+
+    def __init__(self, instrumentation, name, glyphName):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.glyphName = glyphName
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.instrumentation.record(
+            self.name, time.perf_counter() - self.start, self.glyphName
+        )
+        return False
+
+
+class Instrumentation:
+    """Rolling per-glyph, per-stage timings. Safe to record from the worker thread."""
+
+    def __init__(self, size=WINDOW):
+        self.enabled = False
+        self.size = size
+        self.histograms = {}  # (glyphName, stage) -> RollingHistogram
+        self.counters = {}
+        self._local = threading.local()
+
+    def setEnabled(self, value):
+        self.enabled = bool(value)
+
+    @contextlib.contextmanager
+    def _glyph(self, glyphName):
+        previous = getattr(self._local, "glyphName", None)
+        self._local.glyphName = glyphName
+        try:
+            yield
+        finally:
+            self._local.glyphName = previous
+
+    def glyph(self, glyphName):
+        """Stages recorded inside of this context (on this thread) belong to glyphName."""
+        if not self.enabled:
+            return _noStage
+        return self._glyph(glyphName)
+
+    def stage(self, name, glyphName=None):
+        """Context manager, that records duration of the stage."""
+        if not self.enabled:
+            return _noStage
+        return _Stage(self, name, glyphName)
+
+    def record(self, name, duration, glyphName=None):
+        if glyphName is None:
+            glyphName = getattr(self._local, "glyphName", None)
+        key = (glyphName, name)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms.setdefault(key, RollingHistogram(self.size))
+        histogram.add(duration)
+
+    def setCounter(self, name, value):
+        self.counters[name] = value
+
+    def clear(self):
+        self.histograms.clear()
+        self.counters.clear()
+
+    def _histogramItems(self):
+        # the worker can add histograms meanwhile, the copy is made at once
+        return list(self.histograms.items())
+
+    def glyphNames(self):
+        return sorted({glyphName or "" for (glyphName, _), _ in self._histogramItems()})
+
+    def summary(self, glyphName=None):
+        """
+        Returns {glyphName: {stage: dict(count, p50, p95, max)}}, durations in seconds.
+        Args:
+            glyphName (str): only this glyph, all the glyphs if None.
+        """
+        result = {}
+        for (name, stage), histogram in self._histogramItems():
+            name = name or ""
+            if glyphName is not None and name != glyphName:
+                continue
+            result.setdefault(name, {})[stage] = histogram.summary()
+        return result
+
+    def report(self, glyphName=None):
+        """Returns the summary as a text table, milliseconds."""
+        order = {stage: index for index, stage in enumerate(STAGES)}
+        lines = [f"{'glyph':20} {'stage':14} {'count':>7} {'p50':>9} {'p95':>9} {'max':>9}"]
+        for name, stages in sorted(self.summary(glyphName).items()):
+            for stage in sorted(stages, key=lambda stage: order.get(stage, len(order))):
+                data = stages[stage]
+                lines.append(
+                    f"{name[:20]:20} {stage:14} {data['count']:7d} "
+                    f"{data['p50'] * 1000:9.3f} {data['p95'] * 1000:9.3f} "
+                    f"{data['max'] * 1000:9.3f}"
+                )
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name}: {value}")
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """Writes the summary, the counters and the raw durations to a JSON file."""
+        data = dict(
+            summary=self.summary(),
+            counters=dict(self.counters),
+            durations=[
+                dict(glyph=name, stage=stage, durations=list(histogram.durations))
+                for (name, stage), histogram in self._histogramItems()
+            ],
+        )
+        path = os.path.expanduser(path)
+        with open(path, "w") as stream:
+            json.dump(data, stream, indent=1)
+        return path
+
+
+instrumentation = Instrumentation()
@@ -0,0 +1,189 @@
+"""
+Anchored ruler measured in all the masters of the glyph.
+
+A ruler anchored to (contour_index, segment_index, anchor_t) points to the
+same place in every compatible master, so compatible masters are stacked
+and measured in one vectorized pass (see stemmath.vectorized). Masters,
+that aren't compatible with the current glyph, or the whole set when numpy
+isn't available, are measured one by one. Nothing here depends on mojo.
+"""
+
+import os
+from dataclasses import dataclass
+
+import stemPlow.stemmath as StemMath
+from stemPlow.StemPlowEngine import MeasurementEngine
+
+
+@dataclass
+class MasterMeasurement:
+    name: str
+    point: tuple
+    thickness1: float
+    nearestP1: tuple
+    thickness2: float
+    nearestP2: tuple
+
+
+def getMasterName(font, layerName=None):
+    """Returns short name of the master, style name of the font and the layer name."""
+    name = None
+    if font is not None:
+        name = font.info.styleName
+        if not name and font.path:
+            name = os.path.splitext(os.path.basename(font.path))[0]
+    name = name or "Untitled"
+    isDefaultLayer = font is None or layerName in (None, font.defaultLayerName)
+    if not isDefaultLayer:
+        name = f"{name} / {layerName}"
+    return name
+
+
+def findMasterGlyphs(glyph, fonts=()):
+    """
+    Returns list of (name, glyph) with the glyph from every layer of its font
+    and from the other fonts (e.g. designspace sources). The glyph itself is first.
+    """
+    font = glyph.font
+    layerName = glyph.layer.name if glyph.layer is not None else None
+    masters = [(getMasterName(font, layerName), glyph)]
+    seen = {id(glyph.naked())}
+    if font is not None:
+        for layer in font.layers:
+            if glyph.name in layer:
+                masterGlyph = layer[glyph.name]
+                if id(masterGlyph.naked()) not in seen:
+                    seen.add(id(masterGlyph.naked()))
+                    masters.append((getMasterName(font, layer.name), masterGlyph))
+
+    for other in fonts:
+        if font is not None and other.naked() is font.naked():
+            continue
+        if glyph.name in other:
+            masterGlyph = other[glyph.name]
+            if id(masterGlyph.naked()) not in seen:
+                seen.add(id(masterGlyph.naked()))
+                masters.append((getMasterName(other), masterGlyph))
+    return masters
+
+
+def _measureScalar(
+    name, geometry, contour_index, segment_index, anchor_t, precision=None
+):
+    measurement = MeasurementEngine(precision=precision).measureAnchor(
+        geometry, contour_index, segment_index, anchor_t
+    )
+    if measurement is None:
+        return None
+    return MasterMeasurement(
+        name,
+        tuple(measurement.point),
+        measurement.thickness1,
+        tuple(measurement.nearestP1),
+        measurement.thickness2,
+        tuple(measurement.nearestP2),
+    )
+
+
+class MastersRuler:
+    """
+    Measures anchored rulers in the masters. Stacked geometries are kept
+    until any of the geometries changes (geometries are immutable and get
+    replaced by GlyphPreparationCache after every change of the glyph).
+    """
+
+    def __init__(self):
+        self._stacked = None  # (geometries, indexes of stacked masters, stacked)
+
+    def clear(self):
+        self._stacked = None
+
+    def _stack(self, geometries):
+        if self._stacked is not None:
+            cached = self._stacked[0]
+            if len(cached) == len(geometries) and all(
+                a is b for a, b in zip(cached, geometries)
+            ):
+                return self._stacked[1], self._stacked[2]
+
+        indexes, stacked = [], None
+        vectorized = StemMath.vectorized
+        if vectorized is not None:
+            # the first geometry (current glyph) decides, which masters are compatible
+            structure = vectorized.geometryStructure(geometries[0])
+            indexes = [
+                index
+                for index, geometry in enumerate(geometries)
+                if vectorized.geometryStructure(geometry) == structure
+            ]
+            if len(indexes) > 1:
+                stacked = vectorized.stackGeometries(
+                    [geometries[index] for index in indexes]
+                )
+            else:
+                indexes = []
+        self._stacked = (tuple(geometries), indexes, stacked)
+        return indexes, stacked
+
+    def measure(
+        self, names, geometries, contour_index, segment_index, anchor_t, precision=None
+    ):
+        """
+        Returns list of MasterMeasurements (None for masters, where the anchor doesn't exist).
+        Args:
+            names (list): names of the masters.
+            geometries (list): GlyphGeometries of the prepared masters, the current glyph first.
+            precision (float): font units, see MeasurementEngine.
+        """
+        if not geometries or None in (contour_index, segment_index, anchor_t):
+            return []
+        results = [None] * len(geometries)
+        indexes, stacked = self._stack(geometries)
+        if stacked is not None:
+            measured = StemMath.vectorized.measureAnchorStacked(
+                stacked, contour_index, segment_index, anchor_t, precision=precision
+            )
+            if measured is not None:
+                for row, index in enumerate(indexes):
+                    results[index] = MasterMeasurement(
+                        names[index],
+                        tuple(measured["point"][row]),
+                        float(measured["thickness1"][row]),
+                        tuple(measured["nearestP1"][row]),
+                        float(measured["thickness2"][row]),
+                        tuple(measured["nearestP2"][row]),
+                    )
+        stackedIndexes = set(indexes)
+        for index, geometry in enumerate(geometries):
+            if index not in stackedIndexes:
+                results[index] = _measureScalar(
+                    names[index],
+                    geometry,
+                    contour_index,
+                    segment_index,
+                    anchor_t,
+                    precision,
+                )
+        return results
+
+
+def measureAnchorInMasters(masters, anchorData, prepare):
+    """
+    Measures the anchored ruler in all the masters.
+    Args:
+        masters (list): (name, glyph) pairs, see findMasterGlyphs.
+        anchorData (dict): contour_index, segment_index and anchor_t of the ruler.
+        prepare (callable): prepare(glyph) -> GlyphGeometry of the measured outline,
+            e.g. MeasurementEngine.getGeometry.
+    Returns:
+        list of MasterMeasurements (or None) in the order of masters.
+    """
+    names = [name for name, _ in masters]
+    geometries = [prepare(glyph) for _, glyph in masters]
+    return MastersRuler().measure(
+        names,
+        geometries,
+        anchorData.get("contour_index"),
+        anchorData.get("segment_index"),
+        anchorData.get("anchor_t"),
+    )
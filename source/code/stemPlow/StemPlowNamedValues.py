@@ -0,0 +1,95 @@
+"""
+Named values (widths and heights) defined with Laser Measure.
+
+The glyph editor looks the names up on every frame and the audit for every
+measured width, so the values are kept in NamedValueIndex: sorted once,
+when the font's measurements change, and searched with bisect.
+
+    index = NamedValueIndex.fromFont(font)
+    index.within(81, tolerance=2)  # NamedValues between 79 and 83
+    index.nearest(80.4)
+"""
+
+import bisect
+from dataclasses import dataclass
+
+
+LASER_MEASURE_LIB_KEY = "com.typesupply.LaserMeasure.measurements"
+
+KINDS = ("width", "height")
+
+
+@dataclass(frozen=True)
+class NamedValue:
+    name: str
+    kind: str  # "width" or "height"
+    value: float
+
+    @property
+    def label(self):
+        """Name as the glyph editor shows it, e.g. "W: stem"."""
+        return f"{self.kind[0].upper()}: {self.name}"
+
+
+def loadNamedValues(font):
+    """Returns NamedValues stored by Laser Measure in the font lib, sorted by value."""
+    stored = font.lib.get(LASER_MEASURE_LIB_KEY, {})
+    namedValues = []
+    for name, data in stored.items():
+        for kind in KINDS:
+            value = data.get(kind)
+            if value is not None:
+                namedValues.append(NamedValue(name, kind, value))
+                break
+    namedValues.sort(key=lambda namedValue: namedValue.value)
+    return namedValues
+
+
+class NamedValueIndex:
+    """
+    Immutable, sorted by value. Equal values keep widths before heights and
+    the names in alphabetical order, so the labels are stable between frames.
+    """
+
+    def __init__(self, namedValues=()):
+        ordered = sorted(
+            namedValues,
+            key=lambda n: (n.value, KINDS.index(n.kind), n.name),
+        )
+        self._namedValues = tuple(ordered)
+        self._values = tuple(namedValue.value for namedValue in ordered)
+
+    @classmethod
+    def fromFont(cls, font):
+        if font is None:
+            return cls()
+        return cls(loadNamedValues(font))
+
+    def __len__(self):
+        return len(self._namedValues)
+
+    def __iter__(self):
+        return iter(self._namedValues)
+
+    def within(self, value, tolerance=0):
+        """Returns tuple of NamedValues, that are at most tolerance away from value."""
+        values = self._values
+        start = bisect.bisect_left(values, value - tolerance)
+        end = bisect.bisect_right(values, value + tolerance, start)
+        return self._namedValues[start:end]
+
+    def nearest(self, value):
+        """Returns the NamedValue closest to value or None, if the index is empty."""
+        namedValues = self._namedValues
+        if not namedValues:
+            return None
+        index = bisect.bisect_left(self._values, value)
+        candidates = namedValues[max(0, index - 1) : index + 1]
+        return min(candidates, key=lambda n: abs(n.value - value))
+
+    def matching(self, measurement, tolerance=0):
+        """
+        Returns NamedValues for the measurement: the rounded measurement is
+        equal to them (or at most tolerance away).
+        """
+        return self.within(round(measurement), tolerance)
@@ -0,0 +1,184 @@
+"""
+Copies of the glyph, that are actually measured.
+
+Depending on the settings, components are decomposed, overlaps removed and
+sidebearings added as lines. GlyphPreparationCache keeps geometries of the
+prepared glyphs until they change. Nothing here depends on mojo, so it works
+in RoboFont and in the headless batch mode alike (see StemPlowEngine).
+"""
+
+import math
+import weakref
+
+from fontParts.world import RGlyph
+from fontTools.pens.filterPen import DecomposingFilterPointPen
+
+from stemPlow.StemPlowInstrumentation import instrumentation
+
+
+ITALIC_SLANT_OFFSET_KEY = "com.typemytype.robofont.italicSlantOffset"
+
+
+def getItalicParameters(font) -> tuple[float, float]:
+    """Returns (italicAngle, italicSlantOffset) of the font, zeros for upright fonts."""
+    if font is None:
+        return 0, 0
+    italicSlangAngle = (
+        font.info.italicAngle if font.info.italicAngle is not None else 0
+    )
+    italicSlantOffset = (
+        font.lib.get(ITALIC_SLANT_OFFSET_KEY, 0) if italicSlangAngle else 0
+    )
+    return italicSlangAngle, italicSlantOffset
+
+
+def copyOverlaplessGlyph(srcGlyph: RGlyph) -> RGlyph:
+    # couldn't help myself with the name, and the comment about the name
+    dstGlyph = RGlyph()
+    dstPen = dstGlyph.getPointPen()
+    srcGlyph.drawPoints(dstPen)
+    dstGlyph.removeOverlap()
+
+    dstGlyph.width = srcGlyph.width
+    return dstGlyph
+
+
+def copyDecomposedAndOverlaplessGlyph(srcGlyph: RGlyph) -> RGlyph:
+    # couldn't help myself with the name, and the comment about the name
+    dstGlyph = copyDecomposedGlyph(srcGlyph)
+    dstGlyph.removeOverlap()
+    return dstGlyph
+
+
+def sidebearingLines(
+    width: float, offset: float, slantAngle: float | int
+) -> tuple[tuple[tuple[float, float], tuple[float, float]], ...]:
+    """
+    Returns the left and the right sidebearing as lines ((x1, y1), (x2, y2)),
+    10000 units long and slanted by the italic angle. They are measured against
+    as constraint lines of the geometry, the glyph isn't copied for them.
+    """
+    offset = offset if slantAngle != 0 else 0
+    x_offset = 5000 * math.tan(math.radians(slantAngle))
+    return tuple(
+        ((x + x_offset + offset, -5000), (x - x_offset + offset, 5000))
+        for x in (0, width)
+    )
+
+
+def copyDecomposedGlyph(srcGlyph: RGlyph) -> RGlyph:
+    # couldn't help myself with the name, and the comment about the name
+    dstGlyph = RGlyph()
+    dstPen = dstGlyph.getPointPen()
+    # components are looked up in the layer of the glyph
+    glyphSet = srcGlyph.layer if srcGlyph.layer is not None else {}
+    # components of missing glyphs are dropped, like RoboFont's decompose does
+    decomposePen = DecomposingFilterPointPen(
+        dstPen, glyphSet, skipMissingComponents=True
+    )
+    srcGlyph.drawPoints(decomposePen)
+
+    dstGlyph.width = srcGlyph.width
+    return dstGlyph
+
+
+def prepareOutline(
+    glyph: RGlyph, ignoreOverlaps: bool, measureAgainstComponents: bool
+) -> RGlyph:
+    """Returns copy of the glyph outline, decomposed and without overlaps if needed."""
+    # steps are separate, so their timings can be told apart
+    decompose = len(glyph.contours) == 0 or measureAgainstComponents
+    if decompose:
+        with instrumentation.stage("decompose"):
+            glyph = copyDecomposedGlyph(glyph)
+
+    if ignoreOverlaps:
+        with instrumentation.stage("removeOverlap"):
+            if decompose:
+                # it's our copy already
+                glyph.removeOverlap()
+            else:
+                glyph = copyOverlaplessGlyph(glyph)
+    return glyph
+
+
+class GlyphPreparationCache:
+    """
+    Keeps geometries of the glyphs prepared for measuring (decomposed, without
+    overlaps, with sidebearing lines). Only the geometry is kept: the prepared
+    glyph can be the glyph itself, it would keep its own weak key alive.
+
+    Entries are keyed by the glyph, its change counter, change counters of all
+    the base glyphs of its components and the preparation flags, so the
+    expensive copies (removeOverlap especially) run only after something changed.
+    """
+
+    def __init__(self):
+        self._prepared = weakref.WeakKeyDictionary()
+        self._changeCounts = weakref.WeakKeyDictionary()
+
+    def _changeCount(self, glyph):
+        # glyph is defcon glyph here
+        count = self._changeCounts.get(glyph)
+        if count is None:
+            if getattr(glyph, "dispatcher", None) is None:
+                # glyph outside of the font, changes can't be tracked
+                return None
+            glyph.addObserver(self, "_glyphChanged", "Glyph.Changed")
+            count = self._changeCounts[glyph] = 0
+        return count
+
+    def _glyphChanged(self, notification):
+        glyph = notification.object
+        if glyph in self._changeCounts:
+            self._changeCounts[glyph] += 1
+
+    def _key(self, glyph, flags):
+        count = self._changeCount(glyph)
+        if count is None:
+            return None
+
+        baseCounts = []
+        layer = glyph.layer
+        seen = set()
+        baseNames = [component.baseGlyph for component in glyph.components]
+        while baseNames:
+            name = baseNames.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+            if layer is None or name not in layer:
+                baseCounts.append((name, -1))
+                continue
+            base = layer[name]
+            baseCount = self._changeCount(base)
+            if baseCount is None:
+                return None
+            baseCounts.append((name, baseCount))
+            baseNames.extend(component.baseGlyph for component in base.components)
+
+        return count, tuple(sorted(baseCounts)), flags
+
+    def get(self, glyph, flags, prepare):
+        """
+        Returns geometry of the fontParts glyph.
+        Args:
+            flags (tuple): hashable settings, that change the result of prepare.
+            prepare (callable): prepare(glyph) -> geometry, called on a cache miss.
+        """
+        naked = glyph.naked()
+        key = self._key(naked, flags)
+        cached = self._prepared.get(naked)
+        if key is not None and cached is not None and cached[0] == key:
+            return cached[1]
+
+        geometry = prepare(glyph)
+        if key is not None:
+            self._prepared[naked] = (key, geometry)
+        return geometry
+
+    def clear(self):
+        for glyph in list(self._changeCounts.keys()):
+            glyph.removeObserver(self, "Glyph.Changed")
+        self._changeCounts.clear()
+        self._prepared.clear()
@@ -0,0 +1,54 @@
+"""
+Change-aware updates of the Merz layers.
+
+Most of the mouse events move the ruler only a little: the values and the
+named values stay the same, the hidden layers stay hidden. RenderState
+remembers the properties last written to every layer and writes only
+the ones, that changed, all of them in a single property group:
+
+    with renderState.frame(baseLayer):
+        renderState.update(textLayer, visible=True, text="80", position=(10, 20))
+    renderState.writes  # properties written in the last frame
+"""
+
+import contextlib
+
+
+class RenderState:
+    """Properties committed to the layers. Only the main thread touches it (Merz)."""
+
+    def __init__(self):
+        self._committed = {}  # id(layer) -> {property name: value}
+        self.writes = 0  # written in the last frame
+        self.skipped = 0  # unchanged in the last frame
+        self.frames = 0
+
+    @contextlib.contextmanager
+    def frame(self, *layers):
+        """Changes of the layers (and their sublayers) inside are committed together."""
+        self.writes = 0
+        self.skipped = 0
+        self.frames += 1
+        with contextlib.ExitStack() as stack:
+            for layer in layers:
+                stack.enter_context(layer.propertyGroup())
+            yield self
+
+    def update(self, layer, **properties):
+        """Writes the properties, that differ from the committed ones, to the layer."""
+        committed = self._committed.setdefault(id(layer), {})
+        changed = {}
+        for name, value in properties.items():
+            if name in committed and committed[name] == value:
+                continue
+            changed[name] = value
+        self.skipped += len(properties) - len(changed)
+        if not changed:
+            return
+        layer.setPropertiesByName(changed)
+        committed.update(changed)
+        self.writes += len(changed)
+
+    def clear(self):
+        """Forgets the committed properties, call it when the layers are removed."""
+        self._committed.clear()
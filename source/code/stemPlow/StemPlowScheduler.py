@@ -0,0 +1,58 @@
+import AppKit  # type: ignore
+
+
+def dispatchOnMainQueue(function):
+    # plain function, so PyObjC can read the block signature
+    def block():
+        function()
+
+    AppKit.NSOperationQueue.mainQueue().addOperationWithBlock_(block)
+
+
+class LatestRequestScheduler:
+    """
+    Runs only the most recent request.
+
+    Mouse events can come faster than the measurement is done. Instead of
+    running every one of them, requests are stored and processed on the next
+    pass of the main queue. A request submitted before the previous one got
+    processed replaces it, so the ruler never trails behind the cursor.
+    Replaced requests are counted in `droppedCount`.
+    """
+
+    def __init__(self, dispatch=dispatchOnMainQueue):
+        self.dispatch = dispatch
+        self.droppedCount = 0
+        self.processedCount = 0
+        self.lastDroppedCount = 0  # dropped since the previous processed request
+        self._pending = None
+        self._droppedSinceLast = 0
+        self._scheduled = False
+
+    def submit(self, callback, *args):
+        """Schedules callback(*args), replacing the request that is still waiting."""
+        if self._pending is not None:
+            self.droppedCount += 1
+            self._droppedSinceLast += 1
+        self._pending = (callback, args)
+        if not self._scheduled:
+            self._scheduled = True
+            self.dispatch(self._run)
+
+    def cancel(self):
+        """Drops the waiting request, if there is one."""
+        if self._pending is not None:
+            self.droppedCount += 1
+            self._droppedSinceLast += 1
+        self._pending = None
+
+    def _run(self):
+        self._scheduled = False
+        request, self._pending = self._pending, None
+        if request is None:
+            return
+        self.lastDroppedCount = self._droppedSinceLast
+        self._droppedSinceLast = 0
+        self.processedCount += 1
+        callback, args = request
+        callback(*args)
@@ -25,6 +25,12 @@ class _StemPlowSettingsWindowController(ezui.WindowController):
         [ ] Named Values from Laser Measure @showLaserMeasureNames
         :
         [ ] Always Show Measurement Line                                  @measureAlways
+        :
+        [ ] Measure in Background                   @measureInBackground
+        :
+        [ ] Measure Anchored Guide in All Masters   @measureAllMasters
+        :
+        [ ] Record Timings                          @recordTimings
         : Trigger behaviour:
         [ ] anchor guide to the outline             @useShortcutToMoveWhileAlways
 
@@ -36,6 +42,9 @@ class _StemPlowSettingsWindowController(ezui.WindowController):
 
         ---
 
+        : Names Tolerance:
+        [_123_](±)                                @namedValuesTolerance
+
         : Text Size:
         [_123_](±)                                @measurementTextSize
 
@@ -75,12 +84,21 @@ class _StemPlowSettingsWindowController(ezui.WindowController):
                 value=internalGetDefault("showLaserMeasureNames")
             ),
             measureAlways=dict(value=internalGetDefault("measureAlways")),
+            measureInBackground=dict(value=internalGetDefault("measureInBackground")),
+            measureAllMasters=dict(value=internalGetDefault("measureAllMasters")),
+            recordTimings=dict(value=internalGetDefault("recordTimings")),
             useShortcutToMoveWhileAlways=dict(
                 value=internalGetDefault("useShortcutToMoveWhileAlways")
             ),
             triggerCharacter=dict(
                 width=20, value=internalGetDefault("triggerCharacter")
             ),
+            namedValuesTolerance=dict(
+                width=numberEntryWidth,
+                valueType="number",
+                minValue=0,
+                value=internalGetDefault("namedValuesTolerance"),
+            ),
             measurementTextSize=dict(
                 width=numberEntryWidth,
                 valueType="number",
@@ -159,9 +177,21 @@ class _StemPlowSettingsWindowController(ezui.WindowController):
     def showLaserMeasureNamesCallback(self, sender):
         self.mainCallback(sender)
 
+    def measureInBackgroundCallback(self, sender):
+        self.mainCallback(sender)
+
+    def measureAllMastersCallback(self, sender):
+        self.mainCallback(sender)
+
+    def recordTimingsCallback(self, sender):
+        self.mainCallback(sender)
+
     def triggerCharacterCallback(self, sender):
         self.mainCallback(sender)
 
+    def namedValuesToleranceCallback(self, sender):
+        self.mainCallback(sender)
+
     def measurementTextSizeCallback(self, sender):
         self.mainCallback(sender)
 
@@ -1,5 +1,4 @@
 import AppKit  # type: ignore
-from fontParts.world import RGlyph
 from mojo import subscriber  # type: ignore
 from mojo import events  # type: ignore
 from mojo.extensions import (  # type: ignore
@@ -7,37 +6,26 @@ from mojo.extensions import (  # type: ignore
     getExtensionDefault,
     setExtensionDefault,
 )
-from mojo.pens import DecomposePointPen  # type: ignore
+from mojo.roboFont import AllFonts  # type: ignore
 
-import stemPlow.stemmath as StemMath
+from stemPlow.StemPlowImports import lazyImport
+from stemPlow.StemPlowInstrumentation import instrumentation
+from stemPlow.StemPlowNamedValues import NamedValueIndex
+from stemPlow.StemPlowRenderState import RenderState
+from stemPlow.StemPlowScheduler import LatestRequestScheduler
+from stemPlow.StemPlowWorker import MeasurementWorker
 
+# the extension launches with RoboFont, the engine is imported on the first measurement
+Engine = lazyImport("stemPlow.StemPlowEngine")
+StemMath = lazyImport("stemPlow.stemmath")
+Preparation = lazyImport("stemPlow.StemPlowPreparation")
+Masters = lazyImport("stemPlow.StemPlowMasters")
+Guides = lazyImport("stemPlow.StemPlowGuides")
 
-import math
-
-## DEBUGGING SETTINGS:
-if AppKit.NSUserName() == "rafalbuchner":
-    __DEBUG__ = True
-else:
-    __DEBUG__ = False
-
-if __DEBUG__:
-    import traceback
-
-
-def debugFunctionNestingChain(additionalData=""):
-    if __DEBUG__:
-        limit = 30
-        stack = traceback.extract_stack(limit=limit)
-        print("=" * 50)
-        print(f"depth: {len(stack)}")
-        for i, f in enumerate(stack):
-            if i == len(stack) - 1:
-                break
-            print(f"{' '+'  '*i}{f.name} at {f.lineno:03d} ({additionalData})")
-        print()
 
+import contextlib
+import math
 
-## DEBUGGING SETTINGS:
 
 extensionID = "com.rafalbuchner.StemPlow"
 extensionKeyStub = extensionID + "."
@@ -56,8 +44,12 @@ defaults = {
     extensionKeyStub + "measureAgainstComponents": True,
     extensionKeyStub + "measureAgainstSideBearings": True,
     extensionKeyStub + "showLaserMeasureNames": True,
+    extensionKeyStub + "namedValuesTolerance": 0,
     extensionKeyStub + "measureAlways": False,
     extensionKeyStub + "useShortcutToMoveWhileAlways": False,
+    extensionKeyStub + "measureInBackground": False,
+    extensionKeyStub + "measureAllMasters": False,
+    extensionKeyStub + "recordTimings": False,
 }
 
 registerExtensionDefaults(defaults)
@@ -77,14 +69,6 @@ def internalSetDefault(key, value):
     setExtensionDefault(key, value)
 
 
-def nearestPointFromList(myPoint, points):
-    def _sorter(point):
-        return StemMath.lengthAB(myPoint, point)
-
-    points = sorted(points, key=_sorter)
-    return points
-
-
 def getCurrentPosition(info):
     glyphView = info["glyphEditor"].getGlyphView()
     locationInView = glyphView._getMousePosition()
@@ -92,71 +76,33 @@ def getCurrentPosition(info):
     return (cursorPosition.x, cursorPosition.y)
 
 
-# FIXME cleanup those:
-
-
-def copyOverlaplessGlyph(srcGlyph: RGlyph) -> RGlyph:
-    # couldn't help myself with the name, and the comment about the name
-    dstGlyph = RGlyph()
-    dstPen = dstGlyph.getPointPen()
-    srcGlyph.drawPoints(dstPen)
-    dstGlyph.removeOverlap()
+class GuideLayers:
+    """Merz layers of a single saved guide. They are pooled, unused ones are only hidden."""
 
-    dstGlyph.width = srcGlyph.width
-    return dstGlyph
+    def __init__(self, baseLayer):
+        self.line = baseLayer.appendLineSublayer(visible=False)
+        self.oval = baseLayer.appendSymbolSublayer(visible=False)
+        self.text1 = baseLayer.appendTextLineSublayer(visible=False)
+        self.text2 = baseLayer.appendTextLineSublayer(visible=False)
 
+    def setStyle(self, lineAttributes, textAttributes, ovalAttributes):
+        self.line.setPropertiesByName(lineAttributes)
+        self.text1.setPropertiesByName(textAttributes)
+        self.text2.setPropertiesByName(textAttributes)
+        self.oval.setImageSettings(ovalAttributes)
 
-def copyDecomposedAndOverlaplessGlyph(srcGlyph: RGlyph) -> RGlyph:
-    # couldn't help myself with the name, and the comment about the name
-    dstGlyph = RGlyph()
-    dstPen = dstGlyph.getPointPen()
-    decomposePen = DecomposePointPen(srcGlyph.font, dstPen)
-    srcGlyph.drawPoints(decomposePen)
-    dstGlyph.removeOverlap()
-
-    dstGlyph.width = srcGlyph.width
-    return dstGlyph
-
-
-def copyGlyphWithSidebearings(
-    srcGlyph: RGlyph, offset: float, slantAngle: float | int
-) -> RGlyph:
-    dstGlyph = RGlyph()
-    pen = dstGlyph.getPen()
-    srcGlyph.draw(pen)
-    offset = offset if slantAngle != 0 else 0
-    x_offset = 5000 * math.tan(math.radians(slantAngle))
-
-    pen.moveTo((x_offset + offset, -5000))
-    pen.lineTo((-x_offset + offset, 5000))
-    pen.endPath()
-    pen.moveTo((srcGlyph.width + x_offset + offset, -5000))
-    pen.lineTo((srcGlyph.width - x_offset + offset, 5000))
-    pen.endPath()
-    dstGlyph.width = srcGlyph.width
-    return dstGlyph
-
-
-def copyDecomposedGlyph(srcGlyph: RGlyph) -> RGlyph:
-    # couldn't help myself with the name, and the comment about the name
-    dstGlyph = RGlyph()
-    dstPen = dstGlyph.getPointPen()
-    decomposePen = DecomposePointPen(srcGlyph.font, dstPen)
-    srcGlyph.drawPoints(decomposePen)
-
-    dstGlyph.width = srcGlyph.width
-    return dstGlyph
+    def layers(self):
+        return self.line, self.oval, self.text1, self.text2
 
 
 def findMiddleOfTheGlyph(info):
-    # debugFunctionNestingChain()
     minx, miny, maxx, maxy = info["glyph"].bounds
     return ((maxx - minx) / 2 + minx, (maxy - miny) / 2 + miny)
 
 
 class StemPlowSubscriber(subscriber.Subscriber):
 
-    debug = __DEBUG__
+    debug = False
     wantsMeasurements = False
     measureAlwaysVisible = True
 
@@ -166,6 +112,17 @@ class StemPlowSubscriber(subscriber.Subscriber):
 
     def build(self):
         self.stemPlowRuler = StemPlowRuler()
+        # measurements run only for the latest mouse event, see LatestRequestScheduler
+        self.scheduler = LatestRequestScheduler()
+        self.worker = MeasurementWorker()
+        # warm start of the hover search used only by the worker thread, see measureInWorker
+        self.workerTracker = None
+        self.mastersRuler = None  # created, when the masters are measured for the first time
+        self.renderState = RenderState()
+        # saved guides are measured after every edit, see StemPlowGuides
+        self.guidesScheduler = LatestRequestScheduler()
+        self.guidesRuler = None
+        self.guideLayers = []
 
         window = self.getGlyphEditor()
         self.backgroundContainer = window.extensionContainer(
@@ -180,6 +137,13 @@ class StemPlowSubscriber(subscriber.Subscriber):
         )
         self.fgBaseLayer = self.foregroundContainer.appendBaseSublayer()
         self.bgBaseLayer = self.backgroundContainer.appendBaseSublayer()
+        # guides are visible also while the ruler is hidden
+        self.guidesContainer = window.extensionContainer(
+            identifier=extensionKeyStub + "guides",
+            location="foreground",
+            clear=True,
+        )
+        self.guidesBaseLayer = self.guidesContainer.appendBaseSublayer()
 
         # text
 
@@ -195,6 +159,9 @@ class StemPlowSubscriber(subscriber.Subscriber):
         self.namedValues2Layer = self.fgBaseLayer.appendTextLineSublayer(
             visible=False, name="namedValue2"
         )
+        self.mastersLayer = self.fgBaseLayer.appendTextLineSublayer(
+            visible=False, name="mastersValues"
+        )
 
         # geometry
 
@@ -212,12 +179,22 @@ class StemPlowSubscriber(subscriber.Subscriber):
         # go
         self.clearData()
         self.loadDefaults()
+        self.stemPlowRuler.loadNamedMeasurements(self.getFont())
 
     def glyphEditorDidScale(self, info):
         # I think it causes flickering while scalling
         scale = info["scale"]
         self.stemPlowRuler.setScale(scale)
-        self.updateText()
+        with self.layerFrame():
+            self.updateText()
+        # rounding of the guides follows the zoom too, they're measured again
+        # only when zooming in asks for more precision
+        glyph = self.getGlyphEditor().getGlyph()
+        if glyph is None:
+            return
+        glyph = glyph.asFontParts()
+        if self.wantsGuidesUpdate(glyph):
+            self.guidesScheduler.submit(self.updateGuides, glyph)
 
     def loadDefaults(self):
         # load
@@ -233,6 +210,10 @@ class StemPlowSubscriber(subscriber.Subscriber):
             internalGetDefault("measureAgainstComponents")
         )
         self.showLaserMeasureNames = bool(internalGetDefault("showLaserMeasureNames"))
+        self.measureInBackground = bool(internalGetDefault("measureInBackground"))
+        self.measureAllMasters = bool(internalGetDefault("measureAllMasters"))
+        self.debug = bool(internalGetDefault("recordTimings"))
+        instrumentation.setEnabled(self.debug)
         self.measurementOvalSize = internalGetDefault("measurementOvalSize")
         measurementLineSize = internalGetDefault("measurementLineSize")
         textSize = internalGetDefault("measurementTextSize")
@@ -268,6 +249,10 @@ class StemPlowSubscriber(subscriber.Subscriber):
         self.namedValues2Layer.setOffset((0, -textSize - 5))
         self.namedValues1Layer.setVerticalAlignment("top")
         self.namedValues2Layer.setVerticalAlignment("top")
+        self.mastersLayer.setPropertiesByName(textAttributes)
+        self.mastersLayer.setHorizontalAlignment("left")
+        self.mastersLayer.setVerticalAlignment("top")
+        self.mastersLayer.setOffset((textSize * 2, -textSize))
 
         for oval in [self.oval_ALayer, self.oval_BLayer, self.oval_CLayer]:
             oval.setImageSettings(ovalAttributes)
@@ -285,29 +270,46 @@ class StemPlowSubscriber(subscriber.Subscriber):
             )
         )
 
+        self.guideAttributes = (lineAttributes, textAttributes, ovalAttributes)
+        for guideLayers in self.guideLayers:
+            guideLayers.setStyle(*self.guideAttributes)
+
         if self.measureAlways:
             self.wantsMeasurements = True
 
         if self.performAnchoring:
             self.wantsMeasurements = False
 
-        self.stemPlowRuler.loadNamedMeasurements(self.getFont())
         self.measureAlwaysVisible = self.measureAlways
 
     def destroy(self):
+        self.scheduler.cancel()
+        self.guidesScheduler.cancel()
+        self.worker.stop()
+        if self.mastersRuler is not None:
+            self.mastersRuler.clear()
+        if self.stemPlowRuler.preparedGlyphs is not None:
+            self.stemPlowRuler.preparedGlyphs.clear()
         self.backgroundContainer.clearSublayers()
         self.foregroundContainer.clearSublayers()
+        self.guidesContainer.clearSublayers()
+        self.renderState.clear()
         events.removeObserver(self, extensionID + ".defaultsChanged")
 
     def clearLayers(self):
         self.backgroundContainer.clearSublayers()
         self.foregroundContainer.clearSublayers()
+        # properties are remembered by id of the layer, new layers can get the same ids
+        self.renderState.clear()
 
     def _hideLayers(self):
         self.backgroundContainer.setVisible(False)
         self.foregroundContainer.setVisible(False)
 
     def hideLayersAndClearData(self):
+        # measurement waiting in the scheduler or the worker would show the layers again
+        self.scheduler.cancel()
+        self.worker.cancel()
         self._hideLayers()
         self.clearData()
 
@@ -331,7 +333,8 @@ class StemPlowSubscriber(subscriber.Subscriber):
             self.stemPlowRuler.clearNames()
 
         # it can catch an error, while self.measurementValue1 or self.measurementValue2 is None. I don't want to add another if statement inside of `self.updateText()`, and catching `self.measurementValue1 is None and self.measurementValue2 is None` seems to be stupid here
-        self.updateText()
+        with self.layerFrame():
+            self.updateText()
 
         # measurement updates
         if self.performAnchoring:
@@ -354,6 +357,7 @@ class StemPlowSubscriber(subscriber.Subscriber):
     textBoxCenter2 = None
     nearestP1 = None
     nearestP2 = None
+    masterMeasurements = None
     visibleP1 = False
     visibleP2 = False
     position = None
@@ -368,11 +372,16 @@ class StemPlowSubscriber(subscriber.Subscriber):
         if self.performAnchoring:
             self.stemPlowRuler.anchorRulerToGlyphWithoutCursor(info["glyph"])
 
+        self.updateGuides(info["glyph"])
+
     def roboFontDidSwitchCurrentGlyph(self, info):
         if info["glyph"] is None:
             return
 
         if self.currentGlyphReference != info["glyph"].name:
+            if self.guidesRuler is not None:
+                self.guidesRuler.clear()
+            self.updateGuides(info["glyph"])
             if self.performAnchoring:
                 self.stemPlowRuler.anchorRuler(
                     info, findMiddleOfTheGlyph
@@ -390,11 +399,12 @@ class StemPlowSubscriber(subscriber.Subscriber):
                 ) = self.stemPlowRuler.getThicknessData(
                     dict(anchorData=info["glyph"].lib[self.stemPlowRuler.keyId]),
                     info["glyph"],
-                    self.stemPlowRuler.getGuidesAndAnchoredPoint,
+                )
+                self.masterMeasurements = self.measureMasters(
+                    info["glyph"], info["glyph"].lib[self.stemPlowRuler.keyId]
                 )
 
-                self.updateText()
-                self.updateLinesAndOvals()
+                self.redrawLayers()
             self.currentGlyphReference = info["glyph"].name
 
     def glyphEditorDidKeyDown(self, info):
@@ -445,36 +455,34 @@ class StemPlowSubscriber(subscriber.Subscriber):
                 and not self.stemPlowRuler.anchored
             ):
                 self.stemPlowRuler.anchorRuler(info)
-                self.updateText()
-                self.updateLinesAndOvals()
+                self.redrawLayers()
 
         if self.performAnchoring:
             self.wantsMeasurements = False
 
     def glyphEditorDidMouseDrag(self, info):
+        if self.wantsGuidesUpdate(info["glyph"]):
+            self.guidesScheduler.submit(self.updateGuides, info["glyph"])
         # if not self.wantsMeasurements and not self.stemPlowRuler.anchored:
         if not self.performAnchoring:
             return
         if not self.stemPlowRuler.anchored:
             return
-        glyph = info["glyph"]
+        self.scheduler.submit(self.measureAnchoredRuler, info["glyph"])
 
-        (
-            self.textBoxCenter1,
-            self.measurementValue1,
-            self.nearestP1,
-            self.textBoxCenter2,
-            self.measurementValue2,
-            self.nearestP2,
-            self.closestPointOnPath,
-        ) = self.stemPlowRuler.getThicknessData(
-            dict(anchorData=info["glyph"].lib[self.stemPlowRuler.keyId]),
-            glyph,
-            self.stemPlowRuler.getGuidesAndAnchoredPoint,
-        )
+    def measureAnchoredRuler(self, glyph):
+        if not self.stemPlowRuler.anchored:
+            return
+        self.logDroppedFrames()
+        data = dict(anchorData=dict(glyph.lib[self.stemPlowRuler.keyId]))
 
-        self.updateText()
-        self.updateLinesAndOvals()
+        if self.measureInBackground:
+            self.measureInWorker(data, glyph)
+            return
+
+        thicknessData = self.stemPlowRuler.getThicknessData(data, glyph)
+        self.masterMeasurements = self.measureMasters(glyph, data["anchorData"])
+        self.applyThicknessData(thicknessData, glyph.name)
 
     def glyphEditorDidUndo(self, info):
         self.glyphEditorDidMouseDrag(info)
@@ -491,25 +499,145 @@ class StemPlowSubscriber(subscriber.Subscriber):
         if len(glyph.contours) + len(glyph.components) == 0:
             return
         cursorPosition = tuple(info["locationInGlyph"])
+        self.scheduler.submit(self.measureAtCursor, glyph, cursorPosition)
+
+    def measureAtCursor(self, glyph, cursorPosition):
+        if not self.wantsMeasurements:
+            return
+        self.logDroppedFrames()
+        data = dict(position=cursorPosition)
 
-        thicknessData = self.stemPlowRuler.getThicknessData(
-            dict(position=cursorPosition),
-            glyph,
-            self.stemPlowRuler.getGuidesAndClosestPoint,
+        if self.measureInBackground:
+            self.measureInWorker(data, glyph)
+            return
+
+        # only anchored rulers are measured in all the masters
+        self.masterMeasurements = None
+        self.applyThicknessData(
+            self.stemPlowRuler.getThicknessData(data, glyph),
+            glyph.name,
         )
-        if thicknessData:
-            (
-                self.textBoxCenter1,
-                self.measurementValue1,
-                self.nearestP1,
-                self.textBoxCenter2,
-                self.measurementValue2,
-                self.nearestP2,
-                self.closestPointOnPath,
-            ) = thicknessData
 
-            self.updateText()
-            self.updateLinesAndOvals()
+    def measureInWorker(self, data, glyph):
+        # preparing the glyph needs fontParts and mojo, so it stays on the main thread,
+        # the worker gets only the geometry (read-only) and plain data
+        geometry = self.stemPlowRuler.prepareGeometry(glyph)
+        # lazy search structures are built here, so the worker never writes to the geometry
+        geometry.prepareSearch()
+        # the worker doesn't touch the ruler: the engine is taken here and the worker
+        # has its own tracker (jobs run one at a time on the same thread)
+        engine = self.stemPlowRuler.measuringEngine
+        if self.workerTracker is None:
+            self.workerTracker = StemMath.NearestSegmentTracker()
+        tracker = self.workerTracker
+        computeThicknessData = self.stemPlowRuler.computeThicknessData
+        measureMasters = None
+        if "anchorData" in data:
+            measureMasters = self.prepareMastersMeasurement(glyph, data["anchorData"])
+        glyphName = glyph.name
+
+        def job(isCancelled):
+            with instrumentation.glyph(glyphName), instrumentation.stage("total"):
+                thicknessData = computeThicknessData(
+                    geometry, data, isCancelled, engine, tracker
+                )
+            masterMeasurements = None
+            if measureMasters is not None and not isCancelled():
+                masterMeasurements = measureMasters()
+            return thicknessData, masterMeasurements, glyphName
+
+        self.worker.submit(job, self.workerDidFinish)
+
+    def workerDidFinish(self, result):
+        # main thread, only results of the current request get here
+        if not self.wantsMeasurements and not self.stemPlowRuler.anchored:
+            return
+        thicknessData, self.masterMeasurements, glyphName = result
+        self.stemPlowRuler.setCurrentMeasurements(thicknessData)
+        self.applyThicknessData(thicknessData, glyphName)
+
+    def getMasterGlyphs(self, glyph):
+        """glyph from the other layers and from the open fonts of the same family"""
+        font = glyph.font
+        fonts = []
+        if font is not None and font.info.familyName:
+            fonts = [
+                other
+                for other in AllFonts()
+                if other.info.familyName == font.info.familyName
+            ]
+        return Masters.findMasterGlyphs(glyph, fonts)
+
+    def prepareMastersMeasurement(self, glyph, anchorData):
+        """
+        Returns function, that measures the anchored ruler in all the masters
+        (or None, if the option is off). Masters are prepared here, on the main
+        thread, the returned function only reads their geometries.
+        """
+        if not self.measureAllMasters:
+            return None
+        masters = self.getMasterGlyphs(glyph)
+        names = [name for name, _ in masters]
+        geometries = []
+        for _, masterGlyph in masters:
+            geometry = self.stemPlowRuler.prepareGeometry(masterGlyph)
+            # masters are measured in the worker, see measureInWorker
+            geometry.prepareSearch()
+            geometries.append(geometry)
+        if self.mastersRuler is None:
+            self.mastersRuler = Masters.MastersRuler()
+        mastersRuler = self.mastersRuler
+        contour_index = anchorData.get("contour_index")
+        segment_index = anchorData.get("segment_index")
+        anchor_t = anchorData.get("anchor_t")
+        precision = self.stemPlowRuler.getPrecision()
+
+        def measureMasters():
+            return mastersRuler.measure(
+                names, geometries, contour_index, segment_index, anchor_t, precision
+            )
+
+        return measureMasters
+
+    def measureMasters(self, glyph, anchorData):
+        measureMasters = self.prepareMastersMeasurement(glyph, anchorData)
+        if measureMasters is None:
+            return None
+        return measureMasters()
+
+    def applyThicknessData(self, thicknessData, glyphName=None):
+        if not thicknessData:
+            return
+        with instrumentation.stage("merz", glyphName):
+            self.updateLayers(thicknessData)
+
+    def updateLayers(self, thicknessData):
+        (
+            self.textBoxCenter1,
+            self.measurementValue1,
+            self.nearestP1,
+            self.textBoxCenter2,
+            self.measurementValue2,
+            self.nearestP2,
+            self.closestPointOnPath,
+        ) = thicknessData
+
+        self.redrawLayers()
+
+    def logDroppedFrames(self):
+        if self.debug:
+            instrumentation.setCounter("droppedFrames", self.scheduler.droppedCount)
+            instrumentation.setCounter(
+                "cancelledWorkerJobs", self.worker.cancelledCount
+            )
+            if self.measureInBackground:
+                tracker = self.workerTracker
+            else:
+                tracker = self.stemPlowRuler.nearestTracker
+            if tracker is None:
+                return
+            instrumentation.setCounter("nearestWarmHits", tracker.hits)
+            instrumentation.setCounter("nearestFullSearches", tracker.misses)
 
     def glyphEditorWillOpen(self, info):
         if self.measureAlways:
@@ -517,15 +645,116 @@ class StemPlowSubscriber(subscriber.Subscriber):
             self.showLayers()
 
     def glyphEditorWantsContextualMenuItems(self, info):
+        glyph = self.getGlyphEditor().getGlyph()
+        if glyph is None:
+            return
+        glyph = glyph.asFontParts()
+        # the menu is opened where the guide should be
+        position = getCurrentPosition(info)
+
         def _stemPlowGuide(sender):
-            print("Create Stem Plow Guide – NotImplemented")
+            self.createGuide(glyph, position)
+
+        def _removeStemPlowGuides(sender):
+            self.removeGuides(glyph)
 
         myMenuItems = [("Create Stem Plow Guide", _stemPlowGuide)]
+        if self.stemPlowRuler.guidesKeyId in glyph.lib:
+            myMenuItems.append(("Remove Stem Plow Guides", _removeStemPlowGuides))
         info["itemDescriptions"].extend(myMenuItems)
 
     def fontMeasurementsChanged(self, info):
         self.stemPlowRuler.loadNamedMeasurements(self.getFont())
 
+    # guides
+    # ----
+
+    def createGuide(self, glyph, position):
+        if len(glyph.contours) + len(glyph.components) == 0:
+            return
+        # anchors of the guides point to the prepared outline, the one that is measured
+        geometry = self.stemPlowRuler.prepareGeometry(glyph)
+        geometry.prepareSearch()
+        anchor = self.stemPlowRuler.measuringEngine.findAnchor(geometry, position)
+        if anchor is None:
+            return
+        anchors = Guides.getStoredGuides(glyph)
+        if anchor in anchors:
+            return
+        with glyph.undo("Create Stem Plow Guide"):
+            Guides.setStoredGuides(glyph, anchors + [anchor])
+        self.updateGuides(glyph)
+
+    def removeGuides(self, glyph):
+        with glyph.undo("Remove Stem Plow Guides"):
+            Guides.setStoredGuides(glyph, [])
+        self.updateGuides(glyph)
+
+    def wantsGuidesUpdate(self, glyph):
+        # guides removed by undo have to disappear too
+        if self.stemPlowRuler.guidesKeyId in glyph.lib:
+            return True
+        return self.guidesRuler is not None and bool(self.guidesRuler.results)
+
+    def updateGuides(self, glyph):
+        # only the guides touched by the edit are measured again
+        if glyph is None or self.stemPlowRuler.guidesKeyId not in glyph.lib:
+            if self.guidesRuler is not None:
+                self.guidesRuler.clear()
+            self.drawGuides(())
+            return
+        if self.guidesRuler is None:
+            self.guidesRuler = Guides.GuidesRuler()
+        with instrumentation.glyph(glyph.name), instrumentation.stage("savedGuides"):
+            geometry = self.stemPlowRuler.prepareGeometry(glyph)
+            geometry.prepareSearch()
+            results = self.guidesRuler.update(
+                self.stemPlowRuler.measuringEngine,
+                geometry,
+                Guides.getStoredGuides(glyph),
+            )
+        if self.debug:
+            instrumentation.setCounter("guidesMeasured", self.guidesRuler.measuredCount)
+        self.drawGuides(results)
+
+    def drawGuides(self, results):
+        while len(self.guideLayers) < len(results):
+            guideLayers = GuideLayers(self.guidesBaseLayer)
+            guideLayers.setStyle(*self.guideAttributes)
+            self.guideLayers.append(guideLayers)
+
+        roundingFloatValue = self.stemPlowRuler.getRoundingFloatValue()
+        update = self.renderState.update
+        with self.layerFrame(self.guidesBaseLayer):
+            for index, guideLayers in enumerate(self.guideLayers):
+                measurement = None
+                if index < len(results):
+                    measurement = results[index].measurement
+                if measurement is None:
+                    for layer in guideLayers.layers():
+                        update(layer, visible=False)
+                    continue
+                update(
+                    guideLayers.line,
+                    startPoint=measurement.nearestP1,
+                    endPoint=measurement.nearestP2,
+                    visible=True,
+                )
+                update(guideLayers.oval, position=measurement.point, visible=True)
+                for textLayer, value, textBoxCenter in (
+                    (guideLayers.text1, measurement.thickness1, measurement.textBoxCenter1),
+                    (guideLayers.text2, measurement.thickness2, measurement.textBoxCenter2),
+                ):
+                    if round(value) == 0 or textBoxCenter is None:
+                        update(textLayer, visible=False)
+                        continue
+                    update(
+                        textLayer,
+                        visible=True,
+                        text=str(round(value, roundingFloatValue)),
+                        position=textBoxCenter,
+                    )
+
     # layers updates
     # ----
 
@@ -537,23 +766,38 @@ class StemPlowSubscriber(subscriber.Subscriber):
         self.textBoxCenter2 = None
         self.nearestP1 = None
         self.nearestP2 = None
+        self.masterMeasurements = None
         self.stemPlowRuler.anchored = False
-        self.stemPlowRuler.currentNames1 = None
-        self.stemPlowRuler.currentNames2 = None
+        self.stemPlowRuler.clearNames()
+
+    @contextlib.contextmanager
+    def layerFrame(self, *layers):
+        # only the properties, that changed since the last frame, are written to Merz
+        layers = layers or (self.fgBaseLayer, self.bgBaseLayer)
+        with self.renderState.frame(*layers):
+            yield
+        if self.debug:
+            instrumentation.setCounter("layerWrites", self.renderState.writes)
+            instrumentation.setCounter("layerWritesSkipped", self.renderState.skipped)
+
+    def redrawLayers(self):
+        with self.layerFrame():
+            self.updateText()
+            self.updateLinesAndOvals()
 
     def updateLinesAndOvals(self):
-        self.lineLayer.setStartPoint(self.nearestP1)
-        self.lineLayer.setEndPoint(self.nearestP2)
-        self.oval_ALayer.setPosition((self.nearestP1))
-        self.oval_BLayer.setPosition((self.closestPointOnPath))
-        self.oval_CLayer.setPosition((self.nearestP2))
-        self.oval_AnchorIndicatorLayer.setPosition((self.closestPointOnPath))
-
-        # if self.performAnchoring:
-        if self.useShortcutToMoveWhileAlways and self.stemPlowRuler.anchored:
-            self.oval_AnchorIndicatorLayer.setVisible(True)
-        else:
-            self.oval_AnchorIndicatorLayer.setVisible(False)
+        update = self.renderState.update
+        update(self.lineLayer, startPoint=self.nearestP1, endPoint=self.nearestP2)
+        update(self.oval_ALayer, position=self.nearestP1)
+        update(self.oval_BLayer, position=self.closestPointOnPath)
+        update(self.oval_CLayer, position=self.nearestP2)
+        update(
+            self.oval_AnchorIndicatorLayer,
+            position=self.closestPointOnPath,
+            visible=bool(
+                self.useShortcutToMoveWhileAlways and self.stemPlowRuler.anchored
+            ),
+        )
 
     def updateText(self):
         if self.showLaserMeasureNames:
@@ -562,45 +806,68 @@ class StemPlowSubscriber(subscriber.Subscriber):
             self.stemPlowRuler.clearNames()
 
         roundingFloatValue = self.stemPlowRuler.getRoundingFloatValue()
-        if round(self.measurementValue1) != 0 and self.textBoxCenter1 is not None:
-            self.text1Layer.setVisible(True)
-            self.text1Layer.setText(
-                str(round(self.measurementValue1, roundingFloatValue))
-            )
-            self.text1Layer.setPosition(self.textBoxCenter1)
-
-            ###
-            if self.stemPlowRuler.currentNames1:
-                self.namedValues1Layer.setText(
-                    formatNames(self.stemPlowRuler.currentNames1)
-                )
-                self.namedValues1Layer.setPosition(self.textBoxCenter1)
-                self.namedValues1Layer.setVisible(True)
-            else:
-                self.namedValues1Layer.setVisible(False)
+        self.updateValueText(
+            self.text1Layer,
+            self.namedValues1Layer,
+            self.measurementValue1,
+            self.textBoxCenter1,
+            self.stemPlowRuler.currentNamesText1,
+            roundingFloatValue,
+        )
+        self.updateValueText(
+            self.text2Layer,
+            self.namedValues2Layer,
+            self.measurementValue2,
+            self.textBoxCenter2,
+            self.stemPlowRuler.currentNamesText2,
+            roundingFloatValue,
+        )
+        self.updateMastersText(roundingFloatValue)
+
+    def updateValueText(
+        self, textLayer, namesLayer, value, textBoxCenter, namesText, roundingFloatValue
+    ):
+        update = self.renderState.update
+        if round(value) == 0 or textBoxCenter is None:
+            update(textLayer, visible=False)
+            update(namesLayer, visible=False)
+            return
+        update(
+            textLayer,
+            visible=True,
+            text=str(round(value, roundingFloatValue)),
+            position=textBoxCenter,
+        )
+        if namesText:
+            update(namesLayer, text=namesText, position=textBoxCenter, visible=True)
         else:
-            self.text1Layer.setVisible(False)
-            self.namedValues1Layer.setVisible(False)
+            update(namesLayer, visible=False)
+
+    def updateMastersText(self, roundingFloatValue):
+        update = self.renderState.update
+        if (
+            not self.measureAllMasters
+            or not self.masterMeasurements
+            or self.closestPointOnPath is None
+        ):
+            update(self.mastersLayer, visible=False)
+            return
 
-        if round(self.measurementValue2) != 0 and self.textBoxCenter2 is not None:
-            self.text2Layer.setVisible(True)
-            self.text2Layer.setText(
-                str(round(self.measurementValue2, roundingFloatValue))
+        lines = []
+        for measurement in self.masterMeasurements:
+            if measurement is None:
+                continue
+            lines.append(
+                f"{measurement.name}: "
+                f"{round(measurement.thickness1, roundingFloatValue)} | "
+                f"{round(measurement.thickness2, roundingFloatValue)}"
             )
-            self.text2Layer.setPosition(self.textBoxCenter2)
-
-            ###
-            if self.stemPlowRuler.currentNames2:
-                self.namedValues2Layer.setText(
-                    formatNames(self.stemPlowRuler.currentNames2)
-                )
-                self.namedValues2Layer.setPosition(self.textBoxCenter2)
-                self.namedValues2Layer.setVisible(True)
-            else:
-                self.namedValues2Layer.setVisible(False)
-        else:
-            self.text2Layer.setVisible(False)
-            self.namedValues2Layer.setVisible(False)
+        update(
+            self.mastersLayer,
+            text=formatNames(lines),
+            position=self.closestPointOnPath,
+            visible=bool(lines),
+        )
 
     # Objects
     # -------
@@ -619,10 +886,21 @@ class StemPlowSubscriber(subscriber.Subscriber):
 
 class StemPlowRuler:
     keyId = extensionKeyStub + "StemPlowRuler"
+    # the same key as StemPlowGuides.GUIDES_LIB_KEY, checked before the engine is imported
+    guidesKeyId = extensionKeyStub + "StemPlowGuides"
     anchored = False
     scale = None
     currentNames1 = None
     currentNames2 = None
+    currentNamesText1 = None
+    currentNamesText2 = None
+    namedValuesTolerance = 0
+    _namesKey = None
+
+    def __init__(self):
+        # made on the first measurement, with the preparation module
+        self.preparedGlyphs = None
+        self.namedValues = NamedValueIndex()
 
     def getRoundingFloatValue(self):
         # used for scaling
@@ -641,6 +919,10 @@ class StemPlowRuler:
                 roundingFloatValue = 3
         return roundingFloatValue
 
+    def getPrecision(self):
+        # solvers are exactly as precise as the displayed values need
+        return Engine.precisionForDecimals(self.getRoundingFloatValue())
+
     def setScale(self, value):
         self.scale = value
 
@@ -656,18 +938,18 @@ class StemPlowRuler:
         glyph = info["glyph"]
         if len(glyph.contours) == 0:
             # for glyphs with only components
-            glyph = copyDecomposedAndOverlaplessGlyph(glyph)
+            glyph = Preparation.copyDecomposedAndOverlaplessGlyph(glyph)
 
-        _, contour_index, segment_index, anchor_t = (
-            self.calculateDetailsForNearestPointOnCurve(
-                referencePointMethod(info), glyph
-            )
-        )
-        if None in (contour_index, segment_index, anchor_t):
+        position = referencePointMethod(info)
+        anchor = None
+        if position != (-7000, -7000):  # if anchor exist
+            anchor = self.measuringEngine.findAnchor(glyph, position)
+        if anchor is None:
             if self.keyId in glyph.lib.keys():
                 del glyph.lib[self.keyId]
             self.anchored = False
             return
+        contour_index, segment_index, anchor_t = anchor
         glyph.lib[self.keyId] = dict(
             contour_index=contour_index, segment_index=segment_index, anchor_t=anchor_t
         )
@@ -680,292 +962,150 @@ class StemPlowRuler:
             del glyph.lib[self.keyId]
         self.anchored = False
 
-    def getGuidesAndAnchoredPoint(self, data, glyph):
-        # position has to be there, but it will be set to None
-        assert (
-            data.get("position", None) is None
-        ), f"something wrong with placement of getGuidesAndAnchoredPoint method (position is {position})"
-        if not self.keyId in glyph.lib.keys():
-            self.anchorRuler(dict(glyph=glyph), findMiddleOfTheGlyph)
-
-        contour_index = data["anchorData"].get("contour_index")
-        segment_index = data["anchorData"].get("segment_index")
-        anchor_t = data["anchorData"].get("anchor_t")
-
-        contour = glyph.contours[contour_index]
-        segs = contour.segments
-        seg = segs[segment_index]
-        # rebuilding segment into system 2 points for line and 4 for curve (StemMath needs it):
-        points = [
-            segs[segment_index - 1][-1]
-        ]  # 1adding last point from previous segment
-
-        for point in seg.points:
-            points.append(point)  # 2 adding rest of points of the segment
-
-        if len(points) == 2:
-            P1, P2 = points
-
-            # # making sure that extension doesn't take open segment of the contour into count
-            # if P1.type == "line" and P2.type == "move":
-            #     continue
-
-            P1, P2 = ((P1.x, P1.y), (P2.x, P2.y))
-            guideline1, guideline2 = StemMath.calculateGuidesBasedOnT(
-                anchor_t, seg.type, P1, P2
-            )
-
-        if len(points) == 4:
-            P1, P2, P3, P4 = points
-            P1, P2, P3, P4 = (
-                (P1.x, P1.y),
-                (P2.x, P2.y),
-                (P3.x, P3.y),
-                (P4.x, P4.y),
-            )
-            guideline1, guideline2 = StemMath.calculateGuidesBasedOnT(
-                anchor_t, seg.type, P1, P2, P3, P4
-            )
-        onCurvePoint = guideline1[1]
-
-        return guideline1, guideline2, onCurvePoint
-
-    def calculateDetailsForNearestPointOnCurve(self, cursorPosition, glyph):
-
-        if cursorPosition != (-7000, -7000):  # if anchor exist
-            return StemMath.calculateDetailsForNearestPointOnCurve(
-                cursorPosition, glyph
-            )
-
     def loadDefaults(self):
         self.ignoreOverlapsFlag = internalGetDefault("ignoreOverlapsFlag")
         self.measureAgainstComponents = internalGetDefault("measureAgainstComponents")
         self.measureAgainstSideBearings = internalGetDefault(
             "measureAgainstSideBearings"
         )
-
-    def getGuidesAndClosestPoint(self, data, glyph):
-        """returns 2 intersection lists"""
-        closestPointsRef = []
-
-        if data["position"] != (-7000, -7000):  # if anchor exist
-            for contour in glyph.contours:
-                segs = contour.segments
-
-                for segIndex, seg in enumerate(segs):
-                    # rebuilding segment into system 2 points for line and 4 for curve (StemMath needs it):
-                    points = [
-                        segs[segIndex - 1][-1]
-                    ]  # 1adding last point from previous segment
-
-                    for point in seg.points:
-                        points.append(point)  # 2 adding rest of points of the segment
-
-                    if len(points) == 2:
-                        P1, P2 = points
-
-                        # making sure that extension doesn't take open segment of the contour into count
-                        if P1.type == "line" and P2.type == "move":
-                            continue
-
-                        P1, P2 = ((P1.x, P1.y), (P2.x, P2.y))
-                        l1, l2 = StemMath.stemThicknessGuidelines(
-                            data["position"], seg.type, P1, P2
-                        )
-
-                    if len(points) == 4:
-                        P1, P2, P3, P4 = points
-                        P1, P2, P3, P4 = (
-                            (P1.x, P1.y),
-                            (P2.x, P2.y),
-                            (P3.x, P3.y),
-                            (P4.x, P4.y),
-                        )
-                        l1, l2 = StemMath.stemThicknessGuidelines(
-                            data["position"], seg.type, P1, P2, P3, P4
-                        )
-                        #### TODO: Jesli seg.type == qcurve, to przerob to na StemMath.stemThicknessGuidelines(data["position"],seg.type,P1,P2,P3), wtedy zmien funkcje z TMath na takie, co to będą czystsze jesli chodzi o adekwatnosc do Cubic
-
-                    closestPoint = l1[1]
-                    closestPointsRef.append((closestPoint, l1, l2))
-
-            distances = []
-
-            for ref in closestPointsRef:
-                point = ref[0]
-                distance = StemMath.lengthAB(data["position"], point)
-                distances.append(distance)
-
-            indexOfClosestPoint = distances.index(min(distances))
-            closestPointOnPathRef = closestPointsRef[indexOfClosestPoint]
-            closestPointOnPath, guideline1, guideline2 = closestPointOnPathRef
-
-            A1, B1 = guideline1
-            A2, B2 = guideline2
-
-            return guideline1, guideline2, closestPointOnPath
+        self.namedValuesTolerance = internalGetDefault("namedValuesTolerance") or 0
 
     currentMeasurement1 = None
     currentMeasurement2 = None
 
-    def getThicknessData(self, data, glyph, method):
-        italicSlangAngle = (
-            glyph.font.info.italicAngle
-            if glyph.font.info.italicAngle is not None
-            else 0
-        )
-
-        italicSlantOffset = (
-            glyph.font.lib.get("com.typemytype.robofont.italicSlantOffset", 0)
-            if italicSlangAngle
-            else 0
-        )
-        if len(glyph.contours) == 0:
-            glyph = copyDecomposedGlyph(glyph)
-
-        if self.ignoreOverlapsFlag and not self.measureAgainstComponents:
-            glyph = copyOverlaplessGlyph(glyph)
-        elif not self.ignoreOverlapsFlag and self.measureAgainstComponents:
-            glyph = copyDecomposedGlyph(glyph)
-        elif self.ignoreOverlapsFlag and self.measureAgainstComponents:
-            glyph = copyDecomposedAndOverlaplessGlyph(glyph)
-
-        if self.measureAgainstSideBearings:
-            glyph = copyGlyphWithSidebearings(
-                glyph, italicSlantOffset, italicSlangAngle
-            )
-
-        guideline1, guideline2, closestPointOnPath = method(data, glyph)
+    _measuringEngine = None
+    _nearestTracker = None
 
-        textBoxCenter1 = None
-        nearestP1 = closestPointOnPath
-        thicknessValue1 = 0
-
-        textBoxCenter2 = None
-        nearestP2 = closestPointOnPath
-        thicknessValue2 = 0
+    @property
+    def nearestTracker(self):
+        # hovering starts the search from the previous nearest segment
+        if self._nearestTracker is None:
+            self._nearestTracker = StemMath.NearestSegmentTracker()
+        return self._nearestTracker
 
-        intersectionAB1 = StemMath.find_intersectionsForDefconGlyph(
-            glyph.naked(), *guideline1
-        )
-        intersectionAB2 = StemMath.find_intersectionsForDefconGlyph(
-            glyph.naked(),
-            *guideline2,
-            # canHaveComponent=self.measureAgainstComponents,
-            # addSideBearings=self.measureAgainstSideBearings,
+    @property
+    def measuringEngine(self):
+        # measuring itself doesn't depend on the settings, only the preparation does,
+        # but the precision follows the zoom
+        precision = self.getPrecision()
+        engine = self._measuringEngine
+        if engine is None or engine.precision != precision:
+            engine = self._measuringEngine = Engine.MeasurementEngine(precision=precision)
+        return engine
+
+    def getEngine(self, glyph):
+        """returns MeasurementEngine with the current settings and the italic angle of the glyph's font"""
+        settings = Engine.MeasurementSettings.fromFont(
+            glyph.font,
+            ignoreOverlaps=bool(self.ignoreOverlapsFlag),
+            measureAgainstComponents=bool(self.measureAgainstComponents),
+            measureAgainstSideBearings=bool(self.measureAgainstSideBearings),
         )
+        return Engine.MeasurementEngine(settings, self.getPrecision())
+
+    def prepareGeometry(self, glyph):
+        """returns geometry of the outline, that should be measured"""
+        engine = self.getEngine(glyph)
+        if self.preparedGlyphs is None:
+            self.preparedGlyphs = Preparation.GlyphPreparationCache()
+        # decomposing and removing overlaps is expensive, the geometry is
+        # reused until the glyph, its components or the settings change
+        return self.preparedGlyphs.get(glyph, engine.settings, engine.getGeometry)
+
+    def getThicknessData(self, data, glyph):
+        with instrumentation.glyph(glyph.name), instrumentation.stage("total"):
+            geometry = self.prepareGeometry(glyph)
+            geometry.prepareSearch()
+            thicknessData = self.computeThicknessData(geometry, data)
+        self.setCurrentMeasurements(thicknessData)
+        return thicknessData
+
+    def computeThicknessData(
+        self, geometry, data, isCancelled=None, engine=None, tracker=None
+    ):
+        """
+        getThicknessData for already prepared geometry.
+        data contains either the cursor "position" or "anchorData".
+        Outside of the main thread pass the engine and the tracker, then it
+        only reads the geometry and data and doesn't touch the ruler.
+        """
+        if engine is None:
+            engine = self.measuringEngine
+        if tracker is None:
+            tracker = self.nearestTracker
+        if data.get("position") is not None:
+            if data["position"] == (-7000, -7000):  # if anchor doesn't exist
+                return None
+            measurement = engine.measureAt(
+                geometry, data["position"], isCancelled, tracker
+            )
+        else:
+            anchorData = data["anchorData"]
+            measurement = engine.measureAnchor(
+                geometry,
+                anchorData.get("contour_index"),
+                anchorData.get("segment_index"),
+                anchorData.get("anchor_t"),
+                isCancelled,
+            )
+        if measurement is None:
+            return None
+        return measurement.asThicknessData()
 
-        # system of if-statemens to hack the iteration through nearestPoints = nearestPointFromList(closestPointOnPath,intersectionAB) kind of lists
-        if len(intersectionAB1) != 0:
-            nearestPoints1 = nearestPointFromList(closestPointOnPath, intersectionAB1)
-            if StemMath.lengthAB(nearestPoints1[0], closestPointOnPath) < 2.5:
-                # hack for guidelines going into space
-                if len(nearestPoints1) == 1:
-                    nearestP1 = nearestPoints1[0]
-
-                else:
-                    nearestP1 = nearestPoints1[1]
-            else:
-                nearestP1 = nearestPoints1[0]
-
-            textBoxCenter1 = StemMath.calcLine(0.5, closestPointOnPath, nearestP1)
-            thicknessValue1 = StemMath.lengthAB(closestPointOnPath, nearestP1)
-
-        # system of if-statemens to hack the iteration through nearestPoints = self.nearestPointFromList(closestPointOnPath,intersectionAB) kind of lists
-        if len(intersectionAB2) != 0:
-            nearestPoints2 = nearestPointFromList(closestPointOnPath, intersectionAB2)
-            if StemMath.lengthAB(nearestPoints2[0], closestPointOnPath) < 2.5:
-                # hack for guidelines going into space
-                if len(nearestPoints2) == 1:
-                    nearestP2 = nearestPoints2[0]
-                else:
-                    nearestP2 = nearestPoints2[1]
-            else:
-                nearestP2 = nearestPoints2[0]
-
-            textBoxCenter2 = StemMath.calcLine(0.5, closestPointOnPath, nearestP2)
-            thicknessValue2 = StemMath.lengthAB(closestPointOnPath, nearestP2)
-
+    def setCurrentMeasurements(self, thicknessData):
         ################
         # Named Values
-        self.currentMeasurement1 = thicknessValue1
-        self.currentMeasurement2 = thicknessValue2
-
-        return (
-            textBoxCenter1,
-            thicknessValue1,
-            nearestP1,
-            textBoxCenter2,
-            thicknessValue2,
-            nearestP2,
-            closestPointOnPath,
-        )
+        if thicknessData is None:
+            return
+        self.currentMeasurement1 = thicknessData[1]
+        self.currentMeasurement2 = thicknessData[4]
 
     def clearNames(self):
         self.currentNames1 = None
         self.currentNames2 = None
+        self.currentNamesText1 = None
+        self.currentNamesText2 = None
+        self._namesKey = None
 
     def findNames(self):
-        self.clearNames()
         if self.currentMeasurement1 is None or self.currentMeasurement2 is None:
+            self.clearNames()
             return
-        m1 = round(self.currentMeasurement1)
-        names = self.namedWidthMeasurements1.get(m1, [])
-        names += self.namedHeightMeasurements1.get(m1, [])
+        tolerance = self.namedValuesTolerance
+        # names are matched with the rounded values, usually they stay the same
+        key = (
+            round(self.currentMeasurement1),
+            round(self.currentMeasurement2),
+            tolerance,
+            self.namedValues,
+        )
+        if key == self._namesKey:
+            return
+        self.clearNames()
+        self._namesKey = key
+        names = [
+            namedValue.label
+            for namedValue in self.namedValues.matching(
+                self.currentMeasurement1, tolerance
+            )
+        ]
         if names:
             self.currentNames1 = names
+            self.currentNamesText1 = formatNames(names)
 
-        m2 = round(self.currentMeasurement2)
-        names = self.namedWidthMeasurements2.get(m2, [])
-        names += self.namedHeightMeasurements2.get(m2, [])
+        names = [
+            namedValue.label
+            for namedValue in self.namedValues.matching(
+                self.currentMeasurement2, tolerance
+            )
+        ]
         if names:
             self.currentNames2 = names
+            self.currentNamesText2 = formatNames(names)
 
     def loadNamedMeasurements(self, font):
-        libKey = "com.typesupply.LaserMeasure.measurements"
-        stored = font.lib.get(libKey, {})
-        self.namedWidthMeasurements1 = {}
-        self.namedWidthMeasurements2 = {}
-        self.namedHeightMeasurements1 = {}
-        self.namedHeightMeasurements2 = {}
-        for name, data in stored.items():
-            width = data.get("width")
-            height = data.get("height")
-            key = None
-            location1 = None
-            location2 = None
-
-            if width is not None:
-                location1 = self.namedWidthMeasurements1
-                location2 = self.namedWidthMeasurements2
-                key = width
-                name = f"W: {name}"
-
-            elif height is not None:
-                location1 = self.namedHeightMeasurements1
-                location2 = self.namedHeightMeasurements2
-                key = height
-                name = f"H: {name}"
-
-            if location1 is not None:
-                if key not in location1:
-                    location1[key] = []
-                location1[key].append(name)
-
-            if location2 is not None:
-                if key not in location2:
-                    location2[key] = []
-                location2[key].append(name)
-
-        dicts = [
-            self.namedWidthMeasurements1,
-            self.namedWidthMeasurements2,
-            self.namedHeightMeasurements1,
-            self.namedHeightMeasurements2,
-        ]
-        for d in dicts:
-            for d, v in d.items():
-                v.sort()
+        # rebuilt only when the measurements of the font change
+        self.namedValues = NamedValueIndex.fromFont(font)
 
 
 try:
@@ -0,0 +1,102 @@
+import functools
+import threading
+import traceback
+
+from stemPlow.StemPlowScheduler import dispatchOnMainQueue
+
+
+class Cancelled(Exception):
+    """Raised inside of a job, when a newer request made it obsolete."""
+
+
+class MeasurementWorker:
+    """
+    Runs measurement jobs on a single background thread.
+
+    Every submitted job gets a generation number. Submitting a new job (or
+    calling `cancel`) makes the previous one obsolete: it won't be started if
+    it is still waiting, and a job that is already running can check
+    `isCancelled` and give up. Results are passed to the callback on the main
+    thread, and only when they belong to the current generation, so the UI
+    never shows a stale measurement.
+
+    Jobs must not touch fontParts objects or Merz layers,
+    they should only read immutable data (like GlyphGeometry).
+    """
+
+    def __init__(self, dispatch=dispatchOnMainQueue):
+        self.dispatch = dispatch
+        self.cancelledCount = 0
+        self._condition = threading.Condition()
+        self._generation = 0
+        self._job = None
+        self._thread = None
+
+    def submit(self, job, callback):
+        """
+        Schedules job(isCancelled) on the worker thread.
+        callback(result) is called on the main thread, if the job is still current.
+        """
+        with self._condition:
+            if self._job is not None:
+                self.cancelledCount += 1
+            self._generation += 1
+            self._job = (self._generation, job, callback)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="StemPlowWorker", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+
+    def cancel(self):
+        with self._condition:
+            if self._job is not None:
+                self.cancelledCount += 1
+            self._generation += 1
+            self._job = None
+
+    def stop(self):
+        """Cancels the current job and lets the thread finish."""
+        with self._condition:
+            self._generation += 1
+            self._job = None
+            self._thread = None
+            self._condition.notify_all()
+
+    def _isCurrent(self, generation):
+        return generation == self._generation
+
+    def _run(self):
+        thread = threading.current_thread()
+        while True:
+            with self._condition:
+                while self._job is None and self._thread is thread:
+                    self._condition.wait()
+                if self._thread is not thread:
+                    # stopped
+                    return
+                generation, job, callback = self._job
+                self._job = None
+
+            def isCancelled():
+                return not self._isCurrent(generation)
+
+            try:
+                result = job(isCancelled)
+            except Cancelled:
+                continue
+            except Exception:
+                traceback.print_exc()
+                continue
+
+            if isCancelled():
+                continue
+            self.dispatch(
+                functools.partial(self._deliver, generation, callback, result)
+            )
+
+    def _deliver(self, generation, callback, result):
+        # called on the main thread, newer request could come in the meantime
+        if self._isCurrent(generation):
+            callback(result)
@@ -1,23 +1,32 @@
 
 
-from __future__ import division
+from __future__ import annotations, division
 
+import bisect
+import importlib
 import math
 from dataclasses import dataclass
 from numbers import Number
-from typing import Any, Sequence
+from typing import TYPE_CHECKING, Any, Sequence
 
-from fontParts.base import BaseSegment
 from fontTools.misc.bezierTools import (
     splitCubicAtT,
     splitQuadraticAtT,
     curveLineIntersections,
     lineLineIntersections,
+    solveCubic,
 )
 
 
 ACCURACY = 18
 
+# "newton" – coarse pass refined with Halley's method, within TOLERANCE
+# "bisection" – fixed 12 rounds of LUT search (previous behaviour)
+SOLVER = "newton"
+TOLERANCE = 1e-7  # in t-factor units
+MAX_ITERATIONS = 12
+ORIGIN_TOLERANCE = 0.01  # ray hits closer to the origin are the origin itself
+
 __version__ = "0.1.4"
 
 
@@ -36,12 +45,13 @@ class SegmentInfo:
         return tuple(point[1] for point in self.points)
 
 
-def calculateDetailsForNearestPointOnCurve(cursorPosition, glyph):
+def calculateDetailsForNearestPointOnCurve(cursorPosition, glyph, precision=None):
     """
     Calculate details for the nearest point on a curve to the given cursor position within a glyph.
     Args:
         cursorPosition (tuple): A tuple (x, y) representing the cursor position.
-        glyph (Glyph): A glyph object containing contours and segments.
+        glyph (Glyph | GlyphGeometry): A glyph object containing contours and segments.
+        precision (float): see tToleranceForPrecision.
     Returns:
         tuple: A tuple containing:
             - closestPoint (tuple): The coordinates (x, y) of the closest point on the curve.
@@ -49,45 +59,163 @@ def calculateDetailsForNearestPointOnCurve(cursorPosition, glyph):
             - segment_index (int): The index of the segment containing the closest point.
             - t (float): The parameter t at which the closest point lies on the segment.
     """
+    geometry = getGlyphGeometry(glyph)
+    index, closestPoint, t = findNearestSegment(
+        cursorPosition, geometry, precision=precision
+    )
 
-    closestPointsRef = []
+    if index is None:
+        return None, None, None, None
 
-    for contour_index, contour in enumerate(glyph.contours):
-        for segIndex, seg in enumerate(contour.segments):
-            points = [contour.segments[segIndex - 1][-1]] + list(seg.points)
+    contour_index = geometry.contourIndexes[index]
+    segment_index = geometry.segmentIndexes[index]
+    return closestPoint, contour_index, segment_index, t
 
-            if len(points) == 2:
-                P1, P2 = points
-                if P1.type == "line" and P2.type == "move":
-                    continue
-                P1, P2 = ((P1.x, P1.y), (P2.x, P2.y))
-                closestPoint, contour_index, segment_index, _, t = getClosestInfo(
-                    cursorPosition, seg, P1, P2
-                )
 
-            elif len(points) == 4:
-                P1, P2, P3, P4 = points
-                P1, P2, P3, P4 = (
-                    (P1.x, P1.y),
-                    (P2.x, P2.y),
-                    (P3.x, P3.y),
-                    (P4.x, P4.y),
-                )
-                closestPoint, contour_index, segment_index, _, t = getClosestInfo(
-                    cursorPosition, seg, P1, P2, P3, P4
-                )
+def calculateGuidesForNearestPointOnCurve(
+    cursorPosition, glyph, precision=None, tracker=None
+):
+    """
+    Calculate stem thickness guidelines at the nearest point on a curve to the given cursor position.
+    Args:
+        cursorPosition (tuple): A tuple (x, y) representing the cursor position.
+        glyph (Glyph | GlyphGeometry): A glyph object containing contours and segments.
+        precision (float): see tToleranceForPrecision.
+        tracker (NearestSegmentTracker): warm start from the previous cursor position.
+    Returns:
+        tuple: (guideline1, guideline2, closestPoint) or None, if glyph has no segments.
+    """
+    geometry = getGlyphGeometry(glyph)
+    # constraint lines (sidebearings) can be measured from as well
+    lineDistance, line, lineT = nearestConstraintLine(cursorPosition, geometry)
+    if tracker is not None:
+        index, _, t = tracker.find(cursorPosition, geometry, lineDistance, precision)
+    else:
+        index, _, t = findNearestSegment(
+            cursorPosition, geometry, lineDistance, precision
+        )
 
-            closestPointsRef.append((closestPoint, contour_index, segment_index, t))
+    if index is not None:
+        segType, points = geometry.segmentTypes[index], geometry.segmentPoints[index]
+    elif line is not None:
+        segType, points, t = "line", line, lineT
+    else:
+        return None
 
-    if not closestPointsRef:
-        return None, None, None, None
+    guideline1, guideline2 = calculateGuidesForSegment(t, segType, *points)
+    return guideline1, guideline2, guideline1[1]
 
-    closestPointOnPathRef = min(
-        closestPointsRef, key=lambda ref: lengthAB(cursorPosition, ref[0])
-    )
-    closestPoint, contour_index, segment_index, t = closestPointOnPathRef
 
-    return closestPoint, contour_index, segment_index, t
+def findNearestSegment(cursorPosition, geometry, bound=math.inf, precision=None):
+    """
+    Finds the segment of the geometry nearest to the cursor position.
+    Segments, which control point boxes are farther than the best distance found so far,
+    are skipped (see spatial.SegmentBVH). The closest point is found within precision
+    (see tToleranceForPrecision).
+    Returns:
+        tuple: (index, closestPoint, t), index is the flat segment index of the geometry
+        or None when no segment is closer than bound.
+    """
+    evaluate = _segmentDistance(cursorPosition, geometry, precision)
+    index, _, payload = geometry.searchIndex.nearest(cursorPosition, evaluate, bound)
+    if index is None:
+        return None, None, None
+    closestPoint, t = payload
+    return index, closestPoint, t
+
+
+def _segmentDistance(cursorPosition, geometry, precision):
+    piecesOf = geometry.segmentPieces
+
+    def evaluate(index):
+        result = closestPointOnPieces(cursorPosition, piecesOf(index), precision)
+        if result is None:
+            return math.inf, None
+        return result.distance, (result.point, result.t)
+
+    return evaluate
+
+
+class NearestSegmentTracker:
+    """
+    Warm start of findNearestSegment for the cursor hovering over the same geometry.
+
+    Every full search also finds the clearance: all the other segments are at
+    least that far from the cursor. Distance to a segment changes at most by
+    the distance the cursor moved, so while the previous winner is closer than
+    the clearance minus the distance travelled, it is proven to be the nearest
+    segment, and only that segment is solved.
+    """
+
+    def __init__(self):
+        # (geometry, cursorPosition, index, clearance) of the last full search
+        self._state = None
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self._state = None
+
+    def find(self, cursorPosition, geometry, bound=math.inf, precision=None):
+        """Same as findNearestSegment."""
+        state = self._state
+        if state is not None and state[0] is geometry:
+            _, origin, index, clearance = state
+            result = closestPointOnPieces(
+                cursorPosition, geometry.segmentPieces(index), precision
+            )
+            if result is not None and result.distance <= clearance - lengthAB(
+                cursorPosition, origin
+            ):
+                self.hits += 1
+                if result.distance >= bound:
+                    return None, None, None
+                return index, result.point, result.t
+
+        self.misses += 1
+        # the bound isn't used for pruning, so the clearance holds for any bound
+        evaluate = _segmentDistance(cursorPosition, geometry, precision)
+        index, distance, payload, clearance = geometry.searchIndex.nearestWithClearance(
+            cursorPosition, evaluate
+        )
+        if index is None:
+            self._state = None
+            return None, None, None
+        self._state = (geometry, tuple(cursorPosition), index, clearance)
+        if distance >= bound:
+            return None, None, None
+        closestPoint, t = payload
+        return index, closestPoint, t
+
+
+def nearestConstraintLine(cursorPosition, geometry):
+    """
+    Returns (distance, line, t) of the constraint line of the geometry nearest
+    to the cursor position, (inf, None, None) when there are no constraint lines.
+    """
+    best = (math.inf, None, None)
+    for line in geometry.constraintLines:
+        result = _closestPointOnLine(cursorPosition, *line)
+        if result.distance < best[0]:
+            best = (result.distance, line, result.t)
+    return best
+
+
+def calculateGuidesForAnchor(glyph, contour_index, segment_index, t):
+    """
+    Calculate stem thickness guidelines for the point anchored to the segment.
+    Args:
+        glyph (Glyph | GlyphGeometry): A glyph object containing contours and segments.
+        contour_index (int), segment_index (int), t (float): anchor on the glyph's outline.
+    Returns:
+        tuple: (guideline1, guideline2, onCurvePoint) or None, if the segment doesn't exist.
+    """
+    segment = getGlyphGeometry(glyph).segment(contour_index, segment_index)
+    if segment is None:
+        return None
+    segType, points = segment
+    guideline1, guideline2 = calculateGuidesForSegment(t, segType, *points)
+    return guideline1, guideline2, guideline1[1]
 
 
 def calculateDetailsForNearestPointOnCurveBoolean(cursorPosition, glyph):
@@ -197,6 +325,16 @@ def getClosestInfo(
     """
     Returns info about the closest point on the curve.
     """
+    if SOLVER == "newton":
+        result = closestPointAndT_newtonSearch(cursorPoint, segment.type, *points)
+        return (
+            result.point,
+            segment.contour.index,
+            segment.index,
+            points,
+            result.t,
+        )
+
     curve, (contour_index, segment_index, segPoints, curr_t) = (
         closestPointAndT_binaryIndexSearch_withSegments(cursorPoint, segment, *points)
     )
@@ -212,6 +350,27 @@ def closestPointAndT_binaryIndexSearch_withSegments(
     Sequence[Sequence[Number]],
     tuple[int, int, Sequence[Sequence[Number]], Number],
 ]:
+    points, curr_mid_t = _binaryIndexSearch(pointOffCurve, segment.type, *segPoints)
+    return points, (segment.contour.index, segment.index, segPoints, curr_mid_t)
+
+
+def _binaryIndexSearch(
+    pointOffCurve: Sequence[Number],
+    segType: str,
+    *segPoints: Sequence[Sequence[Number]],
+) -> tuple[Sequence[Sequence[Number]], Number]:
+    if segType == "qcurve" and len(segPoints) > 3:
+        # the LUT and the split know only single quadratic curves, so every
+        # piece is searched and t is mapped back to the segment (see segmentPieces)
+        pieces = segmentPieces(segType, segPoints)
+        best = None
+        for index, piece in enumerate(pieces):
+            curve, t = _binaryIndexSearch(pointOffCurve, segType, *piece)
+            distance = lengthAB(pointOffCurve, calcSeg(t, *curve))
+            if best is None or distance < best[0]:
+                best = (distance, curve, (index + t) / len(pieces))
+        _, curve, t = best
+        return curve, t
 
     curveDiv = ACCURACY
     points = segPoints
@@ -220,18 +379,10 @@ def closestPointAndT_binaryIndexSearch_withSegments(
     curr_right_t = 1
 
     for _ in range(12):
-        LUT = getLut(segment.type, accuracy=ACCURACY, points=points)
-        minimalDist = float("inf")
-
-        for i in range(curveDiv + 1):
-            t = i / curveDiv
-            distance = lengthAB(pointOffCurve, LUT[(i, t)])
+        LUT = getLut(segType, accuracy=curveDiv, points=points)
+        best_t = closestLutIndex(pointOffCurve, LUT)[0] / curveDiv
 
-            if distance < minimalDist:
-                minimalDist = distance
-                best_t = t
-
-        points1, points2 = splitSegAtT(segment.type, points, 0.5)
+        points1, points2 = splitSegAtT(segType, points, 0.5)
 
         if best_t >= 0.5:
             points = points2
@@ -242,7 +393,266 @@ def closestPointAndT_binaryIndexSearch_withSegments(
             curr_right_t = curr_mid_t
             curr_mid_t = (curr_left_t + curr_mid_t) / 2
 
-    return points, (segment.contour.index, segment.index, segPoints, curr_mid_t)
+    return points, curr_mid_t
+
+
+@dataclass
+class SolverResult:
+    t: float
+    point: Sequence[Number]
+    distance: float
+    iterations: int
+    converged: bool
+
+
+def closestPointAndT_newtonSearch(
+    pointOffCurve: Sequence[Number],
+    segType: str,
+    *points: Sequence[Sequence[Number]],
+    tolerance: float = None,
+    maxIterations: int = None,
+) -> SolverResult:
+    """
+    Finds the closest point on the segment to pointOffCurve.
+    Coarse pass over ACCURACY samples is refined with Halley's method applied to
+    the projection equation (B(t) - P)·B'(t) = 0. The result is converged, when
+    the local minimum is bracketed within tolerance of its t-factor: the equation
+    changes its sign there. If Halley's steps don't get there, the minimum is
+    bisected between the samples around it.
+    A curve can pass near the point twice, so the two closest local minima of
+    the samples are refined, each within the samples around it (Halley's
+    steps can jump to the other minimum otherwise). The second one is skipped,
+    when the curve around it can't get closer than the first result.
+    """
+    tolerance = TOLERANCE if tolerance is None else tolerance
+    maxIterations = MAX_ITERATIONS if maxIterations is None else maxIterations
+
+    if len(points) == 2:
+        return _closestPointOnLine(pointOffCurve, *points)
+
+    if segType == "qcurve":
+        # quadratic pieces have closed form solution, nothing to iterate
+        return closestPointOnPieces(pointOffCurve, segmentPieces(segType, points))
+
+    if len(points) != 4:
+        raise ValueError("Invalid number of points for the given segment type")
+
+    px, py = pointOffCurve
+    (x0, y0), (x1, y1), (x2, y2), (x3, y3) = points
+    ax, ay = -x0 + 3 * x1 - 3 * x2 + x3, -y0 + 3 * y1 - 3 * y2 + y3
+    bx, by = 3 * x0 - 6 * x1 + 3 * x2, 3 * y0 - 6 * y1 + 3 * y2
+    cx, cy = 3 * (x1 - x0), 3 * (y1 - y0)
+    dx, dy = x0 - px, y0 - py
+
+    def distanceSquared(t):
+        x = ((ax * t + bx) * t + cx) * t + dx
+        y = ((ay * t + by) * t + cy) * t + dy
+        return x * x + y * y
+
+    def projection(t):
+        x = ((ax * t + bx) * t + cx) * t + dx
+        y = ((ay * t + by) * t + cy) * t + dy
+        d1x = (3 * ax * t + 2 * bx) * t + cx
+        d1y = (3 * ay * t + 2 * by) * t + cy
+        return x * d1x + y * d1y
+
+    def brackets(low, high):
+        # (B - P)·B' goes from negative to positive across a local minimum of the
+        # distance, ends of the curve are local minima, when it points outwards
+        return (low == 0 or projection(low) <= 0) and (
+            high == 1 or projection(high) >= 0
+        )
+
+    def refine(index):
+        # Halley's steps stay between the neighbouring samples, a local minimum
+        # of the samples has a local minimum of the curve there
+        low, high = max(0.0, (index - 1) / ACCURACY), min(1.0, (index + 1) / ACCURACY)
+        t = index / ACCURACY
+        if t in (0, 1) and brackets(t, t):
+            # the curve ends closest to the point, nothing to refine
+            return t, distanceSquared(t), 0, True
+        iterations = 0
+        converged = False
+        while iterations < maxIterations:
+            iterations += 1
+            # B(t) - P, B'(t), B''(t)
+            x = ((ax * t + bx) * t + cx) * t + dx
+            y = ((ay * t + by) * t + cy) * t + dy
+            d1x = (3 * ax * t + 2 * bx) * t + cx
+            d1y = (3 * ay * t + 2 * by) * t + cy
+            d2x = 6 * ax * t + 2 * bx
+            d2y = 6 * ay * t + 2 * by
+            # projection equation and its two derivatives
+            f = x * d1x + y * d1y
+            df = d1x * d1x + d1y * d1y + x * d2x + y * d2y
+            ddf = 3 * (d1x * d2x + d1y * d2y) + 6 * (x * ax + y * ay)
+            denominator = 2 * df * df - f * ddf
+            if denominator == 0:
+                break
+            new_t = t - 2 * f * df / denominator
+            if new_t < low:
+                new_t = low
+            elif new_t > high:
+                new_t = high
+            step = t - new_t
+            t = new_t
+            if abs(step) < tolerance:
+                converged = True
+                break
+        # small step doesn't prove much, the minimum has to be within tolerance
+        if converged and not brackets(max(0.0, t - tolerance), min(1.0, t + tolerance)):
+            converged = False
+        if not converged and brackets(low, high):
+            # the minimum stays between low and high, like in _bisectionRounds
+            rounds = max(0, math.ceil(math.log2((high - low) / tolerance)))
+            for _ in range(rounds):
+                middle = (low + high) / 2
+                if projection(middle) < 0:
+                    low = middle
+                else:
+                    high = middle
+            t = (low + high) / 2
+            iterations += rounds
+            converged = True
+        return t, distanceSquared(t), iterations, converged
+
+    LUT = getLut(segType, points, ACCURACY)
+    seeds = closestLutMinima(pointOffCurve, LUT)
+    bestIndex, minimalDist = seeds[0]
+    t, distance, iterations, converged = refine(bestIndex)
+    if len(seeds) > 1:
+        otherIndex, otherDist = seeds[1]
+        # between the samples the curve is at most h² / 8 * max |B''| away from
+        # their chords (B'' is linear, its maximum is at one of the ends), so around
+        # the other minimum it's at most the longer chord and that far from its sample
+        flatness = max(
+            math.hypot(2 * bx, 2 * by), math.hypot(6 * ax + 2 * bx, 6 * ay + 2 * by)
+        ) / (8 * ACCURACY * ACCURACY)
+        sample = LUT[otherIndex]
+        reach = flatness + max(
+            lengthAB(sample, LUT[max(otherIndex - 1, 0)]),
+            lengthAB(sample, LUT[min(otherIndex + 1, ACCURACY)]),
+        )
+        if math.sqrt(otherDist) - reach < math.sqrt(min(distance, minimalDist)):
+            other_t, other, otherIterations, otherConverged = refine(otherIndex)
+            iterations += otherIterations
+            if other < distance:
+                t, distance, converged = other_t, other, otherConverged
+
+    if distance > minimalDist:
+        # refinement didn't get closer than the coarse pass
+        t, distance = bestIndex / ACCURACY, minimalDist
+        converged = brackets(t, t)
+
+    point = calcBezier(t, *points)
+    return SolverResult(t, point, math.sqrt(distance), iterations, converged)
+
+
+def _closestPointOnLine(
+    pointOffCurve: Sequence[Number], a: Sequence[Number], b: Sequence[Number]
+) -> SolverResult:
+    (ax, ay), (bx, by) = a, b
+    px, py = pointOffCurve
+    vx, vy = bx - ax, by - ay
+    lengthSquared = vx * vx + vy * vy
+    if lengthSquared == 0:
+        t = 0.0
+    else:
+        t = min(1.0, max(0.0, ((px - ax) * vx + (py - ay) * vy) / lengthSquared))
+    point = (ax + vx * t, ay + vy * t)
+    return SolverResult(t, point, lengthAB(pointOffCurve, point), 0, True)
+
+
+def _closestPointOnQuadratic(
+    pointOffCurve: Sequence[Number],
+    p1: Sequence[Number],
+    h: Sequence[Number],
+    p2: Sequence[Number],
+) -> SolverResult:
+    """
+    Closed form closest point on the quadratic curve. With B(t) = a·t² + 2b·t + p1
+    the projection equation (B(t) - P)·B'(t) = 0 is a cubic, its roots in 0...1 and
+    both ends of the curve are the only candidates.
+    """
+    px, py = pointOffCurve
+    (x0, y0), (x1, y1), (x2, y2) = p1, h, p2
+    ax, ay = x0 - 2 * x1 + x2, y0 - 2 * y1 + y2
+    bx, by = x1 - x0, y1 - y0
+    dx, dy = x0 - px, y0 - py
+    c3 = ax * ax + ay * ay
+    c2 = 3 * (ax * bx + ay * by)
+    c1 = 2 * (bx * bx + by * by) + ax * dx + ay * dy
+    c0 = bx * dx + by * dy
+
+    candidates = [0.0, 1.0]
+    for t in solveCubic(c3, c2, c1, c0):
+        # solveCubic rounds some of the roots, they're polished with Newton's method
+        for _ in range(2):
+            derivative = (3 * c3 * t + 2 * c2) * t + c1
+            if derivative == 0:
+                break
+            t -= (((c3 * t + c2) * t + c1) * t + c0) / derivative
+        if 0 < t < 1:
+            candidates.append(t)
+
+    best = None
+    for t in candidates:
+        x = (ax * t + 2 * bx) * t + dx
+        y = (ay * t + 2 * by) * t + dy
+        distance = x * x + y * y
+        if best is None or distance < best[0]:
+            best = (distance, t)
+    distance, t = best
+    point = calcQuadraticBezier(t, p1, h, p2)
+    return SolverResult(t, point, math.sqrt(distance), 0, True)
+
+
+def tToleranceForPrecision(points, precision):
+    """
+    Returns t-factor tolerance for precision (in font units), or None if precision
+    is None (solvers use their defaults). Derivative of a Bézier curve is bounded
+    by its degree times the longest leg of the control polygon, so points with
+    t-factors closer than the tolerance are closer than precision. The solvers
+    bracket their roots within the tolerance, so that's a bound of their error.
+    """
+    if precision is None:
+        return None
+    longestLeg = max(lengthAB(a, b) for a, b in zip(points, points[1:]))
+    if longestLeg == 0:
+        return 1.0
+    return precision / ((len(points) - 1) * longestLeg)
+
+
+def _closestPointOnPiece(pointOffCurve, piece, precision=None) -> SolverResult:
+    if len(piece) == 2:
+        return _closestPointOnLine(pointOffCurve, *piece)
+    if len(piece) == 3:
+        return _closestPointOnQuadratic(pointOffCurve, *piece)
+    if SOLVER == "newton":
+        return closestPointAndT_newtonSearch(
+            pointOffCurve,
+            "curve",
+            *piece,
+            tolerance=tToleranceForPrecision(piece, precision),
+        )
+    curve, t = _binaryIndexSearch(pointOffCurve, "curve", *piece)
+    point = calcSeg(t, *curve)
+    return SolverResult(t, point, lengthAB(pointOffCurve, point), 12, True)
+
+
+def closestPointOnPieces(pointOffCurve, pieces, precision=None) -> SolverResult | None:
+    """
+    Returns the closest point on the pieces of a segment (see segmentPieces),
+    t is the segment's t-factor. None if there are no pieces. Lines and quadratic
+    pieces are solved exactly, cubic ones within precision (see tToleranceForPrecision).
+    """
+    best = None
+    for index, piece in enumerate(pieces):
+        result = _closestPointOnPiece(pointOffCurve, piece, precision)
+        if best is None or result.distance < best.distance:
+            result.t = (index + result.t) / len(pieces)
+            best = result
+    return best
 
 
 def closestPointAndT_binaryIndexSearch(
@@ -254,17 +664,8 @@ def closestPointAndT_binaryIndexSearch(
 
     curveDiv = ACCURACY
     for _ in range(10):
-        LUT = getLut(segType, accuracy=ACCURACY, points=points)
-        minimalDist = float("inf")
-        best_t = 0
-
-        for i in range(curveDiv + 1):
-            t = i / curveDiv
-            distance = lengthAB(pointOffCurve, LUT[(i, t)])
-
-            if distance < minimalDist:
-                minimalDist = distance
-                best_t = t
+        LUT = getLut(segType, accuracy=curveDiv, points=points)
+        best_t = closestLutIndex(pointOffCurve, LUT)[0] / curveDiv
 
         points1, points2 = splitSegAtT(segType, points, 0.5)
 
@@ -306,6 +707,65 @@ def calculateGuidesBasedOnT(
     return guide1, guide2
 
 
+def calculateGuidesForSegment(
+    t: float, segType: str, *points: Sequence[Sequence[Number]]
+) -> tuple[
+    Sequence[Sequence[Number]],
+    Sequence[Sequence[Number]],
+]:
+    """
+    Same as calculateGuidesBasedOnT, but quadratic segments are evaluated
+    on their quadratic pieces (see segmentPieces).
+    """
+    if segType == "qcurve" and len(points) > 2:
+        pieces = segmentPieces(segType, points)
+        # t on the border of two pieces belongs to the first one
+        index = min(max(math.ceil(t * len(pieces)) - 1, 0), len(pieces) - 1)
+        return calculateGuidesBasedOnT(t * len(pieces) - index, segType, *pieces[index])
+    return calculateGuidesBasedOnT(t, segType, *points)
+
+
+def segmentPieces(
+    segType: str, points: Sequence[Sequence[Number]]
+) -> Sequence[Sequence[Sequence[Number]]]:
+    """
+    Returns segment as lines (2 points), quadratic (3 points) and cubic curves (4 points).
+    Quadratic segments with any number of off-curves are split in their implied
+    on-curve points, piece k of n covers t-factors from k / n to (k + 1) / n of the segment.
+    """
+    if len(points) == 2:
+        return (tuple(points),)
+    if segType == "qcurve":
+        offCurves = points[1:-1]
+        pieces = []
+        start = points[0]
+        for index, (x, y) in enumerate(offCurves):
+            if index == len(offCurves) - 1:
+                end = tuple(points[-1])
+            else:
+                nextX, nextY = offCurves[index + 1]
+                end = ((x + nextX) / 2, (y + nextY) / 2)
+            pieces.append((tuple(start), (x, y), end))
+            start = end
+        return tuple(pieces)
+    if len(points) == 4:
+        return (tuple(points),)
+    return ()
+
+
+def elevateQuadratic(
+    p1: Sequence[Number], h: Sequence[Number], p2: Sequence[Number]
+) -> Sequence[Sequence[Number]]:
+    """Returns cubic control points describing the same curve as quadratic p1, h, p2."""
+    (x1, y1), (hx, hy), (x2, y2) = p1, h, p2
+    return (
+        (x1, y1),
+        (x1 + 2 / 3 * (hx - x1), y1 + 2 / 3 * (hy - y1)),
+        (x2 + 2 / 3 * (hx - x2), y2 + 2 / 3 * (hy - y2)),
+        (x2, y2),
+    )
+
+
 def stemThicknessGuidelines(
     cursorPoint: Sequence[Number],
     segType: str,
@@ -319,33 +779,113 @@ def stemThicknessGuidelines(
     Returns two lines, each line has two points.
     Each point is represented as a tuple with x, y values.
     """
+    if SOLVER == "newton" or segType == "qcurve":
+        result = closestPointAndT_newtonSearch(cursorPoint, segType, *points)
+        return calculateGuidesForSegment(result.t, segType, *points)
+
     curveChopped = closestPointAndT_binaryIndexSearch(cursorPoint, segType, *points)
     return calculateGuidesBasedOnT(0.5, segType, *curveChopped)
 
 
-def getLut(
-    segType: str, points: Sequence[Sequence[Number]], accuracy: int = 12
-) -> dict[tuple[int, Number], Sequence[Number]]:
-    """Returns Look Up Table, which contains pointsOnPath for calcBezier/calcLine,
-    if getT=True then returns table with points and their factors"""
-    lut_table = {}
+_basisTables = {}
 
-    for i in range(accuracy + 1):
-        t = i / accuracy
 
-        if len(points) == 4:
-            if segType == "qcurve":
-                calc = calcQbezier(t, *points)
-            else:
-                calc = calcBezier(t, *points)
-        elif len(points) == 2:
-            calc = calcLine(t, *points)
-        else:
-            raise ValueError("Invalid number of points for the given segment type")
+def getBasis(degree: int, accuracy: int) -> tuple[tuple[float, ...], ...]:
+    """
+    Returns Bernstein basis of the given degree sampled at t = i / accuracy.
+    Row i holds the weights of the control points, so a point on the curve
+    is the dot product of the row and the points. Tables are cached per accuracy.
+    """
+    key = (degree, accuracy)
+    basis = _basisTables.get(key)
+    if basis is None:
+        rows = []
+        for i in range(accuracy + 1):
+            t = i / accuracy
+            rows.append(
+                tuple(
+                    math.comb(degree, k) * (1 - t) ** (degree - k) * t**k
+                    for k in range(degree + 1)
+                )
+            )
+        basis = _basisTables[key] = tuple(rows)
+    return basis
 
-        lut_table[(i, t)] = calc
 
-    return lut_table
+def getLut(
+    segType: str, points: Sequence[Sequence[Number]], accuracy: int = 12
+) -> list[tuple[Number, Number]]:
+    """
+    Returns Look Up Table – list of accuracy + 1 points on path,
+    point at index i has t-factor i / accuracy.
+    """
+    if len(points) == 4:
+        (x0, y0), (x1, y1), (x2, y2), (x3, y3) = points
+        return [
+            (
+                w0 * x0 + w1 * x1 + w2 * x2 + w3 * x3,
+                w0 * y0 + w1 * y1 + w2 * y2 + w3 * y3,
+            )
+            for w0, w1, w2, w3 in getBasis(3, accuracy)
+        ]
+    elif len(points) == 3:
+        (x0, y0), (x1, y1), (x2, y2) = points
+        return [
+            (w0 * x0 + w1 * x1 + w2 * x2, w0 * y0 + w1 * y1 + w2 * y2)
+            for w0, w1, w2 in getBasis(2, accuracy)
+        ]
+    elif len(points) == 2:
+        (x0, y0), (x1, y1) = points
+        return [
+            (w0 * x0 + w1 * x1, w0 * y0 + w1 * y1)
+            for w0, w1 in getBasis(1, accuracy)
+        ]
+    raise ValueError("Invalid number of points for the given segment type")
+
+
+def closestLutIndex(
+    pointOffCurve: Sequence[Number], LUT: Sequence[Sequence[Number]]
+) -> tuple[int, Number]:
+    """Returns index of the LUT point closest to pointOffCurve and its squared distance."""
+    px, py = pointOffCurve
+    bestIndex = 0
+    minimalDist = float("inf")
+    for i, (x, y) in enumerate(LUT):
+        distance = (x - px) * (x - px) + (y - py) * (y - py)
+        if distance < minimalDist:
+            minimalDist = distance
+            bestIndex = i
+    return bestIndex, minimalDist
+
+
+def closestLutMinima(
+    pointOffCurve: Sequence[Number], LUT: Sequence[Sequence[Number]]
+) -> list[tuple[int, Number]]:
+    """
+    Returns (index, squared distance) of the two LUT points closest to pointOffCurve
+    among those, that are closer than their neighbours (one, if there is only one).
+    """
+    px, py = pointOffCurve
+    best = second = None
+    previous = float("inf")
+    descending = True
+    for i, (x, y) in enumerate(LUT):
+        distance = (x - px) * (x - px) + (y - py) * (y - py)
+        if descending and distance > previous:
+            # previous point was a local minimum
+            if best is None or previous < best[1]:
+                best, second = (i - 1, previous), best
+            elif second is None or previous < second[1]:
+                second = (i - 1, previous)
+        descending = distance <= previous
+        previous = distance
+    if descending:
+        i = len(LUT) - 1
+        if best is None or previous < best[1]:
+            best, second = (i, previous), best
+        elif second is None or previous < second[1]:
+            second = (i, previous)
+    return [best] if second is None else [best, second]
 
 
 def sortPointsDistances(
@@ -386,36 +926,16 @@ def splitSegAtT(
     if len(points) == 2:
         a, b = points
         segments = splitLineAtT(a, b, t)
+    elif len(points) == 3:
+        segments = splitQuadraticAtT(*points, t)
     elif len(points) == 4:
-        a, b, c, d = points
-        if segType == "qcurve":
-            segments = splitQatT(a, b, c, d, t)
-        else:
-            segments = splitCubicAtT(a, b, c, d, t)
+        segments = splitCubicAtT(*points, t)
     else:
         raise ValueError("Invalid number of points for the given segment type")
 
     return segments
 
 
-def splitQatT(
-    p1: Sequence[Number],
-    h1: Sequence[Number],
-    h2: Sequence[Number],
-    p2: Sequence[Number],
-    t: Number,
-) -> Sequence[Sequence[Sequence[Number]]]:
-    """
-    Divides quadratic bezier paths into two at the given t factor.
-    """
-    c = calcLine(0.5, h1, h2)
-    split_1 = splitQuadraticAtT(p1, h1, c, t)
-    split_2 = splitQuadraticAtT(p2, h2, c, t)
-    div1 = [split_1[0][0], split_1[0][1], split_1[1][1], split_1[1][2]]
-    div2 = [split_2[1][2], split_2[1][1], split_2[0][1], split_2[0][0]]
-    return [div1, div2]
-
-
 def splitLineAtT(
     a: Sequence[Number],
     b: Sequence[Number],
@@ -435,6 +955,8 @@ def calcSeg(t: Number, *points: Sequence[Sequence[Number]]) -> Sequence[Number]:
     assert isinstance(t, Number), "calcSeg ERROR: t is not a number"
     if len(points) == 2:
         return calcLine(t, *points)
+    elif len(points) == 3:
+        return calcQuadraticBezier(t, *points)
     elif len(points) == 4:
         return calcBezier(t, *points)
     else:
@@ -510,21 +1032,6 @@ def calcBezier(t: Number, *pointList: Sequence[Sequence[Number]]) -> Sequence[Nu
     return x, y
 
 
-def calcQbezier(t: Number, *pointList: Sequence[Sequence[Number]]) -> Sequence[Number]:
-    """Returns coordinates for factor called 't' (from 0 to 1) based on Quadratic Bezier formula."""
-
-    assert len(pointList) == 4 and isinstance(t, Number)
-    p1, h1, h2, p2 = pointList
-    c = calcLine(0.5, h1, h2)
-
-    if t <= 0.5:
-        t_segment = t * 2
-        return calcQuadraticBezier(t_segment, p1, h1, c)
-    else:
-        t_segment = (t - 0.5) * 2
-        return calcQuadraticBezier(t_segment, p2, h2, c)
-
-
 def calcQuadraticBezier(
     t: float, *pointList: Sequence[Sequence[Number]]
 ) -> Sequence[Number]:
@@ -582,31 +1089,18 @@ def derivativeBezier(
     return summaX, summaY
 
 
-def derivativeQBezier(
-    t: float, *pointList: Sequence[Sequence[Number]]
+def derivativeQuadraticBezier(
+    t: float, p1: Sequence[Number], p2: Sequence[Number], p3: Sequence[Number]
 ) -> Sequence[Number]:
-    def derivativeQuadraticBezier(
-        t: float, p1: Sequence[Number], p2: Sequence[Number], p3: Sequence[Number]
-    ) -> Sequence[Number]:
-        """Calculates derivative values for given control points and current t-factor"""
-        p1x, p1y = p1
-        p2x, p2y = p2
-        p3x, p3y = p3
-
-        summaX = 2 * (1 - t) * (p2x - p1x) + 2 * t * (p3x - p2x)
-        summaY = 2 * (1 - t) * (p2y - p1y) + 2 * t * (p3y - p2y)
-
-        return summaX, summaY
-
-    assert len(pointList) == 4 and isinstance(t, Number)
-    p1, h1, h2, p2 = pointList
-    c = calcLine(0.5, h1, h2)
-    t_segment = t * 2 if t <= 0.5 else (t - 0.5) * 2
-    return (
-        derivativeQuadraticBezier(t_segment, p1, h1, c)
-        if t <= 0.5
-        else derivativeQuadraticBezier(t_segment, p2, h2, c)
-    )
+    """Calculates derivative values for given control points and current t-factor"""
+    p1x, p1y = p1
+    p2x, p2y = p2
+    p3x, p3y = p3
+
+    summaX = 2 * (1 - t) * (p2x - p1x) + 2 * t * (p3x - p2x)
+    summaY = 2 * (1 - t) * (p2y - p1y) + 2 * t * (p3y - p2y)
+
+    return summaX, summaY
 
 
 def calculateTangentAngle(
@@ -614,10 +1108,9 @@ def calculateTangentAngle(
 ) -> Number:
     """Calculates tangent angle for curve's/lines's current t-factor"""
     if len(points) == 4:
-        if segType == "qcurve":
-            xB, yB = derivativeQBezier(t, *points)
-        else:
-            xB, yB = derivativeBezier(t, *points)
+        xB, yB = derivativeBezier(t, *points)
+    elif len(points) == 3:
+        xB, yB = derivativeQuadraticBezier(t, *points)
     elif len(points) == 2:
         xB, yB = points[-1]
     else:
@@ -638,7 +1131,7 @@ def getPerpendicularLineToTangent(
     if t == 0:
         t = 0.001  # Avoid division by zero in calculateTangentAngle
 
-    if len(points) == 4:
+    if len(points) in (3, 4):
         tanAngle = calculateTangentAngle(segType, t, *points)
     elif len(points) == 2:
         A, B = points
@@ -659,6 +1152,23 @@ def getPerpendicularLineToTangent(
     return ((tanPx1, tanPy1), (0, 0)), ((0, 0), (tanPx2, tanPy2))
 
 
+from .geometry import GlyphGeometry, getGlyphGeometry, invalidateGlyphGeometry
+
+
+def __getattr__(name):
+    # numpy takes a while to import, vectorized is loaded on the first use
+    if name == "vectorized":
+        try:
+            vectorized = importlib.import_module(".vectorized", __name__)
+        except ImportError:
+            # numpy is not available, glyphs are searched with the BVH only
+            # and masters are measured one by one
+            vectorized = None
+        globals()["vectorized"] = vectorized
+        return vectorized
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 #########################################################################
 #########################################################################
 #########################################################################
@@ -667,82 +1177,172 @@ def getPerpendicularLineToTangent(
 #########################################################################
 #########################################################################
 
-from booleanOperations.booleanGlyph import BooleanGlyph
-from fontParts.base import BaseGlyph
+if TYPE_CHECKING:
+    # only for annotations, booleanOperations and fontParts aren't needed at runtime
+    from booleanOperations.booleanGlyph import BooleanGlyph
+    from fontParts.base import BaseGlyph, BaseSegment
 
 
 def find_intersectionsForDefconGlyph(
     glyph: BaseGlyph, line_start: tuple, line_end: tuple
 ) -> list:
-    intersections = []
+    """
+    Intersects line with the glyph, returns every hit. Only segments, which control
+    point boxes are crossed by the line, are intersected exactly (see spatial.SegmentBVH).
+    """
+    return [
+        point for point, _, _ in _iterLineHits(getGlyphGeometry(glyph), line_start, line_end)
+    ]
+
+
+def _iterLineHits(geometry, line_start, line_end, precision=None):
+    """Yields (point, segmentIndex, t) for every intersection of the line with the geometry."""
+    # guidelines are rotated, so a line through the end of a horizontal or vertical
+    # segment can miss its flat box by a rounding error
+    for index in geometry.searchIndex.crossedBy(line_start, line_end, ORIGIN_TOLERANCE):
+        pieces = geometry.segmentPieces(index)
+        for pieceIndex, piece in enumerate(pieces):
+            for point, t in calculate_intersections(
+                line_start, line_end, piece, precision
+            ):
+                yield point, index, (pieceIndex + t) / len(pieces)
 
-    for contour in glyph:
-        for segIndex, seg in enumerate(contour.segments):
-            points = [contour.segments[segIndex - 1][-1]] + seg
-            match len(points):
-                case 2:
-                    P1, P2 = points
-                    if P1.segmentType == "line" and P2.segmentType == "move":
-                        continue
-                    P1, P2 = ((P1.x, P1.y), (P2.x, P2.y))
-                    intersection = line_segment_intersection(
-                        line_start, line_end, P1, P2
-                    )
-                    if intersection is not None:
-                        intersections.append(intersection)
+    for start, end in geometry.constraintLines:
+        hit = _lineHit(line_start, line_end, start, end)
+        if hit is not None:
+            yield hit[0], None, hit[1]
 
-                case 4:
-                    P1, P2, P3, P4 = points
-                    P1, P2, P3, P4 = (
-                        (P1.x, P1.y),
-                        (P2.x, P2.y),
-                        (P3.x, P3.y),
-                        (P4.x, P4.y),
-                    )
-                    intersection = curve_intersection(
-                        line_start, line_end, (P1, P2, P3, P4)
-                    )
-                    if intersection is not None:
-                        intersections.append(intersection)
 
-    return intersections
+def _lineHit(line_start, line_end, start, end):
+    """
+    Returns (point, t) where the line from line_start to line_end crosses the line from start
+    to end (t is on the second one), or None. Closed form, for the constraint lines.
+    """
+    ax, ay = line_start
+    dx1, dy1 = line_end[0] - ax, line_end[1] - ay
+    bx, by = start
+    dx2, dy2 = end[0] - bx, end[1] - by
+    denominator = dx1 * dy2 - dy1 * dx2
+    if denominator == 0:
+        # parallel
+        return None
+    ex, ey = bx - ax, by - ay
+    s = (ex * dy2 - ey * dx2) / denominator
+    t = (ex * dy1 - ey * dx1) / denominator
+    if not (0 <= s <= 1 and 0 <= t <= 1):
+        return None
+    return (bx + t * dx2, by + t * dy2), t
+
+
+@dataclass(frozen=True)
+class RayHit:
+    """Intersection of the measuring line with a segment of GlyphGeometry."""
+
+    distance: float  # signed distance from the origin, positive towards end1
+    point: tuple
+    segment: int | None  # flat index of the segment in GlyphGeometry, None for constraint lines
+    t: float  # t-factor of the hit on the segment
+
+
+
+def find_rayHits(
+    glyph: BaseGlyph, origin: tuple, end1: tuple, end2: tuple, precision=None
+) -> list[RayHit]:
+    """
+    Intersects the glyph with the line from end1 to end2, which passes through origin,
+    in a single pass (both stem thickness guidelines are parts of the same line).
+    Hits are found within precision (see tToleranceForPrecision).
+    Returns:
+        list: every RayHit, ordered by the signed distance from the origin.
+    """
+    geometry = getGlyphGeometry(glyph)
+    ox, oy = origin
+    dx, dy = end1[0] - ox, end1[1] - oy
+    length = math.hypot(dx, dy)
+    nx, ny = dx / length, dy / length
+
+    hits = [
+        RayHit((point[0] - ox) * nx + (point[1] - oy) * ny, point, index, t)
+        for point, index, t in _iterLineHits(geometry, end1, end2, precision)
+    ]
+    hits.sort(key=lambda hit: hit.distance)
+    return hits
+
+
+def nearestRayHits(
+    hits: list[RayHit], tolerance: float = ORIGIN_TOLERANCE
+) -> tuple[RayHit | None, RayHit | None]:
+    """
+    Returns the nearest hit on both sides of the origin, skipping the origin itself
+    (hits closer than tolerance). Hits have to be ordered, like find_rayHits returns them.
+    """
 
+    def key(hit):
+        return hit.distance
 
-def find_intersectionsForGlyph(
-    glyph: BaseGlyph, line_start: tuple, line_end: tuple
-) -> list:
-    intersections = []
+    index1 = bisect.bisect_left(hits, tolerance, key=key)
+    index2 = bisect.bisect_right(hits, -tolerance, key=key) - 1
+    hit1 = hits[index1] if index1 < len(hits) else None
+    hit2 = hits[index2] if index2 >= 0 else None
+    return hit1, hit2
 
-    for contour in glyph.contours:
-        for segIndex, seg in enumerate(contour.segments):
-            points = [contour.segments[segIndex - 1][-1]] + list(seg.points)
-            match len(points):
-                case 2:
-                    P1, P2 = points
-                    if P1.type == "line" and P2.type == "move":
-                        continue
-                    P1, P2 = ((P1.x, P1.y), (P2.x, P2.y))
-                    intersection = line_segment_intersection(
-                        line_start, line_end, P1, P2
-                    )
-                    if intersection is not None:
-                        intersections.append(intersection)
 
-                case 4:
-                    P1, P2, P3, P4 = points
-                    P1, P2, P3, P4 = (
-                        (P1.x, P1.y),
-                        (P2.x, P2.y),
-                        (P3.x, P3.y),
-                        (P4.x, P4.y),
-                    )
-                    intersection = curve_intersection(
-                        line_start, line_end, (P1, P2, P3, P4)
-                    )
-                    if intersection is not None:
-                        intersections.append(intersection)
+def calculateThicknessData(glyph, guides, precision=None):
+    """
+    Measures the stem along the guides.
+    Args:
+        guides (tuple): (guideline1, guideline2, closestPointOnPath),
+            like calculateGuidesForNearestPointOnCurve returns them.
+        precision (float): see tToleranceForPrecision.
+    Returns:
+        tuple: (textBoxCenter1, thicknessValue1, nearestP1,
+                textBoxCenter2, thicknessValue2, nearestP2, closestPointOnPath)
+        or None if there are no guides.
+    """
+    if guides is None:
+        return None
+    guideline1, guideline2, closestPointOnPath = guides
+
+    textBoxCenter1 = None
+    nearestP1 = closestPointOnPath
+    thicknessValue1 = 0
+
+    textBoxCenter2 = None
+    nearestP2 = closestPointOnPath
+    thicknessValue2 = 0
+
+    # one pass over the whole measuring line, every hit ordered by its
+    # distance from closestPointOnPath (guideline1 side is positive)
+    hits = find_rayHits(
+        glyph, closestPointOnPath, guideline1[0], guideline2[1], precision
+    )
+    hit1, hit2 = nearestRayHits(hits)
+
+    if hit1 is not None:
+        nearestP1 = hit1.point
+        textBoxCenter1 = calcLine(0.5, closestPointOnPath, nearestP1)
+        thicknessValue1 = hit1.distance
+
+    if hit2 is not None:
+        nearestP2 = hit2.point
+        textBoxCenter2 = calcLine(0.5, closestPointOnPath, nearestP2)
+        thicknessValue2 = -hit2.distance
+
+    return (
+        textBoxCenter1,
+        thicknessValue1,
+        nearestP1,
+        textBoxCenter2,
+        thicknessValue2,
+        nearestP2,
+        closestPointOnPath,
+    )
 
-    return intersections
+
+def find_intersectionsForGlyph(
+    glyph: BaseGlyph, line_start: tuple, line_end: tuple
+) -> list:
+    return find_intersectionsForDefconGlyph(glyph, line_start, line_end)
 
 
 def find_intersectionsForBooleanGlyph(
@@ -815,11 +1415,120 @@ def calculate_intersection(line1_start, line1_end, points):
     if len(points) == 2:
         # Handle line segment intersection
         return line_segment_intersection(line1_start, line1_end, points[0], points[1])
+    elif len(points) == 3:
+        hits = _quadraticLineHits(line1_start, line1_end, points)
+        return hits[0][0] if hits else None
     elif len(points) == 4:
         # Handle curve intersection
         return curve_intersection(line1_start, line1_end, points)
 
 
+def calculate_intersections(line1_start, line1_end, points, precision=None):
+    """
+    Returns every (point, t) intersection of the line with the segment, t is the segment's t-factor.
+    Lines and quadratic curves are intersected exactly. With precision, t-factors of
+    the hits on cubic curves are within the tolerance of precision (see
+    tToleranceForPrecision) and refined with Newton's method if needed, see
+    _refineCurveHit.
+    """
+    if len(points) == 2:
+        return [
+            (i.pt, i.t1)
+            for i in lineLineIntersections(points[0], points[1], line1_start, line1_end)
+            if 0 <= i.t1 <= 1 and 0 <= i.t2 <= 1
+        ]
+    elif len(points) == 3:
+        return _quadraticLineHits(line1_start, line1_end, points)
+    elif len(points) == 4:
+        hits = [
+            (i.pt, i.t1)
+            for i in curveLineIntersections(points, (line1_start, line1_end))
+            if 0 <= i.t2 <= 1
+        ]
+        tolerance = tToleranceForPrecision(points, precision)
+        if hits and tolerance is not None:
+            hits = [
+                _refineCurveHit(line1_start, line1_end, points, t, tolerance)
+                for _, t in hits
+            ]
+        return hits
+    return []
+
+
+def _refineCurveHit(line_start, line_end, points, t, tolerance):
+    """
+    Returns (point, t) of the line/cubic hit. The hit is within tolerance of
+    the root, when the curve crosses the line between t ± tolerance, otherwise
+    (fontTools' solveCubic rounds some of the roots to 6 digits) it's refined
+    with Newton's method until it is. Tangential hits don't cross the line,
+    they keep the last Newton's step.
+    """
+    sx, sy = line_start
+    # normal of the line, distance from the line is its dot product with B(t) - start
+    nx, ny = sy - line_end[1], line_end[0] - sx
+
+    def side(t):
+        x, y = calcBezier(t, *points)
+        return nx * (x - sx) + ny * (y - sy)
+
+    def crosses(t):
+        return side(max(0.0, t - tolerance)) * side(min(1.0, t + tolerance)) <= 0
+
+    if crosses(t):
+        return calcBezier(t, *points), t
+    for _ in range(MAX_ITERATIONS):
+        dx, dy = derivativeBezier(t, *points)
+        slope = nx * dx + ny * dy
+        if slope == 0:
+            break
+        step = side(t) / slope
+        t = min(1.0, max(0.0, t - step))
+        if abs(step) < tolerance and crosses(t):
+            break
+    return calcBezier(t, *points), t
+
+
+def _quadraticLineHits(line_start, line_end, points):
+    """
+    Closed form intersections of the line with the quadratic curve. Distance of
+    B(t) from the line is a quadratic polynomial of t, its roots are the hits.
+    Returns list of (point, t), t is the curve's t-factor.
+    """
+    sx, sy = line_start
+    lx, ly = line_end[0] - sx, line_end[1] - sy
+    lengthSquared = lx * lx + ly * ly
+    if lengthSquared == 0:
+        return []
+    (x0, y0), (x1, y1), (x2, y2) = points
+    # normal of the line
+    nx, ny = -ly, lx
+    a = nx * (x0 - 2 * x1 + x2) + ny * (y0 - 2 * y1 + y2)
+    b = 2 * (nx * (x1 - x0) + ny * (y1 - y0))
+    c = nx * (x0 - sx) + ny * (y0 - sy)
+
+    if a == 0:
+        roots = [-c / b] if b != 0 else []
+    else:
+        discriminant = b * b - 4 * a * c
+        if discriminant < 0:
+            return []
+        # numerically stable form, without subtracting close values
+        q = -0.5 * (b + math.copysign(math.sqrt(discriminant), b))
+        roots = [q / a]
+        if discriminant > 0:
+            roots.append(c / q)
+
+    hits = []
+    for t in sorted(roots):
+        if not 0 <= t <= 1:
+            continue
+        x, y = calcQuadraticBezier(t, *points)
+        s = ((x - sx) * lx + (y - sy) * ly) / lengthSquared
+        if 0 <= s <= 1:
+            hits.append(((x, y), t))
+    return hits
+
+
 def line_segment_intersection(line1_start, line1_end, line2_start, line2_end):
     for i in lineLineIntersections(line2_start, line2_end, line1_start, line1_end):
         if 0 <= i.t1 <= 1 and 0 <= i.t2 <= 1:
@@ -832,53 +1541,3 @@ def curve_intersection(line_start, line_end, curve_points):
         if 0 <= i.t2 <= 1:
             return i.pt
     return None
-
-
-if __name__ == "__main__":
-    from pathlib import Path
-    from fontParts.world import OpenFont
-    import time
-
-    rfActive = False
-    try:
-        from mojo import tools  # type: ignore
-
-        font = CurrentFont()  # type: ignore
-        rfActive = True
-    except:
-        rootDir = Path(__file__).parent.parent
-        testsDir = rootDir / "tests"
-        UFOpath = testsDir / "_.ufo"
-        font = OpenFont(UFOpath)
-    ############################### XXX
-    rGlyph = font["test02"].copy()
-    refLine = (-50, -100), (600, 60)
-    ############################### XXX
-    if "intersectionTest" in font:
-        del font["intersectionTest"]
-
-    font["intersectionTest"] = rGlyph
-
-    rGlyph = font["intersectionTest"]
-
-    # glyph = BooleanGlyph(rGlyph)
-
-    # intersectionsA = find_intersectionsForBooleanGlyph(glyph, *refLine)
-
-    # TIME COMPARISON
-
-    start_time = time.time()
-    intersectionsA = find_intersectionsForDefconGlyph(rGlyph.naked(), *refLine)
-    end_time = time.time()
-
-    print(f"RB Execution time: {end_time - start_time} seconds")
-
-    if rfActive:
-        _glyph = font["intersectionTest"]
-        start_time = time.time()
-        intersectionsB = tools.IntersectGlyphWithLine(
-            _glyph,
-            refLine,
-        )
-        end_time = time.time()
-        print(f"RF Execution time: {end_time - start_time} seconds")
@@ -0,0 +1,231 @@
+"""
+Flat geometry of a glyph.
+
+Walking fontParts wrappers (glyph.contours → contour.segments → seg.points)
+on every mouse event is the biggest constant factor of the measurement.
+GlyphGeometry reads the defcon glyph once and keeps plain coordinates,
+segment types and contour/segment index maps. Geometries are cached per
+glyph and dropped when the glyph posts "Glyph.Changed".
+"""
+
+import weakref
+
+from .spatial import SegmentBVH, controlPointsBox
+
+
+# geometries with at least this many segments are searched with the packed
+# arrays first, see GlyphGeometry.prepareSearch
+PACKED_SEARCH_SEGMENTS = 5000
+# prepareSearch calls answered with the packed segments, before the BVH is built
+PACKED_SEARCHES = 3
+
+
+class GlyphGeometry:
+    """
+    Read-only geometry of a glyph.
+
+    Every segment is stored with the last point of the previous segment
+    prepended, so lines have 2 points and cubic curves have 4 points
+    (the layout StemMath functions expect), qcurves keep all their off-curves.
+    Segments are addressed either by
+    their flat index or by (contour_index, segment_index) – the same indexing
+    as fontParts' `glyph.contours[contour_index].segments[segment_index]`.
+
+    Constraint lines ((x1, y1), (x2, y2)) are measured against, but they aren't
+    a part of the outline (e.g. sidebearings). They have no indexes and they
+    aren't in the BVH, the ray pass intersects them in closed form.
+    """
+
+    def __init__(self, glyph, constraintLines=()):
+        if hasattr(glyph, "naked"):
+            glyph = glyph.naked()
+
+        segmentTypes = []
+        segmentPoints = []
+        contourIndexes = []
+        segmentIndexes = []
+
+        for contour_index, contour in enumerate(glyph):
+            segs = contour.segments
+            for segment_index, seg in enumerate(segs):
+                segType = seg[-1].segmentType
+                if segType == "move":
+                    # open contours don't close with a segment
+                    continue
+                previous = segs[segment_index - 1][-1]
+                points = ((previous.x, previous.y),) + tuple(
+                    (point.x, point.y) for point in seg
+                )
+                segmentTypes.append(segType)
+                segmentPoints.append(points)
+                contourIndexes.append(contour_index)
+                segmentIndexes.append(segment_index)
+
+        self.width = glyph.width
+        self.constraintLines = tuple(
+            (tuple(start), tuple(end)) for start, end in constraintLines
+        )
+        self.segmentTypes = tuple(segmentTypes)
+        self.segmentPoints = tuple(segmentPoints)
+        self.contourIndexes = tuple(contourIndexes)
+        self.segmentIndexes = tuple(segmentIndexes)
+        self.segmentLookup = {
+            key: index
+            for index, key in enumerate(zip(self.contourIndexes, self.segmentIndexes))
+        }
+        self._bvh = None
+        self._packed = None
+        self._searches = 0
+        self._pieces = [None] * len(self.segmentPoints)
+        self._prepared = False
+
+    def __len__(self):
+        return len(self.segmentPoints)
+
+    def iterSegments(self):
+        """Yields (contour_index, segment_index, segType, points) for every segment."""
+        return zip(
+            self.contourIndexes,
+            self.segmentIndexes,
+            self.segmentTypes,
+            self.segmentPoints,
+        )
+
+    def segment(self, contour_index, segment_index):
+        """Returns (segType, points) of the segment or None if it doesn't exist."""
+        index = self.segmentLookup.get((contour_index, segment_index))
+        if index is None:
+            return None
+        return self.segmentTypes[index], self.segmentPoints[index]
+
+    def segmentPieces(self, index):
+        """
+        Returns the segment as lines, quadratic and cubic curves (see `StemMath.segmentPieces`).
+        Pieces are made on the first use, most of the segments are never measured.
+        """
+        pieces = self._pieces[index]
+        if pieces is None:
+            from . import segmentPieces
+
+            pieces = self._pieces[index] = segmentPieces(
+                self.segmentTypes[index], self.segmentPoints[index]
+            )
+        return pieces
+
+    def prepareSearch(self):
+        """
+        Builds the search structures and the pieces of every segment at once.
+        Lazy structures are written on the first use, so call it before handing
+        the geometry to another thread, which then only reads it.
+
+        Every edit makes a new geometry. Large ones are packed into NumPy arrays
+        first, that's about twice cheaper than building the BVH, and searches
+        over the arrays are only a bit slower. Guides and the measurement after
+        an edit are served that way, the BVH is built when the geometry is still
+        searched after PACKED_SEARCHES calls (hovering).
+        """
+        if self._prepared:
+            return
+        self._searches += 1
+        if self._searches <= PACKED_SEARCHES and len(self) >= PACKED_SEARCH_SEGMENTS:
+            from . import vectorized
+
+            if vectorized is not None:
+                # pieces are made while packing
+                if self._packed is None:
+                    self._packed = vectorized.packSegments(self)
+                return
+        self.bvh
+        for index, pieces in enumerate(self._pieces):
+            if pieces is None:
+                self.segmentPieces(index)
+        self._prepared = True
+
+    def changedSegments(self, other):
+        """
+        Returns flat indexes of the segments, that differ from the other geometry,
+        or None, if the contours or the constraint lines aren't the same (the
+        indexes of the two geometries aren't comparable then).
+        """
+        if (
+            self.segmentTypes != other.segmentTypes
+            or self.contourIndexes != other.contourIndexes
+            or self.segmentIndexes != other.segmentIndexes
+            or self.constraintLines != other.constraintLines
+        ):
+            return None
+        return [
+            index
+            for index, (points, otherPoints) in enumerate(
+                zip(self.segmentPoints, other.segmentPoints)
+            )
+            if points != otherPoints
+        ]
+
+    @property
+    def searchIndex(self):
+        """The BVH, or the packed segments, until prepareSearch builds the BVH."""
+        if self._bvh is None and self._packed is not None:
+            return self._packed
+        return self.bvh
+
+    @property
+    def bvh(self):
+        """Bounding volume hierarchy over control point boxes of the segments."""
+        if self._bvh is None:
+            self._bvh = SegmentBVH(
+                controlPointsBox(points) for points in self.segmentPoints
+            )
+        return self._bvh
+
+
+class _GlyphGeometryCache:
+
+    def __init__(self):
+        self._geometries = weakref.WeakKeyDictionary()
+
+    def get(self, glyph):
+        if hasattr(glyph, "naked"):
+            glyph = glyph.naked()
+
+        geometry = self._geometries.get(glyph)
+        if geometry is not None:
+            return geometry
+
+        geometry = GlyphGeometry(glyph)
+        # glyphs outside of the font (temporary copies) never post notifications,
+        # so there would be nothing to invalidate their cached geometry
+        if getattr(glyph, "dispatcher", None) is not None:
+            glyph.addObserver(self, "_glyphChanged", "Glyph.Changed")
+            self._geometries[glyph] = geometry
+        return geometry
+
+    def invalidate(self, glyph):
+        if hasattr(glyph, "naked"):
+            glyph = glyph.naked()
+        if self._geometries.pop(glyph, None) is not None:
+            glyph.removeObserver(self, "Glyph.Changed")
+
+    def _glyphChanged(self, notification):
+        self.invalidate(notification.object)
+
+    def clear(self):
+        for glyph in list(self._geometries.keys()):
+            self.invalidate(glyph)
+
+
+_cache = _GlyphGeometryCache()
+
+
+def getGlyphGeometry(glyph) -> GlyphGeometry:
+    """
+    Returns cached GlyphGeometry of the fontParts or defcon glyph.
+    The geometry is rebuilt after the glyph changes.
+    """
+    if isinstance(glyph, GlyphGeometry):
+        return glyph
+    return _cache.get(glyph)
+
+
+def invalidateGlyphGeometry(glyph):
+    _cache.invalidate(glyph)
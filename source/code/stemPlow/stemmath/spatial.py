@@ -0,0 +1,222 @@
+"""
+Spatial index over segments of a glyph.
+
+Every segment lies inside the bounding box of its control points, so the
+distance to that box is a lower bound of the distance to the segment, and
+a line that misses the box can't intersect the segment. SegmentBVH groups
+those boxes into a bounding volume hierarchy, which lets the nearest-point
+search skip everything farther than the best candidate found so far, and
+the intersection search skip everything the measuring line never crosses.
+Ties go to the lower index, like in a plain loop over the segments, so
+boxes as far as the best candidate are still visited.
+"""
+
+import heapq
+import math
+
+
+LEAF_SIZE = 4
+
+
+def controlPointsBox(points):
+    """Returns (xMin, yMin, xMax, yMax) of the points."""
+    xs = [x for x, _ in points]
+    ys = [y for _, y in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def boxDistance(box, point):
+    """Distance from the point to the box, 0 if the point is inside."""
+    xMin, yMin, xMax, yMax = box
+    x, y = point
+    dx = xMin - x if x < xMin else x - xMax if x > xMax else 0
+    dy = yMin - y if y < yMin else y - yMax if y > yMax else 0
+    return math.hypot(dx, dy)
+
+
+def lineCrossesBox(box, start, end, pad=0.0):
+    """
+    Returns True if the line from start to end crosses the box (Liang–Barsky clipping).
+    The box is grown by pad on every side, so lines that only touch a flat box
+    (a horizontal or vertical segment), but are off by a rounding error, still count.
+    """
+    t0, t1 = 0.0, 1.0
+    for axis in (0, 1):
+        origin = start[axis]
+        delta = end[axis] - origin
+        low, high = box[axis] - pad, box[axis + 2] + pad
+        if delta == 0:
+            if origin < low or origin > high:
+                return False
+            continue
+        ta = (low - origin) / delta
+        tb = (high - origin) / delta
+        if ta > tb:
+            ta, tb = tb, ta
+        t0 = max(t0, ta)
+        t1 = min(t1, tb)
+        if t0 > t1:
+            return False
+    return True
+
+
+def isCloser(distance, index, bestDistance, bestIndex):
+    """True if the item beats the best one so far, ties go to the lower index."""
+    if distance < bestDistance:
+        return True
+    return distance == bestDistance and bestIndex is not None and index < bestIndex
+
+
+def unionBox(boxes):
+    xMins, yMins, xMaxs, yMaxs = zip(*boxes)
+    return min(xMins), min(yMins), max(xMaxs), max(yMaxs)
+
+
+class SegmentBVH:
+    """
+    Bounding volume hierarchy over boxes of the segments.
+
+    Nodes are stored in a flat list as (box, start, end, left, right) tuples,
+    where start:end is a range in `order` (indexes of the boxes covered by the node),
+    and left/right are indexes of child nodes (-1 for leaves).
+    """
+
+    def __init__(self, boxes, leafSize=LEAF_SIZE):
+        self.boxes = tuple(boxes)
+        self.leafSize = leafSize
+        self.order = list(range(len(self.boxes)))
+        self.nodes = []
+        if self.boxes:
+            self._build(0, len(self.boxes))
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def _build(self, start, end):
+        items = self.order[start:end]
+        box = unionBox([self.boxes[i] for i in items])
+        nodeIndex = len(self.nodes)
+        self.nodes.append(None)
+
+        if end - start <= self.leafSize:
+            self.nodes[nodeIndex] = (box, start, end, -1, -1)
+            return nodeIndex
+
+        # split by the median of box centers along the longer side of the node
+        xMin, yMin, xMax, yMax = box
+        axis = 0 if xMax - xMin >= yMax - yMin else 1
+        items.sort(key=lambda i: self.boxes[i][axis] + self.boxes[i][axis + 2])
+        self.order[start:end] = items
+        middle = (start + end) // 2
+
+        left = self._build(start, middle)
+        right = self._build(middle, end)
+        self.nodes[nodeIndex] = (box, start, end, left, right)
+        return nodeIndex
+
+    def nearest(self, point, evaluate, bound=math.inf):
+        """
+        Finds the item closest to the point.
+        Args:
+            point (tuple): (x, y) of the query.
+            evaluate (callable): evaluate(index) -> (distance, payload), exact distance to the item.
+            bound (float): items farther than bound are never evaluated.
+        Returns:
+            tuple: (index, distance, payload), index is None when nothing is closer than bound.
+        """
+        bestIndex, bestDistance, bestPayload = None, bound, None
+        if not self.nodes:
+            return bestIndex, bestDistance, bestPayload
+
+        boxes = self.boxes
+        nodes = self.nodes
+        heap = [(boxDistance(nodes[0][0], point), 0)]
+        while heap:
+            distance, nodeIndex = heapq.heappop(heap)
+            if distance > bestDistance:
+                break
+            _, start, end, left, right = nodes[nodeIndex]
+
+            if left < 0:
+                for index in self.order[start:end]:
+                    if boxDistance(boxes[index], point) > bestDistance:
+                        continue
+                    distance, payload = evaluate(index)
+                    if isCloser(distance, index, bestDistance, bestIndex):
+                        bestIndex, bestDistance, bestPayload = index, distance, payload
+                continue
+
+            for child in (left, right):
+                childDistance = boxDistance(nodes[child][0], point)
+                if childDistance <= bestDistance:
+                    heapq.heappush(heap, (childDistance, child))
+
+        return bestIndex, bestDistance, bestPayload
+
+    def nearestWithClearance(self, point, evaluate, bound=math.inf):
+        """
+        Same as nearest, but keeps searching until the second closest item is known.
+        Returns:
+            tuple: (index, distance, payload, clearance), every item other than
+            the closest one is at least clearance away from the point (clearance
+            is bound at most).
+        """
+        bestIndex, bestDistance, bestPayload = None, bound, None
+        clearance = bound
+        if not self.nodes:
+            return bestIndex, bestDistance, bestPayload, clearance
+
+        boxes = self.boxes
+        nodes = self.nodes
+        heap = [(boxDistance(nodes[0][0], point), 0)]
+        while heap:
+            distance, nodeIndex = heapq.heappop(heap)
+            if distance > clearance:
+                break
+            _, start, end, left, right = nodes[nodeIndex]
+
+            if left < 0:
+                for index in self.order[start:end]:
+                    if boxDistance(boxes[index], point) > clearance:
+                        continue
+                    distance, payload = evaluate(index)
+                    if isCloser(distance, index, bestDistance, bestIndex):
+                        clearance = bestDistance
+                        bestIndex, bestDistance, bestPayload = index, distance, payload
+                    elif distance < clearance:
+                        clearance = distance
+                continue
+
+            for child in (left, right):
+                childDistance = boxDistance(nodes[child][0], point)
+                if childDistance <= clearance:
+                    heapq.heappush(heap, (childDistance, child))
+
+        return bestIndex, bestDistance, bestPayload, clearance
+
+    def crossedBy(self, start, end, pad=0.0):
+        """
+        Returns sorted indexes of the items, which boxes (grown by pad) are
+        crossed by the line from start to end.
+        """
+        found = []
+        if not self.nodes:
+            return found
+
+        boxes = self.boxes
+        nodes = self.nodes
+        stack = [0]
+        while stack:
+            box, begin, finish, left, right = nodes[stack.pop()]
+            if not lineCrossesBox(box, start, end, pad):
+                continue
+            if left < 0:
+                for index in self.order[begin:finish]:
+                    if lineCrossesBox(boxes[index], start, end, pad):
+                        found.append(index)
+            else:
+                stack.append(left)
+                stack.append(right)
+
+        found.sort()
+        return found
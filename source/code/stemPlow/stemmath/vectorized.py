@@ -0,0 +1,670 @@
+"""
+NumPy engines for whole glyphs and for compatible masters.
+
+All segments of a glyph are packed into arrays (N×4×2 for cubics, M×2×2 for
+lines), so the closest point is found for every segment in one pass instead
+of running a per-segment search in Python. Packing is much cheaper than
+building the BVH, so geometries searched only once (after every edit of a
+large glyph) are searched with the packed arrays, see GlyphGeometry.prepareSearch.
+
+Compatible masters share the structure of the outline, so their segments
+can be stacked into one (masters, pieces, 4, 2) array, and a ruler anchored
+to the same contour/segment/t is measured in all of them at once
+(StemPlowMasters).
+"""
+
+import math
+from dataclasses import dataclass
+from numbers import Number
+from typing import Sequence
+
+import numpy as np
+
+from . import (
+    elevateQuadratic,
+    getBasis,
+    TOLERANCE,
+    MAX_ITERATIONS,
+    ORIGIN_TOLERANCE,
+)
+from .spatial import isCloser
+
+
+COARSE_SAMPLES = 18
+
+_coarse_t = np.linspace(0.0, 1.0, COARSE_SAMPLES + 1)
+_coarse_basis = np.array(getBasis(3, COARSE_SAMPLES))
+
+
+def _cubicCoefficients(cubics):
+    p0, p1, p2, p3 = cubics[:, 0], cubics[:, 1], cubics[:, 2], cubics[:, 3]
+    a = -p0 + 3 * p1 - 3 * p2 + p3
+    b = 3 * p0 - 6 * p1 + 3 * p2
+    c = -3 * p0 + 3 * p1
+    return a, b, c, p0
+
+
+@dataclass
+class PackedSegments:
+    """
+    Segments of a GlyphGeometry packed into arrays.
+
+    Quadratic pieces are degree-elevated, so every curve piece is stored as a cubic.
+    `cubicTRange` keeps the t-range of the original segment covered by the piece.
+    It answers the same queries as spatial.SegmentBVH (nearest, nearestWithClearance,
+    crossedBy), evaluate(index) gives the exact distances, so the results are the same.
+    """
+
+    cubics: np.ndarray  # (N, 4, 2)
+    cubicSegments: np.ndarray  # (N,) flat index of the segment
+    cubicTRange: np.ndarray  # (N, 2) t at the start and at the end of the piece
+    lines: np.ndarray  # (M, 2, 2)
+    lineSegments: np.ndarray  # (M,) flat index of the segment
+    boxes: np.ndarray  # (S, 4) control point boxes of the segments
+    ends: np.ndarray  # (S, 2, 2) first and last point of the segments
+    refs: np.ndarray  # (S, 2) contour_index, segment_index
+
+    def __len__(self):
+        return len(self.cubics) + len(self.lines)
+
+    def nearest(self, point, evaluate, bound=math.inf):
+        """Same as SegmentBVH.nearest."""
+        index, distance, payload, _ = self._nearest(point, evaluate, bound, False)
+        return index, distance, payload
+
+    def nearestWithClearance(self, point, evaluate, bound=math.inf):
+        """Same as SegmentBVH.nearestWithClearance."""
+        return self._nearest(point, evaluate, bound, True)
+
+    def _nearest(self, point, evaluate, bound, withClearance):
+        bestIndex, bestDistance, bestPayload = None, bound, None
+        clearance = bound
+        if not len(self.boxes):
+            return bestIndex, bestDistance, bestPayload, clearance
+
+        # points found here are on the outline, so they bound the exact distances
+        # from above: segments, which boxes are farther, can't win (the second
+        # closest one bounds the clearance). On-curve points are cheap, closest
+        # points are looked for only on segments, which boxes are closer than them.
+        boxDistances = _boxDistances(self.boxes, point)
+        ends = np.hypot(*(self.ends - np.asarray(point, dtype=float)).T).min(axis=0)
+        limit = min(_upperLimit(ends, withClearance), bound)
+        near = boxDistances <= limit
+        upper = segmentDistances(point, self, near)
+        limit = min(_upperLimit(upper, withClearance), limit)
+        candidates = np.nonzero(boxDistances <= limit)[0]
+        order = np.argsort(boxDistances[candidates], kind="stable")
+        candidates = candidates[order].tolist()
+
+        # the same loop as in the leaves of the BVH, in the order of the box distances
+        for index in candidates:
+            if boxDistances[index] > (clearance if withClearance else bestDistance):
+                break
+            distance, payload = evaluate(index)
+            if isCloser(distance, index, bestDistance, bestIndex):
+                clearance = bestDistance
+                bestIndex, bestDistance, bestPayload = index, distance, payload
+            elif distance < clearance:
+                clearance = distance
+        # segments, that weren't candidates, are farther than the limit
+        return bestIndex, bestDistance, bestPayload, min(clearance, limit)
+
+    def crossedBy(self, start, end, pad=0.0):
+        """Same as SegmentBVH.crossedBy (spatial.lineCrossesBox for every box)."""
+        boxes = self.boxes
+        t0 = np.zeros(len(boxes))
+        t1 = np.ones(len(boxes))
+        crossed = np.ones(len(boxes), dtype=bool)
+        for axis in (0, 1):
+            origin = start[axis]
+            delta = end[axis] - origin
+            low, high = boxes[:, axis] - pad, boxes[:, axis + 2] + pad
+            if delta == 0:
+                crossed &= (origin >= low) & (origin <= high)
+                continue
+            ta = (low - origin) / delta
+            tb = (high - origin) / delta
+            t0 = np.maximum(t0, np.minimum(ta, tb))
+            t1 = np.minimum(t1, np.maximum(ta, tb))
+        crossed &= t0 <= t1
+        return np.nonzero(crossed)[0].tolist()
+
+
+def _upperLimit(distances, withClearance):
+    if withClearance and len(distances) > 1:
+        return np.partition(distances, 1)[1]
+    return distances.min()
+
+
+def _boxDistances(boxes, point):
+    x, y = point
+    dx = np.maximum(np.maximum(boxes[:, 0] - x, x - boxes[:, 2]), 0)
+    dy = np.maximum(np.maximum(boxes[:, 1] - y, y - boxes[:, 3]), 0)
+    return np.hypot(dx, dy)
+
+
+def packSegments(geometry) -> PackedSegments:
+    """Packs segments of the GlyphGeometry into arrays."""
+    cubics, cubicSegments, cubicTRange = [], [], []
+    lines, lineSegments = [], []
+    boxes, ends = [], []
+
+    for index, points in enumerate(geometry.segmentPoints):
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        boxes.append((min(xs), min(ys), max(xs), max(ys)))
+        ends.append((points[0], points[-1]))
+        pieces = geometry.segmentPieces(index)
+        for pieceIndex, piece in enumerate(pieces):
+            if len(piece) == 2:
+                lines.append(piece)
+                lineSegments.append(index)
+                continue
+            cubics.append(elevateQuadratic(*piece) if len(piece) == 3 else piece)
+            cubicSegments.append(index)
+            cubicTRange.append(
+                (pieceIndex / len(pieces), (pieceIndex + 1) / len(pieces))
+            )
+
+    return PackedSegments(
+        cubics=np.array(cubics, dtype=float).reshape(-1, 4, 2),
+        cubicSegments=np.array(cubicSegments, dtype=int),
+        cubicTRange=np.array(cubicTRange, dtype=float).reshape(-1, 2),
+        lines=np.array(lines, dtype=float).reshape(-1, 2, 2),
+        lineSegments=np.array(lineSegments, dtype=int),
+        boxes=np.array(boxes, dtype=float).reshape(-1, 4),
+        ends=np.array(ends, dtype=float).reshape(-1, 2, 2),
+        refs=np.array(
+            list(zip(geometry.contourIndexes, geometry.segmentIndexes)), dtype=int
+        ).reshape(-1, 2),
+    )
+
+
+def closestPointsOnCubics(
+    cursorPosition, cubics, tolerance=TOLERANCE, maxIterations=MAX_ITERATIONS
+):
+    """
+    Finds the closest point on every cubic at once.
+    A coarse pass over the curve is refined with Newton steps on the projection equation,
+    until every t-factor step is smaller than tolerance.
+    Returns:
+        tuple: (points (N, 2), t (N,), distances (N,), iterations)
+    """
+    cursor = np.asarray(cursorPosition, dtype=float)
+    samples = np.einsum("sk,nkd->nsd", _coarse_basis, cubics)
+    sampleDistances = ((samples - cursor) ** 2).sum(axis=-1)
+    best = sampleDistances.argmin(axis=1)
+    coarseDistances = sampleDistances[np.arange(len(cubics)), best]
+    coarse_t = _coarse_t[best]
+
+    a, b, c, d = _cubicCoefficients(cubics)
+    t = coarse_t
+    iterations = 0
+    while iterations < maxIterations:
+        iterations += 1
+        tt = t[:, None]
+        point = ((a * tt + b) * tt + c) * tt + d
+        firstDerivative = (3 * a * tt + 2 * b) * tt + c
+        secondDerivative = 6 * a * tt + 2 * b
+        diff = point - cursor
+        numerator = (diff * firstDerivative).sum(axis=-1)
+        denominator = (firstDerivative**2).sum(axis=-1) + (
+            diff * secondDerivative
+        ).sum(axis=-1)
+        safe = np.abs(denominator) > 1e-12
+        step = np.where(safe, numerator / np.where(safe, denominator, 1.0), 0.0)
+        new_t = np.clip(t - step, 0.0, 1.0)
+        step = np.abs(new_t - t).max()
+        t = new_t
+        if step < tolerance:
+            break
+
+    tt = t[:, None]
+    points = ((a * tt + b) * tt + c) * tt + d
+    distances = ((points - cursor) ** 2).sum(axis=-1)
+
+    # Newton can run away from the coarse guess, never accept worse results
+    worse = distances > coarseDistances
+    if worse.any():
+        t = np.where(worse, coarse_t, t)
+        points[worse] = samples[np.arange(len(cubics)), best][worse]
+        distances = np.where(worse, coarseDistances, distances)
+
+    return points, t, np.sqrt(distances), iterations
+
+
+def closestPointsOnLines(cursorPosition, lines):
+    """
+    Projects the cursor on every line at once.
+    Returns:
+        tuple: (points (M, 2), t (M,), distances (M,))
+    """
+    cursor = np.asarray(cursorPosition, dtype=float)
+    start = lines[:, 0]
+    vector = lines[:, 1] - start
+    lengthSquared = (vector**2).sum(axis=-1)
+    safe = lengthSquared > 0
+    t = np.where(
+        safe,
+        ((cursor - start) * vector).sum(axis=-1) / np.where(safe, lengthSquared, 1.0),
+        0.0,
+    )
+    t = np.clip(t, 0.0, 1.0)
+    points = start + vector * t[:, None]
+    distances = np.hypot(*(points - cursor).T)
+    return points, t, distances
+
+
+def segmentDistances(cursorPosition, packed: PackedSegments, segments=None):
+    """
+    Returns distances (S,) from the cursor to the closest points found on every segment
+    (only on the segments, which are True in the segments mask, the rest stay inf).
+    Only the cubics, that can get closer than the best coarse sample, are refined,
+    the rest keep the distance of their closest coarse sample (it's on the curve too).
+    """
+    distances = np.full(len(packed.boxes), np.inf)
+    lines, lineSegments = packed.lines, packed.lineSegments
+    cubics, cubicSegments = packed.cubics, packed.cubicSegments
+    if segments is not None:
+        lineMask = segments[lineSegments]
+        lines, lineSegments = lines[lineMask], lineSegments[lineMask]
+        cubicMask = segments[cubicSegments]
+        cubics, cubicSegments = cubics[cubicMask], cubicSegments[cubicMask]
+    if len(lines):
+        _, _, lineDistances = closestPointsOnLines(cursorPosition, lines)
+        np.minimum.at(distances, lineSegments, lineDistances)
+    if len(cubics):
+        cubicDistances = _refinedCubicDistances(
+            cursorPosition, cubics, distances.min()
+        )
+        np.minimum.at(distances, cubicSegments, cubicDistances)
+    return distances
+
+
+def _refinedCubicDistances(cursorPosition, cubics, bound=np.inf):
+    cursor = np.asarray(cursorPosition, dtype=float)
+    samples = np.einsum("sk,nkd->nsd", _coarse_basis, cubics)
+    coarse = np.sqrt(((samples - cursor) ** 2).sum(axis=-1).min(axis=1))
+    # curve points are at most 3 * (longest leg) / COARSE_SAMPLES from a sample
+    legs = np.linalg.norm(np.diff(cubics, axis=1), axis=-1)
+    reach = 3 * legs.max(axis=1) / COARSE_SAMPLES
+    refine = np.nonzero(coarse - reach < min(coarse.min(), bound))[0]
+    if len(refine):
+        _, _, refined, _ = closestPointsOnCubics(cursorPosition, cubics[refine])
+        coarse[refine] = np.minimum(coarse[refine], refined)
+    return coarse
+
+
+def findClosestPiece(cursorPosition: Sequence[Number], packed: PackedSegments):
+    """
+    Returns:
+        tuple: A tuple containing:
+            - closestPoint (tuple): The coordinates (x, y) of the closest point.
+            - contour_index (int)
+            - segment_index (int)
+            - t (float): The parameter t of the closest point on the original segment.
+            - piecePoints (tuple): Control points of the cubic piece or the line.
+            - piece_t (float): The parameter t of the closest point on the piece.
+        or None when there are no segments.
+    """
+    if not len(packed):
+        return None
+
+    bestCubic = bestLine = None
+    if len(packed.cubics):
+        cubicPoints, cubic_t, cubicDistances, _ = closestPointsOnCubics(
+            cursorPosition, packed.cubics
+        )
+        bestCubic = int(cubicDistances.argmin())
+    if len(packed.lines):
+        linePoints, line_t, lineDistances = closestPointsOnLines(
+            cursorPosition, packed.lines
+        )
+        bestLine = int(lineDistances.argmin())
+
+    if bestLine is None or (
+        bestCubic is not None and cubicDistances[bestCubic] <= lineDistances[bestLine]
+    ):
+        start_t, end_t = packed.cubicTRange[bestCubic]
+        piece_t = float(cubic_t[bestCubic])
+        contour_index, segment_index = packed.refs[packed.cubicSegments[bestCubic]]
+        closestPoint = cubicPoints[bestCubic]
+        piecePoints = packed.cubics[bestCubic]
+        t = float(start_t + (end_t - start_t) * piece_t)
+    else:
+        piece_t = t = float(line_t[bestLine])
+        contour_index, segment_index = packed.refs[packed.lineSegments[bestLine]]
+        closestPoint = linePoints[bestLine]
+        piecePoints = packed.lines[bestLine]
+
+    return (
+        (float(closestPoint[0]), float(closestPoint[1])),
+        int(contour_index),
+        int(segment_index),
+        t,
+        tuple((float(x), float(y)) for x, y in piecePoints),
+        piece_t,
+    )
+
+
+def findClosestPoint(cursorPosition: Sequence[Number], packed: PackedSegments):
+    """
+    Returns:
+        tuple: (closestPoint, contour_index, segment_index, t),
+        (None, None, None, None) when there are no segments.
+    """
+    result = findClosestPiece(cursorPosition, packed)
+    if result is None:
+        return None, None, None, None
+    return result[:4]
+
+
+# Multiple masters
+# ----------------
+# Compatible masters share the structure of the outline, so their segments
+# can be stacked into one (masters, pieces, 4, 2) array, and a ruler anchored
+# to the same contour/segment/t is measured in all of them at once.
+
+INTERSECTION_SAMPLES = 32
+INTERSECTION_ITERATIONS = 40
+# pieces touching the measuring line closer than this are hit (without precision)
+TOUCH_DISTANCE = 1e-6
+GUIDE_LENGTH = 10000  # length of the guidelines on both sides, like in getPerpendicularLineToTangent
+
+
+@dataclass
+class StackedGeometries:
+    """
+    Segments of compatible GlyphGeometries. Lines are stored as cubics
+    (collinear handles) and quadratic pieces are degree-elevated,
+    so every piece has the same shape.
+    """
+
+    cubics: np.ndarray  # (M, P, 4, 2)
+    pieceSegments: np.ndarray  # (P,) flat index of the segment in the geometry, -1 for constraint lines
+    pieceTRange: np.ndarray  # (P, 2) t at the start and at the end of the piece
+    pieceIsLine: np.ndarray  # (P,)
+    segmentLookup: dict  # (contour_index, segment_index) -> flat index
+    coefficients: tuple = None  # polynomial coefficients a, b, c, d of the pieces, (M, P, 2) each
+
+    def __post_init__(self):
+        if self.coefficients is None:
+            shape = self.cubics.shape[:2] + (2,)
+            self.coefficients = tuple(
+                value.reshape(shape)
+                for value in _cubicCoefficients(self.cubics.reshape(-1, 4, 2))
+            )
+
+    def __len__(self):
+        return len(self.cubics)
+
+
+def _elevatedPiece(piece):
+    if len(piece) == 2:
+        (x0, y0), (x1, y1) = piece
+        dx, dy = (x1 - x0) / 3, (y1 - y0) / 3
+        return (x0, y0), (x0 + dx, y0 + dy), (x1 - dx, y1 - dy), (x1, y1)
+    if len(piece) == 3:
+        return elevateQuadratic(*piece)
+    return piece
+
+
+def geometryStructure(geometry):
+    """Returns hashable description of the outline structure, equal for compatible masters."""
+    return (
+        geometry.segmentTypes,
+        tuple(len(points) for points in geometry.segmentPoints),
+        geometry.contourIndexes,
+        geometry.segmentIndexes,
+        len(geometry.constraintLines),
+    )
+
+
+def stackGeometries(geometries) -> StackedGeometries:
+    """
+    Stacks GlyphGeometries of compatible masters.
+    Raises ValueError, when the masters aren't compatible.
+    """
+    if not geometries:
+        raise ValueError("Nothing to stack")
+    first = geometries[0]
+    structure = geometryStructure(first)
+    for geometry in geometries[1:]:
+        if geometryStructure(geometry) != structure:
+            raise ValueError("Masters aren't compatible")
+
+    pieceSegments, pieceTRange, pieceIsLine = [], [], []
+    for index in range(len(first)):
+        pieces = first.segmentPieces(index)
+        for pieceIndex, piece in enumerate(pieces):
+            pieceSegments.append(index)
+            pieceIsLine.append(len(piece) == 2)
+            pieceTRange.append(
+                (pieceIndex / len(pieces), (pieceIndex + 1) / len(pieces))
+            )
+    # constraint lines (sidebearings) go after the outline, they are hit, but never anchored
+    for _ in first.constraintLines:
+        pieceSegments.append(-1)
+        pieceIsLine.append(True)
+        pieceTRange.append((0.0, 1.0))
+
+    cubics = [
+        [
+            _elevatedPiece(piece)
+            for index in range(len(geometry))
+            for piece in geometry.segmentPieces(index)
+        ]
+        + [_elevatedPiece(line) for line in geometry.constraintLines]
+        for geometry in geometries
+    ]
+    return StackedGeometries(
+        cubics=np.array(cubics, dtype=float).reshape(len(geometries), -1, 4, 2),
+        pieceSegments=np.array(pieceSegments, dtype=int),
+        pieceTRange=np.array(pieceTRange, dtype=float).reshape(-1, 2),
+        pieceIsLine=np.array(pieceIsLine, dtype=bool),
+        segmentLookup=dict(first.segmentLookup),
+    )
+
+
+def _bisectionRounds(pieces, precision):
+    """
+    Returns number of bisection rounds, after which hits on the pieces are within precision
+    (the middle of the last interval is at most half of it from the root). Derivative
+    of a cubic is bounded by 3 times the longest leg of its control polygon.
+    """
+    if precision is None or not len(pieces):
+        return INTERSECTION_ITERATIONS
+    longestLeg = np.linalg.norm(np.diff(pieces, axis=1), axis=-1).max()
+    # t-factor error, that keeps the hits within precision
+    tolerance = precision / max(3 * longestLeg, 1e-12)
+    rounds = math.ceil(math.log2(max(1 / (INTERSECTION_SAMPLES * 2 * tolerance), 1)))
+    return min(rounds, INTERSECTION_ITERATIONS)
+
+
+def _distanceExtrema(ca, cb, cc, cd, touch):
+    """
+    Returns (extrema (K, 2), touching (K, 2)) of the distances of the pieces from
+    the line, the cubics ca·s³ + cb·s² + cc·s + cd. Extrema are roots of
+    the derivative inside 0...1 (0 where there's none), touching marks the ones,
+    which are closer to the line than touch, but not on it.
+    """
+    qa, qb, qc = 3 * ca, 2 * cb, cc
+    discriminant = qb * qb - 4 * qa * qc
+    root = np.sqrt(np.maximum(discriminant, 0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # numerically stable form, like in _quadraticLineHits
+        q = -0.5 * (qb + np.where(qb < 0, -root, root))
+        quadratic = np.stack([q / qa, qc / q], axis=1)
+        linear = (-qc / qb)[:, None]
+    isLinear = qa == 0
+    extrema = np.where(
+        isLinear[:, None], np.concatenate([linear, linear], axis=1), quadratic
+    )
+    valid = np.isfinite(extrema) & (extrema > 0) & (extrema < 1)
+    valid &= (isLinear | (discriminant >= 0))[:, None]
+    # the derivative of a quadratic distance has a single root
+    valid[:, 1] &= ~isLinear
+    extrema = np.where(valid, extrema, 0.0)
+    values = ((ca[:, None] * extrema + cb[:, None]) * extrema + cc[:, None]) * extrema
+    values += cd[:, None]
+    touching = valid & (np.abs(values) <= touch) & (values != 0)
+    return extrema, touching
+
+
+def _findPiece(stacked, contour_index, segment_index, t):
+    index = stacked.segmentLookup.get((contour_index, segment_index))
+    if index is None:
+        return None
+    candidates = np.nonzero(stacked.pieceSegments == index)[0]
+    for piece in candidates:
+        start_t, end_t = stacked.pieceTRange[piece]
+        if t <= end_t or piece == candidates[-1]:
+            return int(piece), (t - start_t) / (end_t - start_t)
+    return None
+
+
+def measureAnchorStacked(
+    stacked: StackedGeometries,
+    contour_index,
+    segment_index,
+    t,
+    tolerance=ORIGIN_TOLERANCE,
+    precision=None,
+):
+    """
+    Measures the ruler anchored at (contour_index, segment_index, t) in all the
+    stacked masters at once: anchor points and their normals are evaluated for every
+    master, then the normals are intersected with every piece of every master
+    in one batch (sign changes on sampled pieces, split at the extrema of their
+    distance from the line too, refined with bisection, until the hits are within
+    precision, see StemMath.tToleranceForPrecision). Pieces, which only touch
+    the line (closer than precision or TOUCH_DISTANCE), are hit at the extremum.
+    Returns:
+        dict with arrays: point (M, 2), thickness1 (M,), nearestP1 (M, 2),
+        thickness2 (M,), nearestP2 (M, 2); or None if the segment doesn't exist.
+        thickness1 is measured on the guideline1 side, like calculateThicknessData does it.
+    """
+    found = _findPiece(stacked, contour_index, segment_index, t)
+    if found is None:
+        return None
+    piece, piece_t = found
+    cubics = stacked.cubics
+    a, b, c, d = stacked.coefficients
+
+    # anchor points and normals of all masters
+    pa, pb, pc, pd = a[:, piece], b[:, piece], c[:, piece], d[:, piece]
+    point = ((pa * piece_t + pb) * piece_t + pc) * piece_t + pd
+    # the same nudge as in getPerpendicularLineToTangent
+    tangent_t = piece_t if piece_t != 0 else 0.001
+    control = cubics[:, piece]
+    if stacked.pieceIsLine[piece]:
+        tangent = control[:, 3] - control[:, 0]
+    else:
+        # the same expression as derivativeBezier, so vertical tangents are exactly vertical
+        u = 1 - tangent_t
+        tangent = (
+            -3 * control[:, 0] * u**2
+            + control[:, 1] * (3 * u**2 - 6 * u * tangent_t)
+            + control[:, 2] * (6 * u * tangent_t - 3 * tangent_t**2)
+            + 3 * control[:, 3] * tangent_t**2
+        )
+    # angle() reports vertical tangents (and horizontal lines) without their direction,
+    # guideline1 has to be on the same side as in calculateGuidesForSegment
+    vertical = (tangent[:, 0] == 0) & (tangent[:, 1] != 0)
+    tangent[vertical] = (0.0, 1.0)
+    if stacked.pieceIsLine[piece]:
+        horizontal = (tangent[:, 1] == 0) & (tangent[:, 0] != 0)
+        tangent[horizontal] = (1.0, 0.0)
+    tangent /= np.linalg.norm(tangent, axis=-1, keepdims=True)
+    # guideline1 side, (0, 1) rotated by the tangent angle
+    normal = np.stack([-tangent[:, 1], tangent[:, 0]], axis=-1)
+
+    # signed distance of the pieces from the measuring line is a cubic polynomial
+    # a piece can cross the line only if its control points aren't all on one side
+    # (convex hull property), everything else is skipped before sampling
+    sides = (
+        (cubics - point[:, None, None, :]) * tangent[:, None, None, :]
+    ).sum(axis=-1)
+    master, pieceIndex = np.nonzero(
+        (sides.min(axis=-1) <= 0) & (sides.max(axis=-1) >= 0)
+    )
+    pa, pb, pc, pd = (value[master, pieceIndex] for value in (a, b, c, d))
+    lineTangent = tangent[master]
+    ca = (pa * lineTangent).sum(axis=-1)
+    cb = (pb * lineTangent).sum(axis=-1)
+    cc = (pc * lineTangent).sum(axis=-1)
+    cd = ((pd - point[master]) * lineTangent).sum(axis=-1)
+
+    # the pieces are split at the extrema of the distance too, it's monotonic
+    # between them, so every sign change is a single root and two roots can't
+    # hide between the samples
+    extrema, touching = _distanceExtrema(
+        ca, cb, cc, cd, precision if precision is not None else TOUCH_DISTANCE
+    )
+    s = np.linspace(0.0, 1.0, INTERSECTION_SAMPLES + 1)
+    s = np.sort(
+        np.concatenate([np.broadcast_to(s, (len(ca), len(s))), extrema], axis=1),
+        axis=1,
+    )
+    values = ((ca[:, None] * s + cb[:, None]) * s + cc[:, None]) * s + cd[:, None]
+    left, right = values[:, :-1], values[:, 1:]
+    candidate, sample = np.nonzero(left * right < 0)
+
+    low, high = s[candidate, sample], s[candidate, sample + 1]
+    ca, cb, cc, cd = ca[candidate], cb[candidate], cc[candidate], cd[candidate]
+    lowValue = left[candidate, sample]
+    rounds = _bisectionRounds(cubics[master[candidate], pieceIndex[candidate]], precision)
+    for _ in range(rounds):
+        middle = (low + high) / 2
+        middleValue = ((ca * middle + cb) * middle + cc) * middle + cd
+        sameSide = (middleValue > 0) == (lowValue > 0)
+        low = np.where(sameSide, middle, low)
+        lowValue = np.where(sameSide, middleValue, lowValue)
+        high = np.where(sameSide, high, middle)
+
+    # samples lying exactly on the line (like vertices) are hits as well,
+    # unless the whole piece is collinear with the line
+    zeros = values == 0
+    zeros &= ~zeros.all(axis=-1, keepdims=True)
+    zeroCandidate, zeroSample = np.nonzero(zeros)
+    # tangential hits (double roots) don't change the sign
+    touchCandidate, touchExtremum = np.nonzero(touching)
+
+    candidate = np.concatenate([candidate, zeroCandidate, touchCandidate])
+    root = np.concatenate(
+        [
+            (low + high) / 2,
+            s[zeroCandidate, zeroSample],
+            extrema[touchCandidate, touchExtremum],
+        ]
+    )[:, None]
+    master, pieceIndex = master[candidate], pieceIndex[candidate]
+
+    pa, pb, pc, pd = (value[master, pieceIndex] for value in (a, b, c, d))
+    hits = ((pa * root + pb) * root + pc) * root + pd
+    distances = ((hits - point[master]) * normal[master]).sum(axis=-1)
+
+    count = len(cubics)
+    thickness1, thickness2 = np.zeros(count), np.zeros(count)
+    nearestP1, nearestP2 = point.copy(), point.copy()
+    usable = (np.abs(distances) >= tolerance) & (np.abs(distances) <= GUIDE_LENGTH)
+    for index in range(count):
+        mine = usable & (master == index)
+        positive = np.nonzero(mine & (distances > 0))[0]
+        negative = np.nonzero(mine & (distances < 0))[0]
+        if len(positive):
+            best = positive[distances[positive].argmin()]
+            thickness1[index] = distances[best]
+            nearestP1[index] = hits[best]
+        if len(negative):
+            best = negative[distances[negative].argmax()]
+            thickness2[index] = -distances[best]
+            nearestP2[index] = hits[best]
+
+    return dict(
+        point=point,
+        thickness1=thickness1,
+        nearestP1=nearestP1,
+        thickness2=thickness2,
+        nearestP2=nearestP2,
+    )